@@ -0,0 +1,9 @@
+"""
+Benchmarks for the MCP agents sample.
+
+This package contains micro-benchmarks for the server components:
+- event_store_benchmark.py: Event store resume/replay benchmarks
+- load_benchmark.py: In-process load test with disconnecting and resuming clients, per backend
+- multiworker_load_test.py: Throughput of the server as worker processes are added
+- notification_benchmark.py: Stored events with and without notification coalescing
+"""
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Event Store Benchmarks
+
+Measures how the event store implementations in server/event_store.py behave as
+the number of stored events grows.
+
+Run from the mcp-agents directory:
+    python -m benchmarks.event_store_benchmark resume --sizes 10000 100000 1000000
+    python -m benchmarks.event_store_benchmark write --events 20000 --streams 50
+    python -m benchmarks.event_store_benchmark replay --events 20000
+    python -m benchmarks.event_store_benchmark compression --events 20000
+    python -m benchmarks.event_store_benchmark stores --events 20000 --streams 50
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from mcp.server.streamable_http import EventMessage
+from mcp.types import JSONRPCMessage, JSONRPCNotification
+
+from server.event_compression import available_codecs
+from server.event_store import PersistentEventStore, SimpleEventStore
+from server.log_event_store import LogEventStore
+
+
+def make_progress_message(step: int = 1, total: int = 50) -> JSONRPCMessage:
+    """Build a log notification shaped like the ones long_running_agent sends."""
+    return JSONRPCMessage(
+        JSONRPCNotification(
+            jsonrpc="2.0",
+            method="notifications/message",
+            params={
+                "level": "info",
+                "logger": "long_running_agent",
+                "data": f"Processing step {step}/{total} ({step * 100 // total}%)",
+            },
+        )
+    )
+
+
+async def fill_store(store, total_events: int, streams: int) -> list[str]:
+    """Store total_events events spread round-robin across streams; return their IDs."""
+    message = make_progress_message()
+    event_ids = []
+    for i in range(total_events):
+        event_ids.append(await store.store_event(f"stream-{i % streams}", message))
+    return event_ids
+
+
+async def bench_resume(store, event_ids: list[str], resumes: int, tail: int, streams: int) -> dict:
+    """Time resuming from an event `tail` events before the end of its stream."""
+    replayed = 0
+
+    async def send_callback(event: EventMessage) -> None:
+        nonlocal replayed
+        replayed += 1
+
+    # Pick resume points near the end of the log so every resume replays ~tail events
+    window = event_ids[-(tail * streams):] if tail * streams < len(event_ids) else event_ids
+    points = [random.choice(window) for _ in range(resumes)]
+
+    start = time.perf_counter()
+    for event_id in points:
+        await store.replay_events_after(event_id, send_callback)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "resumes": resumes,
+        "avg_resume_us": elapsed / resumes * 1e6,
+        "avg_replayed": replayed / resumes,
+    }
+
+
+async def run_resume(args: argparse.Namespace) -> None:
+    """Run the resume benchmark for each store size."""
+    print(f"{'events':>10} {'streams':>8} {'avg resume (us)':>16} {'avg replayed':>13}")
+    for size in args.sizes:
+        store = SimpleEventStore()
+        event_ids = await fill_store(store, size, args.streams)
+        result = await bench_resume(store, event_ids, args.resumes, args.tail, args.streams)
+        print(f"{size:>10} {args.streams:>8} {result['avg_resume_us']:>16.1f} {result['avg_replayed']:>13.1f}")
+
+
+async def bench_write(store, total_events: int, streams: int) -> float:
+    """Store total_events events from `streams` concurrent producers; return events/sec."""
+    message = make_progress_message()
+    per_stream = total_events // streams
+
+    async def producer(stream_id: str) -> None:
+        # Each producer awaits every store, like a tool sending notifications
+        for _ in range(per_stream):
+            await store.store_event(stream_id, message)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(producer(f"stream-{i}") for i in range(streams)))
+    if hasattr(store, "flush"):
+        await store.flush()
+    elapsed = time.perf_counter() - start
+    return per_stream * streams / elapsed
+
+
+async def run_write(args: argparse.Namespace) -> None:
+    """Compare write throughput of each PersistentEventStore durability mode."""
+    print(f"{'durability':>12} {'events':>8} {'streams':>8} {'events/sec':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for durability in args.durability:
+            store = PersistentEventStore(os.path.join(tmp_dir, f"{durability}.db"), durability=durability)
+            try:
+                rate = await bench_write(store, args.events, args.streams)
+            finally:
+                await store.aclose()
+            print(f"{durability:>12} {args.events:>8} {args.streams:>8} {rate:>12.0f}")
+
+
+async def bench_replay(store, events: int) -> float:
+    """Replay `events` events of one stream through a transport-like send path; return us/event."""
+    message = make_progress_message()
+    first_id = await store.store_event("stream-0", message)
+    for _ in range(events):
+        await store.store_event("stream-0", message)
+    if hasattr(store, "flush"):
+        await store.flush()
+
+    async def send_callback(event: EventMessage) -> None:
+        # The streamable HTTP transport serializes every replayed message like this
+        event.message.model_dump_json(by_alias=True, exclude_none=True)
+
+    start = time.perf_counter()
+    await store.replay_events_after(first_id, send_callback)
+    elapsed = time.perf_counter() - start
+    return elapsed / events * 1e6
+
+
+async def run_replay(args: argparse.Namespace) -> None:
+    """Compare per-event replay cost of full and lazy validation."""
+    print(f"{'store':>28} {'events':>8} {'us/event':>10}")
+    result = await bench_replay(SimpleEventStore(), args.events)
+    print(f"{'SimpleEventStore':>28} {args.events:>8} {result:>10.2f}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in PersistentEventStore.REPLAY_VALIDATION_MODES:
+            store = PersistentEventStore(os.path.join(tmp_dir, f"{mode}.db"), replay_validation=mode)
+            try:
+                result = await bench_replay(store, args.events)
+            finally:
+                await store.aclose()
+            label = f"PersistentEventStore ({mode})"
+            print(f"{label:>28} {args.events:>8} {result:>10.2f}")
+
+
+async def run_compression(args: argparse.Namespace) -> None:
+    """Report stored size and throughput for each payload compression codec."""
+    # Realistic mix: every step of a 50-step long_running_agent task, repeated
+    messages = [make_progress_message(step % 50 + 1) for step in range(args.events)]
+
+    async def send_callback(event: EventMessage) -> None:
+        event.message.model_dump_json(by_alias=True, exclude_none=True)
+
+    print(f"{'codec':>6} {'payload bytes':>14} {'bytes/event':>12} {'file bytes':>11} "
+          f"{'writes/sec':>11} {'replay us/event':>16}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for codec in ("none", *available_codecs()):
+            path = os.path.join(tmp_dir, f"{codec}.db")
+            store = PersistentEventStore(path, compression=codec, replay_validation="lazy")
+            try:
+                start = time.perf_counter()
+                first_id = await store.store_event("stream-0", messages[0])
+                for message in messages[1:]:
+                    await store.store_event("stream-0", message)
+                await store.flush()
+                write_rate = len(messages) / (time.perf_counter() - start)
+
+                start = time.perf_counter()
+                await store.replay_events_after(first_id, send_callback)
+                replay_us = (time.perf_counter() - start) / (len(messages) - 1) * 1e6
+
+                payload_bytes = store._conn.execute("SELECT SUM(LENGTH(message)) FROM events").fetchone()[0]
+                store._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                await store.aclose()
+            file_bytes = os.path.getsize(path)
+            print(f"{codec:>6} {payload_bytes:>14} {payload_bytes / len(messages):>12.1f} {file_bytes:>11} "
+                  f"{write_rate:>11.0f} {replay_us:>16.2f}")
+
+
+async def run_stores(args: argparse.Namespace) -> None:
+    """Compare write throughput and replay cost across the event store implementations."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        factories = {
+            "SimpleEventStore": lambda name: SimpleEventStore(),
+            "PersistentEventStore": lambda name: PersistentEventStore(
+                os.path.join(tmp_dir, f"{name}.db"), replay_validation="lazy"
+            ),
+            "LogEventStore": lambda name: LogEventStore(os.path.join(tmp_dir, f"{name}-log")),
+        }
+        print(f"{'store':>22} {'writes/sec':>11} {'replay us/event':>16}")
+        for label, factory in factories.items():
+            write_store = factory("write")
+            replay_store = factory("replay")
+            try:
+                write_rate = await bench_write(write_store, args.events, args.streams)
+                replay_us = await bench_replay(replay_store, args.events)
+            finally:
+                for store in (write_store, replay_store):
+                    if hasattr(store, "aclose"):
+                        await store.aclose()
+            print(f"{label:>22} {write_rate:>11.0f} {replay_us:>16.2f}")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Event store benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    resume = subparsers.add_parser("resume", help="Resume latency as the store grows")
+    resume.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Total stored events per run (default: 10k 100k 1M)")
+    resume.add_argument("--streams", type=int, default=1000, help="Number of streams (default: 1000)")
+    resume.add_argument("--resumes", type=int, default=1000, help="Resumes per run (default: 1000)")
+    resume.add_argument("--tail", type=int, default=10, help="Approximate events replayed per resume (default: 10)")
+    resume.set_defaults(func=run_resume)
+
+    write = subparsers.add_parser("write", help="PersistentEventStore write throughput per durability mode")
+    write.add_argument("--events", type=int, default=20_000, help="Total events to store (default: 20000)")
+    write.add_argument("--streams", type=int, default=50, help="Concurrent producers (default: 50)")
+    write.add_argument("--durability", nargs="+", default=list(PersistentEventStore.DURABILITY_MODES),
+                       choices=PersistentEventStore.DURABILITY_MODES,
+                       help="Durability modes to compare; 'event' is the previous per-event commit behaviour")
+    write.set_defaults(func=run_write)
+
+    replay = subparsers.add_parser("replay", help="Per-event replay cost, full vs lazy validation")
+    replay.add_argument("--events", type=int, default=20_000, help="Events replayed (default: 20000)")
+    replay.set_defaults(func=run_replay)
+
+    compression = subparsers.add_parser("compression", help="Stored size and throughput per compression codec")
+    compression.add_argument("--events", type=int, default=20_000, help="Events stored (default: 20000)")
+    compression.set_defaults(func=run_compression)
+
+    stores = subparsers.add_parser("stores", help="Write throughput and replay cost of every event store")
+    stores.add_argument("--events", type=int, default=20_000, help="Events written and replayed (default: 20000)")
+    stores.add_argument("--streams", type=int, default=50, help="Concurrent producers when writing (default: 50)")
+    stores.set_defaults(func=run_stores)
+
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
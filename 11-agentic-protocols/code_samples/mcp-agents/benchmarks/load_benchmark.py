@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Resumable Server Load Benchmark
+
+Starts the app from create_server_app in this process, once per event store
+backend, and drives it with concurrent simulated clients. Each client opens
+a session and makes tool calls that stream progress notifications. Halfway
+through each call it disconnects, waits, and resumes the stream with
+Last-Event-ID. Reported per backend:
+
+- call latency (p50/p99, including the time spent disconnected)
+- replay time (p50/p99, from the resuming GET until the call's result)
+- events received per second across all clients
+- process RSS growth, and the events stored and disk used afterwards
+
+Run from the mcp-agents directory:
+    python -m benchmarks.load_benchmark
+    python -m benchmarks.load_benchmark --json results.json
+    python -m benchmarks.load_benchmark --compare results.json  # exit 1 on regression
+
+The clients share the process and event loop with the server, so absolute
+numbers are lower than against a separate server; compare backends and runs
+on the same machine.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+
+import anyio
+import httpx
+import uvicorn
+from mcp.types import TextContent
+
+from server.event_store_factory import create_event_store
+from server.server import create_server_app
+from server.tool_registry import ToolRegistry
+from server.tool_scheduler import ToolScheduler
+
+PROTOCOL_VERSION = "2025-06-18"
+_BASE_HEADERS = {"accept": "application/json, text/event-stream", "content-type": "application/json"}
+
+BACKENDS = ("memory", "sqlite", "log")
+
+# Compared by --compare: metric -> True if higher is better
+REGRESSION_METRICS = {
+    "p50_ms": False,
+    "p99_ms": False,
+    "replay_p50_ms": False,
+    "events_per_sec": True,
+}
+
+BENCH_TOOLS = ToolRegistry()
+
+
+@BENCH_TOOLS.tool(
+    "emit_events",
+    description="Send `count` progress notifications, `interval` seconds apart",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "count": {"type": "integer", "minimum": 1},
+            "interval": {"type": "number", "minimum": 0},
+        },
+        "required": ["count", "interval"],
+    },
+)
+async def emit_events(ctx, args, notifier, checkpoint, interactions) -> list[TextContent]:
+    """Stream progress notifications like a real tool, without its run time."""
+    for i in range(args["count"]):
+        await notifier.progress(i + 1, total=args["count"])
+        await anyio.sleep(args["interval"])
+    return [TextContent(type="text", text=f"Sent {args['count']} events")]
+
+
+async def iter_sse(response: httpx.Response) -> AsyncIterator[dict[str, Any]]:
+    """Yield {"id": ..., "data": ...} for each event of an SSE response."""
+    event: dict[str, Any] = {}
+    async for line in response.aiter_lines():
+        if line.startswith("id:"):
+            event["id"] = line[3:].strip()
+        elif line.startswith("data:"):
+            event["data"] = line[5:].strip()
+        elif line == "" and event:
+            yield event
+            event = {}
+
+
+def _is_response(event: dict[str, Any], request_id: int) -> bool:
+    if not event.get("data"):
+        return False
+    message = json.loads(event["data"])
+    return message.get("id") == request_id and ("result" in message or "error" in message)
+
+
+async def run_client(url: str, args: argparse.Namespace, results: dict[str, Any]) -> None:
+    """Open one session and make args.calls tool calls, each interrupted and resumed."""
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        response = await client.post(url, headers=_BASE_HEADERS, json={
+            "jsonrpc": "2.0", "id": 0, "method": "initialize",
+            "params": {"protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+                       "clientInfo": {"name": "load-benchmark", "version": "1.0"}},
+        })
+        if response.status_code != 200:
+            results["errors"] += args.calls
+            return
+        headers = dict(_BASE_HEADERS, **{
+            "mcp-session-id": response.headers["mcp-session-id"],
+            "mcp-protocol-version": PROTOCOL_VERSION,
+        })
+        await client.post(url, headers=headers, json={"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+        for request_id in range(1, args.calls + 1):
+            request = {
+                "jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                "params": {"name": "emit_events", "arguments": {"count": args.events, "interval": args.interval}},
+            }
+            start = time.perf_counter()
+            received = 0
+            last_event_id: Optional[str] = None
+            done = False
+            async with client.stream("POST", url, headers=headers, json=request) as response:
+                async for event in iter_sse(response):
+                    received += 1
+                    last_event_id = event.get("id", last_event_id)
+                    if _is_response(event, request_id):
+                        done = True
+                        break
+                    if args.disconnect_after and received >= args.disconnect_after:
+                        break
+
+            if not done and last_event_id is not None:
+                await asyncio.sleep(args.disconnect_time)
+                replay_start = time.perf_counter()
+                resume_headers = dict(headers, **{"last-event-id": last_event_id})
+                async with client.stream("GET", url, headers=resume_headers) as response:
+                    async for event in iter_sse(response):
+                        received += 1
+                        if _is_response(event, request_id):
+                            results["replay"].append(time.perf_counter() - replay_start)
+                            done = True
+                            break
+
+            results["events"] += received
+            if done:
+                results["latency"].append(time.perf_counter() - start)
+            else:
+                results["errors"] += 1
+        # The session is left open so its events are still stored when the store is measured
+
+
+def _rss_bytes() -> int:
+    """Current resident set size, or the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _disk_bytes(backend: str, path: Path) -> int:
+    """Bytes the event store uses on disk (none for the memory backend)."""
+    if backend == "memory":
+        return 0
+    # The SQLite database with its -wal and -shm files, or the log's segment directory
+    files = path.parent.glob(path.name + "*") if backend == "sqlite" else path.rglob("*")
+    return sum(f.stat().st_size for f in files if f.is_file())
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_backend(backend: str, args: argparse.Namespace) -> dict[str, Any]:
+    """Serve the app with `backend` on a free port, run the clients and return the results."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / ("events.db" if backend == "sqlite" else "events_log")
+        store = create_event_store(backend, path=str(path))
+        app = create_server_app(
+            store,
+            notification_interval=0,
+            # Every client's call runs at once, so latency reflects the store rather than queueing
+            scheduler=ToolScheduler(default_limit=args.clients),
+            abandon_after=None,
+            registry=BENCH_TOOLS,
+        )
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        serve_task = asyncio.create_task(server.serve())
+        try:
+            while not server.started:
+                if serve_task.done():
+                    serve_task.result()
+                await asyncio.sleep(0.01)
+            port = server.servers[0].sockets[0].getsockname()[1]
+            url = f"http://127.0.0.1:{port}/mcp/"
+
+            rss_before = _rss_bytes()
+            results: dict[str, Any] = {"latency": [], "replay": [], "events": 0, "errors": 0}
+            start = time.perf_counter()
+            await asyncio.gather(*(run_client(url, args, results) for _ in range(args.clients)))
+            elapsed = time.perf_counter() - start
+            rss_after = _rss_bytes()
+            if hasattr(store, "flush"):
+                await store.flush()
+            stored_events = store.get_event_count()
+            disk_bytes = _disk_bytes(backend, path)
+        finally:
+            server.should_exit = True
+            await serve_task
+            if hasattr(store, "aclose"):
+                await store.aclose()
+
+    return {
+        "backend": backend,
+        "calls": len(results["latency"]),
+        "errors": results["errors"],
+        "p50_ms": _percentile(results["latency"], 0.5) * 1000,
+        "p99_ms": _percentile(results["latency"], 0.99) * 1000,
+        "replay_p50_ms": _percentile(results["replay"], 0.5) * 1000,
+        "replay_p99_ms": _percentile(results["replay"], 0.99) * 1000,
+        "events": results["events"],
+        "events_per_sec": results["events"] / elapsed,
+        "duration_sec": elapsed,
+        "rss_growth_mb": (rss_after - rss_before) / 1e6,
+        "stored_events": stored_events,
+        "disk_mb": disk_bytes / 1e6,
+    }
+
+
+def find_regressions(results: list[dict], baseline: dict, max_regression: float) -> list[str]:
+    """Compare with a previous --json report; return a line per metric that got worse by more than allowed."""
+    previous = {result["backend"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result["backend"])
+        if old is None:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            before, after = old.get(metric), result[metric]
+            if not before:
+                continue
+            change = (before - after) / before if higher_is_better else (after - before) / before
+            if change > max_regression:
+                regressions.append(
+                    f"{result['backend']} {metric}: {before:.1f} -> {after:.1f} ({change:+.0%} worse)"
+                )
+    return regressions
+
+
+async def run_all(args: argparse.Namespace, out) -> list[dict]:
+    """Run every backend in turn, printing a table row for each."""
+    results = []
+    print(f"clients: {args.clients}, calls per client: {args.calls}, events per call: {args.events}, "
+          f"disconnect after {args.disconnect_after} events for {args.disconnect_time}s", file=out)
+    print(f"{'backend':>8} {'calls':>6} {'errors':>6} {'p50 (ms)':>9} {'p99 (ms)':>9} {'replay p50':>11} "
+          f"{'replay p99':>11} {'events/s':>9} {'RSS +MB':>8} {'stored':>7} {'disk MB':>8}", file=out)
+    for backend in args.backends:
+        result = await run_backend(backend, args)
+        results.append(result)
+        print(f"{backend:>8} {result['calls']:>6} {result['errors']:>6} {result['p50_ms']:>9.1f} "
+              f"{result['p99_ms']:>9.1f} {result['replay_p50_ms']:>11.1f} {result['replay_p99_ms']:>11.1f} "
+              f"{result['events_per_sec']:>9.0f} {result['rss_growth_mb']:>8.1f} {result['stored_events']:>7} {result['disk_mb']:>8.2f}", file=out)
+    return results
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Load benchmark for the resumable server")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="Event store backends to compare (default: all)")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent client sessions (default: 20)")
+    parser.add_argument("--calls", type=int, default=5, help="Tool calls per client (default: 5)")
+    parser.add_argument("--events", type=int, default=20, help="Notifications per tool call (default: 20)")
+    parser.add_argument("--interval", type=float, default=0.01,
+                        help="Seconds between a call's notifications (default: 0.01)")
+    parser.add_argument("--disconnect-after", type=int, default=10,
+                        help="Events a client reads before disconnecting; 0 never disconnects (default: 10)")
+    parser.add_argument("--disconnect-time", type=float, default=0.2,
+                        help="Seconds a client stays disconnected before resuming (default: 0.2)")
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="Previous --json report; exit with status 1 if a metric regressed")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed relative regression for --compare (default: 0.25)")
+    args = parser.parse_args()
+
+    # Keep per-request server logging out of the measurements
+    logging.basicConfig(level=logging.WARNING)
+
+    # With JSON on stdout the table goes to stderr
+    out = sys.stderr if args.json == "-" else sys.stdout
+    results = asyncio.run(run_all(args, out))
+    report = {
+        "benchmark": "load_benchmark",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+        "results": results,
+    }
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare:
+        regressions = find_regressions(results, json.loads(Path(args.compare).read_text()), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=out)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.max_regression:.0%} compared with {args.compare}", file=out)
+
+
+if __name__ == "__main__":
+    main()
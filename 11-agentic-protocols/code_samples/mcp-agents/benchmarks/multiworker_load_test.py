@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker Load Test
+
+Starts the server with 1, 2, 4... worker processes (see server/multiworker.py)
+and drives it with concurrent MCP sessions, each initializing and then sending
+tools/list requests back to back. Reports completed requests per second,
+latency percentiles and rejected requests (503s once a process hits its
+connection limit) for each worker count.
+
+Run from the mcp-agents directory:
+    python -m benchmarks.multiworker_load_test --workers 1 2 4 --clients 32 --duration 10
+
+Throughput only scales with workers when there are spare CPU cores; on a
+single core the gain comes from the higher combined connection limit.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+PROTOCOL_VERSION = "2025-06-18"
+_BASE_HEADERS = {"accept": "application/json, text/event-stream", "content-type": "application/json"}
+
+
+async def run_session(url: str, deadline: float, latencies: list[float], counters: dict) -> None:
+    """Open one MCP session and send tools/list until the deadline."""
+    async with httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=1)) as client:
+        initialize = {
+            "jsonrpc": "2.0", "id": 0, "method": "initialize",
+            "params": {"protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+                       "clientInfo": {"name": "load-test", "version": "1.0"}},
+        }
+        while time.perf_counter() < deadline:
+            response = await client.post(url, headers=_BASE_HEADERS, json=initialize)
+            if response.status_code == 200:
+                break
+            counters["rejected"] += 1
+            await asyncio.sleep(0.05)
+        else:
+            return
+        headers = dict(_BASE_HEADERS, **{
+            "mcp-session-id": response.headers["mcp-session-id"],
+            "mcp-protocol-version": PROTOCOL_VERSION,
+        })
+        await client.post(url, headers=headers, json={"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+        request_id = 1
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post(
+                url, headers=headers, json={"jsonrpc": "2.0", "id": request_id, "method": "tools/list"}
+            )
+            if response.status_code == 200 and '"tools"' in response.text:
+                latencies.append(time.perf_counter() - start)
+            elif response.status_code == 503:
+                counters["rejected"] += 1
+                await asyncio.sleep(0.05)
+            else:
+                counters["errors"] += 1
+            request_id += 1
+        await client.delete(url, headers=headers)
+
+
+def _client_process(url: str, sessions: int, duration: float, results: multiprocessing.Queue) -> None:
+    """Run `sessions` concurrent sessions in one process and report the results."""
+    latencies: list[float] = []
+    counters = {"rejected": 0, "errors": 0}
+
+    async def main() -> None:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(run_session(url, deadline, latencies, counters) for _ in range(sessions)))
+
+    asyncio.run(main())
+    results.put((latencies, counters))
+
+
+def _wait_for_port(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def run_load(args: argparse.Namespace, workers: int) -> dict:
+    """Start a server with `workers` processes, load it and return the results."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        command = [
+            sys.executable, "-m", "server.server", "--port", str(args.port),
+            "--workers", str(workers), "--limit-concurrency", str(args.limit_concurrency),
+            "--event-store", "sqlite", "--event-store-path", os.path.join(tmp_dir, "events.db"),
+        ]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            # With several workers the proxy only listens once every worker is up
+            _wait_for_port(args.port)
+
+            url = f"http://127.0.0.1:{args.port}/mcp/"
+            context = multiprocessing.get_context("spawn")
+            results = context.Queue()
+            per_process = [args.clients // args.client_processes] * args.client_processes
+            for i in range(args.clients % args.client_processes):
+                per_process[i] += 1
+            processes = [
+                context.Process(target=_client_process, args=(url, sessions, args.duration, results))
+                for sessions in per_process if sessions
+            ]
+            for process in processes:
+                process.start()
+            latencies: list[float] = []
+            counters = {"rejected": 0, "errors": 0}
+            for _ in processes:
+                process_latencies, process_counters = results.get()
+                latencies.extend(process_latencies)
+                for key, value in process_counters.items():
+                    counters[key] += value
+            for process in processes:
+                process.join()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / args.duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        **counters,
+    }
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Multi-worker server load test")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="Worker counts to compare (default: 1 2 4)")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent MCP sessions (default: 32)")
+    parser.add_argument("--client-processes", type=int, default=4,
+                        help="Processes generating load, so the client is not the bottleneck (default: 4)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per run (default: 10)")
+    parser.add_argument("--limit-concurrency", type=int, default=10,
+                        help="Connection limit per server process (default: 10, as in run_server)")
+    parser.add_argument("--port", type=int, default=8090, help="Port for the server under test (default: 8090)")
+    args = parser.parse_args()
+
+    print(f"CPU cores: {os.cpu_count()}, clients: {args.clients}, duration: {args.duration}s")
+    print(f"{'workers':>8} {'requests':>9} {'req/sec':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'rejected':>9} {'errors':>7}")
+    for workers in args.workers:
+        result = run_load(args, workers)
+        print(f"{result['workers']:>8} {result['requests']:>9} {result['requests_per_sec']:>9.0f} "
+              f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['rejected']:>9} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
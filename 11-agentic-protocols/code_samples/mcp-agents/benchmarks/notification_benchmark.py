@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Notification Coalescing Benchmark
+
+Simulates many concurrent tool calls that report progress every few
+milliseconds and counts the notifications that reach the event store with
+and without coalescing (see server/notification_coalescer.py).
+
+Run from the mcp-agents directory:
+    python -m benchmarks.notification_benchmark --calls 100 --updates 200 --step-ms 10
+"""
+
+import argparse
+import asyncio
+import time
+
+from mcp.types import JSONRPCMessage, JSONRPCNotification
+
+from server.event_store import SimpleEventStore
+from server.notification_coalescer import NotificationCoalescer
+
+
+class StoringSession:
+    """Stands in for ServerSession: every notification becomes a stored event."""
+
+    def __init__(self, store: SimpleEventStore, stream_id: str) -> None:
+        self._store = store
+        self._stream_id = stream_id
+        self.last_progress = None
+
+    async def _record(self, method: str, params: dict) -> None:
+        message = JSONRPCMessage(JSONRPCNotification(jsonrpc="2.0", method=method, params=params))
+        await self._store.store_event(self._stream_id, message)
+
+    async def send_progress_notification(self, progress_token, progress, total=None, message=None,
+                                         related_request_id=None) -> None:
+        self.last_progress = progress
+        await self._record("notifications/progress", {
+            "progressToken": progress_token, "progress": progress, "total": total, "message": message,
+        })
+
+    async def send_log_message(self, level, data, logger=None, related_request_id=None) -> None:
+        await self._record("notifications/message", {"level": level, "data": data, "logger": logger})
+
+
+async def simulate_call(store: SimpleEventStore, call: int, updates: int, step: float, interval: float) -> float:
+    """Run one tool call; return the final progress value the client saw."""
+    session = StoringSession(store, f"stream-{call}")
+    async with NotificationCoalescer(session, call, min_interval=interval) as notifier:
+        for i in range(1, updates + 1):
+            await notifier.progress(i, total=updates, message=f"Step {i}/{updates}")
+            await asyncio.sleep(step)
+    return session.last_progress
+
+
+async def run(args: argparse.Namespace) -> None:
+    print(f"{'interval (s)':>12} {'events stored':>14} {'per call':>9} {'reduction':>10} {'final ok':>9} {'seconds':>8}")
+    baseline = None
+    for interval in args.intervals:
+        store = SimpleEventStore()
+        start = time.perf_counter()
+        finals = await asyncio.gather(*(
+            simulate_call(store, call, args.updates, args.step_ms / 1000, interval)
+            for call in range(args.calls)
+        ))
+        elapsed = time.perf_counter() - start
+        stored = store.get_event_count()
+        baseline = baseline or stored
+        final_ok = all(final == args.updates for final in finals)
+        print(f"{interval:>12} {stored:>14} {stored / args.calls:>9.1f} {baseline / stored:>9.1f}x "
+              f"{str(final_ok):>9} {elapsed:>8.2f}")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Notification coalescing benchmark")
+    parser.add_argument("--calls", type=int, default=100, help="Concurrent tool calls (default: 100)")
+    parser.add_argument("--updates", type=int, default=200, help="Progress updates per call (default: 200)")
+    parser.add_argument("--step-ms", type=float, default=10.0, help="Milliseconds between updates (default: 10)")
+    parser.add_argument("--intervals", type=float, nargs="+", default=[0.0, 0.1, 0.5],
+                        help="Coalescing intervals to compare; 0 sends every update (default: 0 0.1 0.5)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
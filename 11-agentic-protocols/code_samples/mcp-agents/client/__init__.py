@@ -3,6 +3,10 @@ MCP Client implementations.
 
 This package contains various MCP client implementations:
 - client.py: Basic MCP client
+- batch_runner.py: Headless runner for tool calls listed in a JSONL file
+- jobs.py: Background tool jobs for the interactive client
 - resumable_client.py: Client with resumption support
-- utils.py: Utility functions for token management, etc.
+- session_pool.py: Pool of initialized sessions per server URL, health-checked while idle
+- token_store.py: Resumption tokens of pending calls (JSON file or SQLite)
+- utils.py: Utility functions shared by the clients
 """
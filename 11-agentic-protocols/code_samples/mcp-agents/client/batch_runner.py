@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Headless Batch Runner for MCP Tool Calls
+
+Reads tool calls from a JSONL file, one object per line:
+
+    {"id": "paris", "tool": "travel_agent", "args": {"destination": "Paris"},
+     "meta": {"interactionPolicy": {"elicitation": {"action": "accept", "content": {"confirm": true}}}}}
+
+and runs them over a pool of sessions with at most ``--concurrency`` calls
+in flight. Each result is written as a JSON line as soon as its call
+completes, with the call's latency, the time to its first event and how
+often it was resumed. A summary with throughput and latency percentiles is
+printed to stderr at the end.
+
+Nobody is there to answer questions: elicitation requests are declined and
+sampling requests fail, so pre-answer them with ``meta.interactionPolicy``.
+
+The transport reconnects a dropped stream on its own, but gives up after a
+couple of attempts and leaves the call waiting, and a request that cannot
+connect at all takes the whole transport down with it. So the sessions
+come from a SessionPool, which reopens a session on the same session ID
+(without initializing again) when its connection fails, and a call that
+loses its connection or sees no event for ``--stall-timeout`` seconds is
+resumed from its latest resumption token, up to ``--max-resumes`` times
+with doubling delays.
+
+Run from the mcp-agents directory:
+    python -m client.batch_runner calls.jsonl --concurrency 8 --sessions 2 --output results.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, Callable, Optional
+
+import mcp.types as types
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.shared.message import ClientMessageMetadata
+
+from .session_pool import PooledSession, SessionLost, SessionPool, describe_error
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_STALL_TIMEOUT = 60.0
+DEFAULT_MAX_RESUMES = 5
+# Seconds before the first resume; doubled for each further one
+DEFAULT_RESUME_DELAY = 1.0
+
+OK = "ok"
+ERROR = "error"
+FAILED = "failed"
+
+
+class BatchCall:
+    """One tool call read from the job file."""
+
+    __slots__ = ("id", "tool", "args", "meta", "round")
+
+    def __init__(self, call_id: Any, tool: str, args: dict, meta: Optional[dict] = None, round: int = 0) -> None:
+        self.id = call_id
+        self.tool = tool
+        self.args = args
+        self.meta = meta
+        # Pass over the job file this call belongs to, with --repeat
+        self.round = round
+
+
+class CallStalled(Exception):
+    """No event arrived for a call within the stall timeout."""
+
+
+def load_calls(path: str, repeat: int = 1) -> list[BatchCall]:
+    """Read the job file, repeated `repeat` times; raises ValueError naming the first bad line."""
+    calls = []
+    with (sys.stdin if path == "-" else open(path)) as f:
+        lines = f.readlines()
+    for round in range(repeat):
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON ({e})") from None
+            if not isinstance(data, dict) or not isinstance(data.get("tool"), str):
+                raise ValueError(f"{path}:{number}: expected an object with a 'tool' name")
+            args = data.get("args", {})
+            if not isinstance(args, dict):
+                raise ValueError(f"{path}:{number}: 'args' must be an object")
+            if not isinstance(data.get("meta", {}), dict):
+                raise ValueError(f"{path}:{number}: 'meta' must be an object")
+            calls.append(BatchCall(data.get("id", number), data["tool"], args, data.get("meta"), round))
+    return calls
+
+
+def result_text(result: types.CallToolResult) -> str:
+    """Join the text content of a tool result."""
+    return "\n".join(content.text for content in result.content if isinstance(content, types.TextContent))
+
+
+async def decline_elicitation(context, params) -> types.ElicitResult:
+    return types.ElicitResult(action="decline")
+
+
+async def refuse_sampling(context, params) -> types.ErrorData:
+    return types.ErrorData(code=types.INVALID_REQUEST, message="Sampling is not available in batch mode")
+
+
+class BatchRunner:
+    """
+    Runs batch calls over a pool of initialized sessions.
+
+    - concurrency: calls in flight at once, spread evenly over the sessions
+    - sessions: sessions opened to the server
+    - stall_timeout: seconds without an event before a call is resumed
+    - max_resumes: resumes per call before it counts as failed
+    - resume_delay: seconds before the first resume, doubled for each further one
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        sessions: int = 1,
+        stall_timeout: float = DEFAULT_STALL_TIMEOUT,
+        max_resumes: int = DEFAULT_MAX_RESUMES,
+        resume_delay: float = DEFAULT_RESUME_DELAY,
+    ) -> None:
+        if concurrency < 1 or sessions < 1:
+            raise ValueError("concurrency and sessions must be at least 1")
+        if stall_timeout <= 0:
+            raise ValueError(f"stall_timeout must be positive, got {stall_timeout}")
+        self.server_url = server_url
+        self.concurrency = concurrency
+        self.sessions = min(sessions, concurrency)
+        self.stall_timeout = stall_timeout
+        self.max_resumes = max_resumes
+        self.resume_delay = resume_delay
+        # Times the pool's sessions had to reconnect during the last run
+        self.reconnects = 0
+
+    async def run(self, calls: list[BatchCall], write: Callable[[dict[str, Any]], None]) -> list[dict[str, Any]]:
+        """Run `calls`, passing each result to `write` as it completes, and return all results."""
+        queue: asyncio.Queue[BatchCall] = asyncio.Queue()
+        for call in calls:
+            queue.put_nowait(call)
+        results: list[dict[str, Any]] = []
+
+        async def worker(index: int, pooled: PooledSession) -> None:
+            while not queue.empty():
+                call = queue.get_nowait()
+                result = await self.call(pooled, call)
+                result["session"] = index
+                results.append(result)
+                write(result)
+
+        async with SessionPool(
+            max_sessions=self.sessions,
+            min_idle=0,
+            health_interval=None,
+            reconnect_delay=self.resume_delay,
+            elicitation_callback=decline_elicitation,
+            sampling_callback=refuse_sampling,
+        ) as pool:
+            await pool.warm(self.server_url, self.sessions)
+            sessions = [await pool.acquire(self.server_url) for _ in range(self.sessions)]
+            try:
+                await asyncio.gather(
+                    *(worker(i % self.sessions, sessions[i % self.sessions]) for i in range(self.concurrency))
+                )
+            finally:
+                self.reconnects = sum(pooled.reconnects for pooled in sessions)
+        return results
+
+    async def call(self, pooled: PooledSession, call: BatchCall) -> dict[str, Any]:
+        """Run one call to completion, resuming it when its stream stalls, and return its result record."""
+        started = time.perf_counter()
+        last_event = started
+        first_event: Optional[float] = None
+        token: Optional[str] = None
+
+        async def on_token(new_token: str) -> None:
+            nonlocal token, last_event, first_event
+            token = new_token
+            last_event = time.perf_counter()
+            if first_event is None:
+                first_event = last_event - started
+
+        record: dict[str, Any] = {"id": call.id, "tool": call.tool}
+        if call.round:
+            record["round"] = call.round
+        resumes = 0
+        while True:
+            metadata = ClientMessageMetadata(
+                resumption_token=token if resumes else None,
+                on_resumption_token_update=on_token,
+            )
+            try:
+                try:
+                    session = await pooled.get(self.stall_timeout)
+                except asyncio.TimeoutError:
+                    raise CallStalled() from None
+                request = asyncio.create_task(self._send(session, call, metadata))
+                result = await self._wait(request, lambda: last_event)
+                record["status"] = ERROR if result.isError else OK
+                record["result" if not result.isError else "error"] = result_text(result)
+                break
+            except (CallStalled, McpError) as e:
+                if isinstance(e, McpError) and e.error.code != types.CONNECTION_CLOSED:
+                    # The server answered with an error, or the session is gone
+                    record["status"] = ERROR
+                    record["error"] = e.error.message
+                    break
+                if token is None or resumes >= self.max_resumes:
+                    # Without a token the call cannot be resumed, only sent again
+                    record["status"] = FAILED
+                    reason = "Connection lost" if isinstance(e, McpError) else f"No event for {self.stall_timeout:g}s"
+                    record["error"] = reason + (" before the first event" if token is None else f" after {resumes} resumes")
+                    break
+                await asyncio.sleep(self.resume_delay * 2 ** resumes)
+                resumes += 1
+                last_event = time.perf_counter()
+            except SessionLost as e:
+                record["status"] = FAILED
+                record["error"] = f"Session lost: {e}"
+                break
+            except Exception as e:
+                record["status"] = FAILED
+                record["error"] = describe_error(e)
+                break
+
+        record["latency"] = round(time.perf_counter() - started, 4)
+        record["first_event"] = round(first_event, 4) if first_event is not None else None
+        record["resumes"] = resumes
+        return record
+
+    async def _send(
+        self, session: ClientSession, call: BatchCall, metadata: ClientMessageMetadata
+    ) -> types.CallToolResult:
+        params = {"name": call.tool, "arguments": call.args}
+        if call.meta:
+            params["_meta"] = call.meta
+        return await session.send_request(
+            types.ClientRequest(
+                types.CallToolRequest(
+                    method="tools/call",
+                    params=types.CallToolRequestParams.model_validate(params),
+                )
+            ),
+            types.CallToolResult,
+            metadata=metadata,
+        )
+
+    async def _wait(self, request: asyncio.Task, last_event: Callable[[], float]) -> types.CallToolResult:
+        """Wait for `request`, cancelling it once no event has arrived for the stall timeout."""
+        while True:
+            remaining = last_event() + self.stall_timeout - time.perf_counter()
+            if remaining <= 0:
+                request.cancel()
+                await asyncio.gather(request, return_exceptions=True)
+                raise CallStalled()
+            done, _ = await asyncio.wait({request}, timeout=remaining)
+            if done:
+                return request.result()
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(results: list[dict[str, Any]], elapsed: float, reconnects: int = 0) -> dict[str, Any]:
+    """Count outcomes and compute throughput and latency percentiles of a batch run."""
+    latencies = [r["latency"] for r in results if r["status"] == OK]
+    return {
+        "calls": len(results),
+        "ok": sum(r["status"] == OK for r in results),
+        "errors": sum(r["status"] == ERROR for r in results),
+        "failed": sum(r["status"] == FAILED for r in results),
+        "resumed": sum(r["resumes"] > 0 for r in results),
+        "reconnects": reconnects,
+        "seconds": round(elapsed, 3),
+        "calls_per_sec": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+    }
+
+
+async def run_batch(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the job file and write results as they complete; return the summary."""
+    calls = load_calls(args.jobs, args.repeat)
+    runner = BatchRunner(
+        args.url,
+        concurrency=args.concurrency,
+        sessions=args.sessions,
+        stall_timeout=args.stall_timeout,
+        max_resumes=args.max_resumes,
+        resume_delay=args.resume_delay,
+    )
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+
+    def write(result: dict[str, Any]) -> None:
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+    started = time.perf_counter()
+    try:
+        results = await runner.run(calls, write)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return summarize(results, time.perf_counter() - started, runner.reconnects)
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Run tool calls from a JSONL file without prompting")
+    parser.add_argument("jobs", help="JSONL file of tool calls ('-' for stdin)")
+    parser.add_argument("--url", default="http://127.0.0.1:8006/mcp", help="MCP server URL")
+    parser.add_argument("--output", default="-", help="Where to write JSONL results (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Calls in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--sessions", type=int, default=1, help="Sessions to spread the calls over (default: 1)")
+    parser.add_argument("--repeat", type=int, default=1, help="Run the job file this many times (default: 1)")
+    parser.add_argument("--stall-timeout", type=float, default=DEFAULT_STALL_TIMEOUT,
+                        help=f"Seconds without an event before a call is resumed (default: {DEFAULT_STALL_TIMEOUT:g})")
+    parser.add_argument("--max-resumes", type=int, default=DEFAULT_MAX_RESUMES,
+                        help=f"Resumes per call before it fails (default: {DEFAULT_MAX_RESUMES})")
+    parser.add_argument("--resume-delay", type=float, default=DEFAULT_RESUME_DELAY,
+                        help=f"Seconds before the first resume, doubled for each further one (default: {DEFAULT_RESUME_DELAY:g})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # Stream drops are handled by resuming; keep the transport's own reports quiet
+    logging.getLogger('mcp.client.streamable_http').setLevel(logging.CRITICAL)
+
+    try:
+        summary = asyncio.run(run_batch(args))
+    except (ValueError, SessionLost) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+    print(
+        f"{summary['calls']} calls: {summary['ok']} ok, {summary['errors']} errors, {summary['failed']} failed, "
+        f"{summary['resumed']} resumed, {summary['reconnects']} reconnects | {summary['calls_per_sec']} calls/s over {summary['seconds']}s | "
+        f"latency p50 {summary['p50_ms']}ms p95 {summary['p95_ms']}ms p99 {summary['p99_ms']}ms max {summary['max_ms']}ms",
+        file=sys.stderr,
+    )
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
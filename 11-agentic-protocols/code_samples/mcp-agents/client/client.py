@@ -6,9 +6,9 @@ Interactive MCP Client for Agent-to-Agent Communication Tutorial
 import asyncio
 import argparse
 import logging
-from typing import Dict, Any
+from typing import Any, Optional
 
-from mcp import ClientSession
+from mcp.shared.exceptions import McpError
 from mcp.client.streamable_http import streamablehttp_client
 from mcp.server.streamable_http import MCP_SESSION_ID_HEADER, MCP_PROTOCOL_VERSION_HEADER
 from mcp.shared.message import ClientMessageMetadata
@@ -16,7 +16,9 @@ import mcp.types as types
 from rich.console import Console
 from rich.panel import Panel
 
-from .utils import TokenManager, cast_input_value
+from .jobs import JobManager, ToolJob, RUNNING
+from .token_store import TOKEN_STORE_BACKENDS, PendingCall, TokenStore, create_token_store
+from .utils import TrackedClientSession, cast_input_value
 
 console = Console()
 
@@ -31,6 +33,84 @@ def display_tools(tools):
     console.print("[dim]Type a tool name to run it with default arguments[/dim]")
 
 
+async def read_input(prompt: str) -> str:
+    """Read a line in a worker thread, so background jobs keep running while the user types."""
+    return (await asyncio.to_thread(console.input, prompt)).strip()
+
+
+async def collect_tool_args(tool) -> Optional[dict]:
+    """Prompt for a tool's arguments; None if a required one was left empty."""
+    args = {}
+    if not (tool.inputSchema and tool.inputSchema.get("properties")):
+        return args
+    console.print(f"[dim]Tool '{tool.name}' parameters:[/dim]")
+    for prop_name, prop_info in tool.inputSchema["properties"].items():
+        required = prop_name in tool.inputSchema.get("required", [])
+        default = prop_info.get("default", "")
+        desc = prop_info.get("description", "")
+
+        prompt = f"  {prop_name}"
+        if desc:
+            prompt += f" ({desc})"
+        if default:
+            prompt += f" [default: {default}]"
+        if required:
+            prompt += " [required]"
+        prompt += ": "
+
+        value = await read_input(prompt)
+        if value:
+            # Cast the input value to the correct type
+            args[prop_name] = cast_input_value(value, prop_info)
+        elif required and not default:
+            console.print(f"[red]❌ {prop_name} is required[/red]")
+            return None
+    return args
+
+
+async def ask_confirmation(params) -> types.ElicitResult:
+    """Ask the user to accept or decline an elicitation request."""
+    while True:
+        response = (await read_input("\n[bold]Do you accept? (y/n/details): [/bold]")).lower()
+
+        if response in ['y', 'yes', 'accept']:
+            user_notes = await read_input("[dim]Any additional notes (optional): [/dim]")
+            console.print(f"[dim]✅ Sending acceptance with notes: '{user_notes or 'Confirmed by user'}'[/dim]")
+            return types.ElicitResult(
+                action="accept",
+                content={
+                    "confirm": True, 
+                    "notes": user_notes if user_notes else "Confirmed by user"
+                }
+            )
+        elif response in ['n', 'no', 'decline']:
+            reason = await read_input("[dim]Reason for declining (optional): [/dim]")
+            return types.ElicitResult(
+                action="decline",
+                content={
+                    "confirm": False,
+                    "notes": reason if reason else "Declined by user"
+                }
+            )
+        elif response in ['d', 'details']:
+            console.print(f"[dim]Schema: {params.requestedSchema if hasattr(params, 'requestedSchema') else 'Not specified'}[/dim]")
+        else:
+            console.print("[red]Please enter 'y' (yes), 'n' (no), or 'd' (details)[/red]")
+
+
+def display_jobs(jobs: list[ToolJob]):
+    """Display background jobs with their status and latest progress."""
+    if not jobs:
+        console.print("[dim]No background jobs[/dim]")
+        return
+    console.print("[bold]Background Jobs:[/bold]")
+    for job in jobs:
+        color = "yellow" if job.status == RUNNING else "green" if job.status == "done" else "red"
+        latest = f" - {job.progress[-1]}" if job.progress else ""
+        resumed = " (resumed)" if job.resumed else ""
+        console.print(f"  [bold]{job.id}[/bold] [cyan]{job.tool}[/cyan]{resumed} [{color}]{job.status}[/{color}] {job.elapsed:.0f}s[dim]{latest}[/dim]")
+
+
 def extract_text_content(result) -> str:
     """Extract text content from tool result."""
     for content in result.content:
@@ -39,52 +119,45 @@ def extract_text_content(result) -> str:
     return "No text content available"
 
 
-async def execute_tool_with_resumption(session, command: str, args: dict, get_session_id, on_resumption_token_update, existing_tokens=None, token_manager=None):
-    """Execute a tool with resumption support using send_request."""
-    current_session_id = get_session_id()
-    if not current_session_id:
+async def execute_tool_with_resumption(session, command: str, args: dict, get_session_id, token_store: TokenStore, protocol_version: Optional[str] = None):
+    """Execute a tool, keeping its latest resumption token in the token store until it finishes."""
+    session_id = get_session_id()
+    if not session_id:
         raise RuntimeError("No session ID available - resumption requires a valid session")
     
-    session_id = current_session_id
+    request_id = session.next_request_id
     
-    # If we have an existing resumption token, pass it for resumption
-    if existing_tokens and existing_tokens.get("resumption_token"):
-        metadata = ClientMessageMetadata(
-            resumption_token=existing_tokens["resumption_token"],
-        )
-    else:
-        # Create enhanced callback that saves tool context immediately when token is received
-        def enhanced_callback(token: str):
-            # Since callback fires immediately with the actual resumption token,
-            # save everything needed for resumption right away
-            protocol_version = getattr(session, 'protocol_version', None)
-            if token_manager:
-                token_manager.save_tokens(session_id, token, protocol_version, command, args)
-            # Also call the original callback
-            return on_resumption_token_update(session_id, token, command, args)
-        
-        metadata = ClientMessageMetadata(
-            on_resumption_token_update=enhanced_callback,
-        )
+    async def on_resumption_token_update(token: str) -> None:
+        token_store.save(session_id, request_id, token, command, args, protocol_version)
     
-    result = await session.send_request(
-        types.ClientRequest(
-            types.CallToolRequest(
-                method="tools/call",
-                params=types.CallToolRequestParams(
-                    name=command,
-                    arguments=args
-                ),
-            )
-        ),
-        types.CallToolResult,
-        metadata=metadata,
+    metadata = ClientMessageMetadata(
+        on_resumption_token_update=on_resumption_token_update,
     )
     
+    try:
+        result = await session.send_request(
+            types.ClientRequest(
+                types.CallToolRequest(
+                    method="tools/call",
+                    params=types.CallToolRequestParams(
+                        name=command,
+                        arguments=args
+                    ),
+                )
+            ),
+            types.CallToolResult,
+            metadata=metadata,
+        )
+    except McpError:
+        # The server answered, so there is nothing left to resume
+        token_store.remove(session_id, request_id)
+        raise
+    
+    token_store.remove(session_id, request_id)
     return result
 
 
-async def interactive_mode(server_url: str):
+async def interactive_mode(server_url: str, token_store: TokenStore):
     """Run interactive mode with tool exploration."""
     # Configure logging to suppress noisy SSE parsing errors
     logging.getLogger('mcp.client.streamable_http').setLevel(logging.ERROR)
@@ -107,17 +180,25 @@ async def interactive_mode(server_url: str):
     console.print(Panel("[bold cyan]🎮 Interactive MCP Client[/bold cyan]", expand=False))
     console.print("[dim]Explore MCP server tools interactively[/dim]\n")
     
-    # Check for existing resumption tokens
-    token_manager = TokenManager()
-    existing_tokens: Dict[str, Any] | None = token_manager.load_tokens()
+    # Check for calls that were still running when the client last stopped
+    resume_session = token_store.latest_session()
+    pending_calls: list[PendingCall] = token_store.pending(resume_session)
+    other_calls = len(token_store.pending()) - len(pending_calls)
     
     # Prepare headers for resumption if tokens exist
     headers = {}
-    if existing_tokens:
-        headers[MCP_SESSION_ID_HEADER] = existing_tokens["session_id"]
-        if "protocol_version" in existing_tokens:
-            headers[MCP_PROTOCOL_VERSION_HEADER] = existing_tokens["protocol_version"]
-        console.print(f"[cyan]🔄 Found existing session, attempting resumption...[/cyan]")
+    if pending_calls:
+        headers[MCP_SESSION_ID_HEADER] = resume_session
+        if pending_calls[-1].protocol_version:
+            headers[MCP_PROTOCOL_VERSION_HEADER] = pending_calls[-1].protocol_version
+        console.print(f"[cyan]🔄 Found {len(pending_calls)} pending call(s), attempting resumption...[/cyan]")
+        if other_calls:
+            console.print(f"[dim]{other_calls} pending call(s) of other sessions stay in the token store ('clean-tokens' to drop them)[/dim]")
+    
+    job_manager: Optional[JobManager] = None
+    # Elicitation requests that arrive while the prompt is waiting for a command
+    pending_questions: list[tuple[Any, asyncio.Future]] = []
+    reading_command = False
     
     try:
         async with streamablehttp_client(
@@ -130,6 +211,8 @@ async def interactive_mode(server_url: str):
             async def message_handler(message) -> None:
                 try:
                     if isinstance(message, types.ServerNotification):
+                        if job_manager is not None and job_manager.route_notification(message):
+                            return
                         if isinstance(message.root, types.LoggingMessageNotification):
                             console.print(f"📡 [dim]{message.root.params.data}[/dim]")
                         elif isinstance(message.root, types.ProgressNotification):
@@ -172,111 +255,47 @@ async def interactive_mode(server_url: str):
                     console.print(f"\n💬 [bold yellow]Server is asking for confirmation:[/bold yellow]")
                     console.print(f"   [cyan]{params.message}[/cyan]")
                     
+                    if reading_command:
+                        # A background job is asking while the prompt is already reading a line
+                        answer = asyncio.get_running_loop().create_future()
+                        pending_questions.append((params, answer))
+                        console.print("[dim]Type 'answer' to respond[/dim]")
+                        return await answer
+                    
                     # Get user's decision
-                    while True:
-                        response = console.input("\n[bold]Do you accept? (y/n/details): [/bold]").strip().lower()
-                        
-                        if response in ['y', 'yes', 'accept']:
-                            user_notes = console.input("[dim]Any additional notes (optional): [/dim]").strip()
-                            console.print(f"[dim]✅ Sending acceptance with notes: '{user_notes or 'Confirmed by user'}'[/dim]")
-                            return types.ElicitResult(
-                                action="accept",
-                                content={
-                                    "confirm": True, 
-                                    "notes": user_notes if user_notes else "Confirmed by user"
-                                }
-                            )
-                        elif response in ['n', 'no', 'decline']:
-                            reason = console.input("[dim]Reason for declining (optional): [/dim]").strip()
-                            return types.ElicitResult(
-                                action="decline",
-                                content={
-                                    "confirm": False,
-                                    "notes": reason if reason else "Declined by user"
-                                }
-                            )
-                        elif response in ['d', 'details']:
-                            console.print(f"[dim]Schema: {params.requestedSchema if hasattr(params, 'requestedSchema') else 'Not specified'}[/dim]")
-                        else:
-                            console.print("[red]Please enter 'y' (yes), 'n' (no), or 'd' (details)[/red]")
+                    return await ask_confirmation(params)
                             
                 except Exception as e:
                     console.print(f"[red]Error in elicitation: {e}[/red]")
                     return types.ElicitResult(action="decline", content={"confirm": False, "notes": f"Error: {e}"})
             
-            # Add resumption token callback for long-running tools
-            async def on_resumption_token_update(session_id: str, resumption_token: str, tool_name: str, tool_args: dict):
-                """Callback for when resumption token is updated during long-running operations."""
-                # Save the updated token with tool information
-                protocol_version = existing_tokens.get("protocol_version") if existing_tokens else None
-                token_manager.save_tokens(session_id, resumption_token, protocol_version, tool_name, tool_args)
-            
-            async with ClientSession(
+            async with TrackedClientSession(
                 read_stream, 
                 write_stream, 
                 message_handler=message_handler,
                 sampling_callback=sampling_callback,
                 elicitation_callback=elicitation_callback
             ) as session:
+                # The resumed calls keep their IDs on the server; new requests must not reuse them
+                session.skip_request_ids(call.request_id for call in pending_calls)
                 
                 # Handle resumption vs new session based on tokens
-                if existing_tokens and existing_tokens.get("resumption_token") and existing_tokens.get("last_tool") and existing_tokens.get("last_args"):
-                    # RESUMPTION FLOW: We have everything needed for resumption
+                if pending_calls:
+                    # RESUMPTION FLOW: Calls were still running when the client stopped
                     console.print(f"[cyan]🔄 Resuming existing session...[/cyan]")
-                    console.print(f"[cyan]   Session ID: {existing_tokens['session_id']}[/cyan]")
-                    console.print(f"[cyan]   Resuming tool: {existing_tokens['last_tool']}[/cyan]")
-                    console.print(f"[green]✅ Skipping initialization, directly resuming...[/green]")
-                    
+                    console.print(f"[cyan]   Session ID: {resume_session}[/cyan]")
+                    console.print(f"[green]✅ Skipping initialization...[/green]")
                     try:
-                        # Directly resume the tool execution with cached data
-                        result = await execute_tool_with_resumption(
-                            session, 
-                            existing_tokens["last_tool"], 
-                            existing_tokens["last_args"], 
-                            get_session_id, 
-                            on_resumption_token_update, 
-                            existing_tokens,  # Pass existing tokens for resumption
-                            token_manager
-                        )
-                        console.print(f"[green]✅ Resumed tool completed successfully![/green]")
-                        console.print(f"[green]Result:[/green]")
-                        console.print(f"   {extract_text_content(result)}")
-                        
-                        # Task completed successfully, clean up tokens
-                        if token_manager.delete_tokens():
-                            console.print(f"[dim]🧹 Cleaned up resumption tokens[/dim]")
-                        
-                        # After successful resumption, continue with normal interactive flow
-                        console.print("\n[cyan]📋 Loading available tools for continued interaction...[/cyan]")
                         tools_result = await session.list_tools()
-                        tools = tools_result.tools
-                        tools_dict = {tool.name: tool for tool in tools}
-                        display_tools(tools)
-                        
-                    except Exception as resume_error:
-                        error_msg = str(resume_error)
-                        if "ValidationError" in error_msg and "JSON" in error_msg:
-                            console.print(f"[yellow]⚠️ Resumed tool completed with connection issues, but likely succeeded[/yellow]")
-                            # Even if there was a connection issue, task likely completed
-                            if token_manager.delete_tokens():
-                                console.print(f"[dim]🧹 Cleaned up resumption tokens[/dim]")
-                            
-                            # Load tools for continued interaction
-                            console.print("\n[cyan]📋 Loading available tools for continued interaction...[/cyan]")
-                            tools_result = await session.list_tools()
-                            tools = tools_result.tools
-                            tools_dict = {tool.name: tool for tool in tools}
-                            display_tools(tools)
-                        else:
-                            console.print(f"[red]❌ Resume failed: {resume_error}[/red]")
-                            console.print(f"[yellow]Falling back to normal initialization...[/yellow]")
-                            # Fallback to normal initialization
-                            result = await session.initialize()
-                            console.print(f"[green]✅ Connected to: {result.serverInfo.name}[/green]")
-                            tools_result = await session.list_tools()
-                            tools = tools_result.tools
-                            tools_dict = {tool.name: tool for tool in tools}
-                            display_tools(tools)
+                    except McpError as resume_error:
+                        console.print(f"[red]❌ Resume failed: {resume_error}[/red]")
+                        for call in pending_calls:
+                            token_store.remove(call.session_id, call.request_id)
+                        console.print("[yellow]The session has ended; its calls were dropped. Restart the client to open a new session.[/yellow]")
+                        return
+                    tools = tools_result.tools
+                    tools_dict = {tool.name: tool for tool in tools}
+                    display_tools(tools)
                 else:
                     # NORMAL FLOW: No resumption tokens, do full initialization
                     console.print("[cyan]🔌 Connecting to server...[/cyan]")
@@ -299,16 +318,89 @@ async def interactive_mode(server_url: str):
                     
                     display_tools(tools)
                 
+                def current_session_id() -> Optional[str]:
+                    # Before the server's first response the resumed session is only in our headers
+                    return get_session_id() or headers.get(MCP_SESSION_ID_HEADER)
+                
+                def print_job_output(job: ToolJob, line: str):
+                    console.print(f"[magenta]\\[job {job.id} {job.tool}][/magenta] {line}")
+                
+                protocol_version = headers.get(MCP_PROTOCOL_VERSION_HEADER)
+                if not pending_calls:
+                    protocol_version = str(result.protocolVersion)
+                job_manager = JobManager(session, current_session_id, protocol_version, token_store, print_job_output)
+                
+                # Every pending call is resumed as a background job
+                for call in pending_calls:
+                    job = job_manager.start(call.tool, call.args, saved=call)
+                    console.print(f"[cyan]🔄 Resuming job {job.id}: {job.tool}[/cyan]")
+                
                 # Interactive command loop
-                console.print("\n[dim]Commands: [tool_name], 'list', 'help', 'clean-tokens', 'quit'[/dim]")
+                console.print("\n[dim]Commands: [tool_name], 'bg <tool_name>', 'jobs', 'list', 'help', 'clean-tokens', 'quit'[/dim]")
                 
                 while True:
                     try:
-                        command = console.input("\n[bold blue]> [/bold blue]").strip()
+                        reading_command = True
+                        try:
+                            command = await read_input("\n[bold blue]> [/bold blue]")
+                        finally:
+                            reading_command = False
+                        name, _, job_arg = command.partition(" ")
+                        job_arg = job_arg.strip()
                         
                         if command.lower() in ['quit', 'exit', 'q']:
+                            if any(job.status == RUNNING for job in job_manager.jobs):
+                                console.print("[dim]Running jobs keep going on the server and resume on the next start[/dim]")
                             console.print("[yellow]👋 Goodbye![/yellow]")
                             break
+                        
+                        elif command.lower() == 'answer':
+                            if not pending_questions:
+                                console.print("[yellow]No questions waiting for an answer[/yellow]")
+                                continue
+                            params, answer = pending_questions.pop(0)
+                            console.print(f"   [cyan]{params.message}[/cyan]")
+                            response = await ask_confirmation(params)
+                            if not answer.done():
+                                answer.set_result(response)
+                        
+                        elif name == 'bg' and job_arg:
+                            if job_arg not in tools_dict:
+                                console.print(f"[red]❌ Unknown tool: '{job_arg}'[/red]")
+                                continue
+                            args = await collect_tool_args(tools_dict[job_arg])
+                            if args is not None:
+                                job = job_manager.start(job_arg, args)
+                                console.print(f"[cyan]🚀 Started job {job.id}: {job_arg}[/cyan] [dim]('attach {job.id}' to follow it)[/dim]")
+                        
+                        elif command.lower() == 'jobs':
+                            display_jobs(job_manager.jobs)
+                        
+                        elif name in ['attach', 'detach', 'cancel', 'collect']:
+                            job = job_manager.get(int(job_arg)) if job_arg.isdigit() else None
+                            if job is None:
+                                console.print(f"[red]❌ No job '{job_arg}' - type 'jobs' to list them[/red]")
+                            elif name == 'attach':
+                                for line in job.progress:
+                                    print_job_output(job, line)
+                                job.attached = True
+                                console.print(f"[dim]Attached to job {job.id}, 'detach {job.id}' to stop following it[/dim]")
+                            elif name == 'detach':
+                                job.attached = False
+                            elif name == 'cancel':
+                                if await job_manager.cancel(job.id):
+                                    console.print(f"[yellow]🛑 Cancelled job {job.id}[/yellow]")
+                                else:
+                                    console.print(f"[yellow]Job {job.id} is already {job.status}[/yellow]")
+                            else:
+                                if job.status == RUNNING:
+                                    console.print(f"[dim]Waiting for job {job.id}...[/dim]")
+                                await job_manager.collect(job.id)
+                                if job.result is not None:
+                                    console.print(f"[green]✅ Job {job.id} result:[/green]")
+                                    console.print(f"   {extract_text_content(job.result)}")
+                                else:
+                                    console.print(f"[red]❌ Job {job.id} {job.status}: {job.error or 'no result'}[/red]")
                             
                         elif command.lower() in ['list', 'l']:
                             display_tools(tools)
@@ -317,6 +409,12 @@ async def interactive_mode(server_url: str):
                             console.print("[bold]Available Commands:[/bold]")
                             console.print("  [cyan]list[/cyan] or [cyan]l[/cyan] - Show available tools")
                             console.print("  [cyan][tool_name][/cyan] - Execute a tool")
+                            console.print("  [cyan]bg <tool_name>[/cyan] - Execute a tool as a background job")
+                            console.print("  [cyan]jobs[/cyan] - Show background jobs")
+                            console.print("  [cyan]attach <id>[/cyan] / [cyan]detach <id>[/cyan] - Follow a job's progress, or stop following it")
+                            console.print("  [cyan]cancel <id>[/cyan] - Cancel a running job")
+                            console.print("  [cyan]collect <id>[/cyan] - Wait for a job and show its result")
+                            console.print("  [cyan]answer[/cyan] - Answer a job's pending confirmation request")
                             console.print("  [cyan]help[/cyan] or [cyan]h[/cyan] - Show this help")
                             console.print("  [cyan]clean-tokens[/cyan] - Delete resumption tokens")
                             console.print("  [cyan]quit[/cyan] or [cyan]q[/cyan] - Exit")
@@ -326,87 +424,30 @@ async def interactive_mode(server_url: str):
                                     console.print(f"  🤖 [yellow]{tool.name}[/yellow]")
                         
                         elif command.lower() in ['clean-tokens', 'clean']:
-                            if token_manager.delete_tokens():
+                            if token_store.clear():
                                 console.print("[green]✅ Resumption tokens cleared[/green]")
                             else:
                                 console.print("[yellow]No tokens to clear[/yellow]")
                             
                         elif command in tools_dict:
-                            tool = tools_dict[command]
+                            args = await collect_tool_args(tools_dict[command])
+                            if args is None:
+                                continue
+                            console.print(f"[cyan]🔧 Executing {command}...[/cyan]")
                             
-                            # Collect arguments
-                            args = {}
-                            if tool.inputSchema and tool.inputSchema.get("properties"):
-                                console.print(f"[dim]Tool '{command}' parameters:[/dim]")
-                                for prop_name, prop_info in tool.inputSchema["properties"].items():
-                                    required = prop_name in tool.inputSchema.get("required", [])
-                                    default = prop_info.get("default", "")
-                                    desc = prop_info.get("description", "")
-                                    
-                                    prompt = f"  {prop_name}"
-                                    if desc:
-                                        prompt += f" ({desc})"
-                                    if default:
-                                        prompt += f" [default: {default}]"
-                                    if required:
-                                        prompt += " [required]"
-                                    prompt += ": "
-                                    
-                                    value = console.input(prompt).strip()
-                                    if value:
-                                        # Cast the input value to the correct type
-                                        args[prop_name] = cast_input_value(value, prop_info)
-                                    elif required and not default:
-                                        console.print(f"[red]❌ {prop_name} is required[/red]")
-                                        break
-                                else:
-                                    # All required args collected, execute tool
-                                    console.print(f"[cyan]🔧 Executing {command}...[/cyan]")
-                                    
-                                    try:
-                                        result = await execute_tool_with_resumption(
-                                            session, command, args, get_session_id, on_resumption_token_update, existing_tokens, token_manager
-                                        )
-                                        console.print(f"[green]✅ Result:[/green]")
-                                        console.print(f"   {extract_text_content(result)}")
-                                        
-                                        # Task completed successfully, clean up tokens
-                                        if token_manager.delete_tokens():
-                                            console.print(f"[dim]🧹 Cleaned up resumption tokens[/dim]")
-                                        
-                                    except Exception as tool_error:
-                                        error_msg = str(tool_error)
-                                        if "ValidationError" in error_msg and "JSON" in error_msg:
-                                            console.print(f"[yellow]⚠️ Tool completed with connection issues, but likely succeeded[/yellow]")
-                                            # Even if there was a connection issue, task likely completed
-                                            if token_manager.delete_tokens():
-                                                console.print(f"[dim]🧹 Cleaned up resumption tokens[/dim]")
-                                        else:
-                                            console.print(f"[red]❌ Tool failed: {tool_error}[/red]")
-                            else:
-                                # No parameters needed, execute tool
-                                console.print(f"[cyan]🔧 Executing {command}...[/cyan]")
+                            try:
+                                result = await execute_tool_with_resumption(
+                                    session, command, args, current_session_id, token_store, protocol_version
+                                )
+                                console.print(f"[green]✅ Result:[/green]")
+                                console.print(f"   {extract_text_content(result)}")
                                 
-                                try:
-                                    result = await execute_tool_with_resumption(
-                                        session, command, {}, get_session_id, on_resumption_token_update, existing_tokens, token_manager
-                                    )
-                                    console.print(f"[green]✅ Result:[/green]")
-                                    console.print(f"   {extract_text_content(result)}")
-                                    
-                                    # Task completed successfully, clean up tokens
-                                    if token_manager.delete_tokens():
-                                        console.print(f"[dim]🧹 Cleaned up resumption tokens[/dim]")
-                                    
-                                except Exception as tool_error:
-                                    error_msg = str(tool_error)
-                                    if "ValidationError" in error_msg and "JSON" in error_msg:
-                                        console.print(f"[yellow]⚠️ Tool completed with connection issues, but likely succeeded[/yellow]")
-                                        # Even if there was a connection issue, task likely completed
-                                        if token_manager.delete_tokens():
-                                            console.print(f"[dim]🧹 Cleaned up resumption tokens[/dim]")
-                                    else:
-                                        console.print(f"[red]❌ Tool failed: {tool_error}[/red]")
+                            except Exception as tool_error:
+                                error_msg = str(tool_error)
+                                if "ValidationError" in error_msg and "JSON" in error_msg:
+                                    console.print(f"[yellow]⚠️ Tool completed with connection issues, but likely succeeded[/yellow]")
+                                else:
+                                    console.print(f"[red]❌ Tool failed: {tool_error}[/red]")
                         
                         else:
                             console.print(f"[red]❌ Unknown command: '{command}'[/red]")
@@ -415,9 +456,14 @@ async def interactive_mode(server_url: str):
                     except KeyboardInterrupt:
                         console.print("\n[yellow]👋 Interrupted![/yellow]")
                         break
+                
+                # Running jobs keep their tokens so the next start resumes them
+                await job_manager.aclose()
     
     except Exception as e:
         console.print(f"[red]❌ Connection error: {e}[/red]")
+    finally:
+        token_store.close()
 
 
 async def main():
@@ -425,19 +471,23 @@ async def main():
     parser = argparse.ArgumentParser(description="Interactive MCP Client")
     parser.add_argument("--url", default="http://127.0.0.1:8006/mcp", help="MCP server URL")
     parser.add_argument("--clean-tokens", action="store_true", help="Delete existing resumption tokens and start fresh")
+    parser.add_argument("--token-store", choices=sorted(TOKEN_STORE_BACKENDS), default="json",
+                        help="Where resumption tokens are kept (default: json)")
+    parser.add_argument("--token-file", help="Token store file (default: resumption_tokens.json or resumption_tokens.db)")
     
     args = parser.parse_args()
+    token_store = create_token_store(args.token_store, args.token_file)
     
     # Handle token cleaning
     if args.clean_tokens:
-        token_manager = TokenManager()
-        if token_manager.delete_tokens():
+        if token_store.clear():
             console.print("[green]✅ Resumption tokens cleared[/green]")
         else:
             console.print("[yellow]No tokens to clear[/yellow]")
+        token_store.close()
         return
     
-    await interactive_mode(args.url)
+    await interactive_mode(args.url, token_store)
 
 
 if __name__ == "__main__":
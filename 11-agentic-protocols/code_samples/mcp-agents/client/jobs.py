@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Background Tool Jobs for the Interactive MCP Client
+
+Runs tool calls as background tasks on one ClientSession, so several
+long-running tools can make progress while the user keeps typing commands.
+Each job has an ID, its own buffer of progress messages and a resumption
+token kept in the client's token store, so all of them can be resumed
+after the client restarts.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import mcp.types as types
+from mcp.shared.message import ClientMessageMetadata
+
+from .token_store import PendingCall, TokenStore
+from .utils import TrackedClientSession
+
+# Progress lines kept per job for 'attach'
+PROGRESS_HISTORY = 50
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class ToolJob:
+    """A tool call running in the background."""
+
+    def __init__(self, job_id: int, tool: str, args: dict, request_id: Optional[int] = None) -> None:
+        self.id = job_id
+        self.tool = tool
+        self.args = args
+        # Server-side ID of the call, used to route its progress and to cancel it
+        self.request_id = request_id
+        self.status = RUNNING
+        self.result: Optional[types.CallToolResult] = None
+        self.error: Optional[BaseException] = None
+        self.progress: deque[str] = deque(maxlen=PROGRESS_HISTORY)
+        self.attached = False
+        self.resumed = False
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+
+class JobManager:
+    """
+    Starts, tracks, cancels and collects background tool calls on one session.
+
+    - session: the initialized session the calls are sent on
+    - get_session_id: returns the transport's current session ID
+    - protocol_version: the negotiated protocol version, saved with the tokens
+    - token_store: where the resumption tokens of running jobs are saved
+    - on_output: called with (job, line) for progress of attached jobs and
+      when a job finishes
+    """
+
+    def __init__(
+        self,
+        session: TrackedClientSession,
+        get_session_id: Callable[[], Optional[str]],
+        protocol_version: Optional[str],
+        token_store: TokenStore,
+        on_output: Callable[[ToolJob, str], None],
+    ) -> None:
+        self._session = session
+        self._get_session_id = get_session_id
+        self._protocol_version = protocol_version
+        self._token_store = token_store
+        self._on_output = on_output
+        self._jobs: dict[int, ToolJob] = {}
+        self._next_id = 1
+        self._closing = False
+
+    @property
+    def jobs(self) -> list[ToolJob]:
+        return list(self._jobs.values())
+
+    def get(self, job_id: int) -> Optional[ToolJob]:
+        return self._jobs.get(job_id)
+
+    def start(self, tool: str, args: dict, saved: Optional[PendingCall] = None) -> ToolJob:
+        """Start a tool call in the background, or resume a pending call from the token store."""
+        job = ToolJob(self._next_id, tool, args, saved.request_id if saved else None)
+        self._next_id += 1
+        job.resumed = saved is not None
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, saved.resumption_token if saved else None))
+        return job
+
+    async def _run(self, job: ToolJob, resumption_token: Optional[str]) -> None:
+        session_id = self._get_session_id()
+
+        async def on_token(token: str) -> None:
+            # The transport may still deliver events after the job was cancelled
+            if job.status != RUNNING:
+                return
+            self._token_store.save(session_id, job.request_id, token, job.tool, job.args, self._protocol_version)
+
+        metadata = ClientMessageMetadata(resumption_token=resumption_token, on_resumption_token_update=on_token)
+        if not resumption_token:
+            job.request_id = self._session.next_request_id
+
+        try:
+            job.result = await self._session.send_request(
+                types.ClientRequest(
+                    types.CallToolRequest(
+                        method="tools/call",
+                        params=types.CallToolRequestParams(name=job.tool, arguments=job.args),
+                    )
+                ),
+                types.CallToolResult,
+                metadata=metadata,
+            )
+            job.status = FAILED if job.result.isError else DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            raise
+        except Exception as e:
+            job.status = FAILED
+            job.error = e
+        finally:
+            job.finished = time.monotonic()
+            if not self._closing:
+                self._token_store.remove(session_id, job.request_id)
+            if job.status != CANCELLED:
+                self._on_output(job, f"finished ({job.status}) after {job.elapsed:.0f}s - 'collect {job.id}'")
+
+    def route_notification(self, notification: types.ServerNotification) -> bool:
+        """Record a progress or log notification under the job it belongs to; False if it belongs to none."""
+        root = notification.root
+        if isinstance(root, types.ProgressNotification):
+            params = root.params
+            job = next((j for j in self._jobs.values() if j.request_id == params.progressToken), None)
+            total = f"/{params.total:g}" if params.total else ""
+            line = f"{params.message or 'progress'} ({params.progress:g}{total})"
+        elif isinstance(root, types.LoggingMessageNotification):
+            # Log messages carry no request ID; attribute them when only one running job has that logger
+            candidates = [j for j in self._jobs.values() if j.status == RUNNING and j.tool == root.params.logger]
+            job = candidates[0] if len(candidates) == 1 else None
+            line = str(root.params.data)
+        else:
+            return False
+        if job is None:
+            return False
+        job.progress.append(line)
+        if job.attached:
+            self._on_output(job, line)
+        return True
+
+    async def cancel(self, job_id: int) -> bool:
+        """Cancel a running job locally and ask the server to stop it; False if it is not running."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status != RUNNING:
+            return False
+        if job.request_id is not None:
+            await self._session.send_notification(
+                types.ClientNotification(
+                    types.CancelledNotification(
+                        params=types.CancelledNotificationParams(
+                            requestId=job.request_id, reason="Cancelled by user"
+                        )
+                    )
+                )
+            )
+        job.task.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+        return True
+
+    async def collect(self, job_id: int) -> Optional[ToolJob]:
+        """Wait for a job to finish and stop tracking it; None if there is no such job."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        await asyncio.gather(job.task, return_exceptions=True)
+        del self._jobs[job_id]
+        return job
+
+    async def aclose(self) -> None:
+        """Stop waiting for running jobs, keeping their tokens so they can be resumed later."""
+        self._closing = True
+        running = [job.task for job in self._jobs.values() if not job.task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
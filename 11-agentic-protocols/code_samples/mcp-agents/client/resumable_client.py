@@ -5,7 +5,11 @@ Minimal Resumable MCP Client
 Simple client that demonstrates session resumption with the long_running_agent tool.
 - If resumption token exists, resumes the session
 - If no token exists, creates new session and saves token
+- If the stream drops, reconnects with backoff and resumes in the same process
 - Clears token when task completes
+
+Run from the mcp-agents directory:
+    python client/resumable_client.py --url http://127.0.0.1:8006/mcp
 """
 
 import argparse
@@ -13,12 +17,17 @@ import asyncio
 import json
 import logging
 import os
+import random
+import time
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+import anyio
+import httpx
 from mcp import ClientSession, types
 from mcp.client.streamable_http import streamablehttp_client
 from mcp.server.streamable_http import MCP_SESSION_ID_HEADER, MCP_PROTOCOL_VERSION_HEADER
+from mcp.shared.exceptions import McpError
 from mcp.shared.message import ClientMessageMetadata
 from mcp.types import TextContent
 
@@ -48,6 +57,15 @@ for logger_name in ['mcp.client.streamable_http', 'mcp', 'pydantic_core']:
 # Token file location
 TOKEN_FILE = Path(".mcp_resumption_token.json")
 
+# Reconnect policy: seconds before the first retry, doubled up to MAX_DELAY and jittered
+DEFAULT_INITIAL_DELAY = 0.5
+DEFAULT_MAX_DELAY = 10.0
+# Give up once a drop has lasted this long; shorter than the server's default
+# --abandon-after of 60 seconds, after which the session no longer exists
+DEFAULT_MAX_RETRY_TIME = 50.0
+# The long_running_agent reports every 2 seconds
+DEFAULT_STALL_TIMEOUT = 15.0
+
 
 def load_resumption_tokens() -> Optional[Dict[str, Any]]:
     """Load resumption tokens from file."""
@@ -89,111 +107,285 @@ def clear_resumption_tokens():
             logger.error(f"Error clearing tokens: {e}")
 
 
-async def run_long_running_task(server_url: str):
-    """Run the long_running_agent with resumption support."""
-    
-    # Check for existing tokens
-    existing_tokens = load_resumption_tokens()
-    
-    # Prepare headers for resumption if tokens exist
-    headers = {}
-    if existing_tokens:
-        headers[MCP_SESSION_ID_HEADER] = existing_tokens["session_id"]
-        headers[MCP_PROTOCOL_VERSION_HEADER] = existing_tokens.get("protocol_version", "2025-03-26")
-        print("🔄 Resuming existing session...")
-    else:
-        print("🆕 Creating new session...")
-    
-    try:
-        async with streamablehttp_client(
-            server_url,
-            headers=headers if headers else None,
-            terminate_on_close=False  # Enable resumption
-        ) as (read_stream, write_stream, get_session_id):
-            
-            # Message handler for real-time notifications (standardized to use log messages)
-            async def message_handler(message) -> None:
-                try:
-                    if isinstance(message, types.ServerNotification):
-                        if isinstance(message.root, types.LoggingMessageNotification):
-                            log_data = message.root.params
-                            # Format log messages similar to progress notifications for consistency
-                            print(f"📡 [{log_data.logger}] {log_data.data}")
-                        elif isinstance(message.root, types.ProgressNotification):
-                            # Keep support for progress notifications in case other tools use them
-                            progress = message.root.params
-                            print(f"📊 Progress: {progress.progress}/{progress.total} - {progress.message}")
-                        elif isinstance(message.root, types.ResourceUpdatedNotification):
-                            print(f"🔄 Resource updated: {message.root.params.uri}")
-                except Exception:
-                    # Silently ignore message handler errors to avoid breaking the flow
-                    pass
-            
-            async with ClientSession(read_stream, write_stream, message_handler=message_handler) as session:
-                
-                # Only initialize if this is a new session (no existing tokens)
-                if not existing_tokens:
+def innermost_error(error: BaseException) -> BaseException:
+    """Unwrap task group errors that hold a single exception."""
+    while len(getattr(error, "exceptions", ())) == 1:
+        error = error.exceptions[0]
+    return error
+
+
+def describe_error(error: BaseException) -> str:
+    """Message of an error, unwrapping task group errors that hold a single exception."""
+    error = innermost_error(error)
+    return str(error) or type(error).__name__
+
+
+class StreamStalled(Exception):
+    """No event arrived for the call within the stall timeout."""
+
+
+class RecoveryFailed(Exception):
+    """The call could not be resumed within the retry budget."""
+
+
+class SessionEnded(Exception):
+    """The server no longer knows the session, so its call cannot be resumed."""
+
+
+class RecoveryMetrics:
+    """How often the stream dropped and how long each drop took to recover."""
+
+    def __init__(self) -> None:
+        self.drops = 0
+        self.attempts = 0
+        # Seconds from each drop to the first event after it
+        self.recover_times: list[float] = []
+
+    def summary(self) -> str:
+        if not self.drops:
+            return "no stream drops"
+        times = sorted(self.recover_times)
+        text = f"{self.drops} drops, {len(times)} recovered, {self.attempts} reconnect attempts"
+        if times:
+            text += f", time to recover avg {sum(times) / len(times):.1f}s max {times[-1]:.1f}s"
+        return text
+
+
+def is_stream_drop(error: BaseException) -> bool:
+    """True if every error in `error` (a task group may wrap several) means the stream was lost."""
+    nested = getattr(error, "exceptions", None)
+    if nested:
+        return all(is_stream_drop(e) for e in nested)
+    if isinstance(error, McpError):
+        return error.error.code == types.CONNECTION_CLOSED
+    if isinstance(error, httpx.HTTPStatusError):
+        # A proxy in front of a restarting server answers 502/503; 404 means the session is gone
+        return error.response.status_code >= 500
+    return isinstance(error, (StreamStalled, httpx.TransportError, anyio.ClosedResourceError,
+                              anyio.BrokenResourceError, anyio.EndOfStream))
+
+
+def is_session_gone(error: BaseException) -> bool:
+    """True if any error in `error` says the server does not know the session (404)."""
+    nested = getattr(error, "exceptions", None)
+    if nested:
+        return any(is_session_gone(e) for e in nested)
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 404
+    # The transport answers a POST that got a 404 with this error
+    return isinstance(error, McpError) and error.error.message == "Session terminated"
+
+
+class ResumeSupervisor:
+    """
+    Runs one tool call and keeps it going when its stream drops.
+
+    Each attempt opens a transport on the same session (initializing only
+    the first time) and resumes the call from its latest resumption token.
+    Between attempts it waits a random time up to an exponentially growing
+    delay (full jitter), so clients cut off together do not reconnect
+    together, and it gives up once a drop has lasted ``max_retry_time``
+    seconds. A stream that sends nothing for ``stall_timeout`` seconds
+    counts as dropped, since the transport stops retrying on its own after
+    a couple of attempts and leaves the call waiting.
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        tool_name: str,
+        tool_args: Dict[str, Any],
+        saved_tokens: Optional[Dict[str, Any]] = None,
+        max_retry_time: float = DEFAULT_MAX_RETRY_TIME,
+        initial_delay: float = DEFAULT_INITIAL_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        stall_timeout: float = DEFAULT_STALL_TIMEOUT,
+    ) -> None:
+        self.server_url = server_url
+        self.tool_name = tool_name
+        self.tool_args = tool_args
+        saved_tokens = saved_tokens or {}
+        self.session_id: Optional[str] = saved_tokens.get("session_id")
+        self.protocol_version: str = saved_tokens.get("protocol_version", "2025-03-26")
+        self.resumption_token: Optional[str] = saved_tokens.get("resumption_token")
+        self.max_retry_time = max_retry_time
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.stall_timeout = stall_timeout
+        self.metrics = RecoveryMetrics()
+        # Whether the call has been sent; once it has, only resuming it is safe
+        self._sent = self.resumption_token is not None
+        self._last_event = time.monotonic()
+        self._dropped_at: Optional[float] = None
+        self._drop_attempts = 0
+
+    async def run(self) -> types.CallToolResult:
+        """Run the call to completion.
+
+        Raises RecoveryFailed if a drop outlasts the retry budget, and SessionEnded if the server
+        has dropped the session (for example after its --abandon-after timeout).
+        """
+        while True:
+            try:
+                result = await self._attempt()
+                self._recovered()
+                return result
+            except Exception as e:
+                if is_session_gone(e):
+                    raise SessionEnded(
+                        f"Session {self.session_id} has ended on the server; the call cannot be resumed"
+                    ) from e
+                if not is_stream_drop(e):
+                    raise
+                if self._sent and not self.resumption_token:
+                    raise RecoveryFailed("Connection lost before the first event; the call cannot be resumed") from e
+                await self._backoff(e)
+
+    async def _backoff(self, error: BaseException) -> None:
+        now = time.monotonic()
+        if self._dropped_at is None:
+            # A stall is only noticed stall_timeout seconds in; count the outage from the last event
+            self._dropped_at = self._last_event if isinstance(innermost_error(error), StreamStalled) else now
+            self._drop_attempts = 0
+            self.metrics.drops += 1
+        delay = random.uniform(0, min(self.max_delay, self.initial_delay * 2 ** self._drop_attempts))
+        down_for = now - self._dropped_at
+        if down_for + delay > self.max_retry_time:
+            raise RecoveryFailed(
+                f"Gave up after {down_for:.0f}s of reconnecting (limit {self.max_retry_time:g}s): {describe_error(error)}"
+            ) from error
+        print(f"⚠️ Stream lost ({describe_error(error)}), reconnecting in {delay:.1f}s...")
+        await asyncio.sleep(delay)
+        self._drop_attempts += 1
+        self.metrics.attempts += 1
+
+    def _recovered(self) -> None:
+        if self._dropped_at is None:
+            return
+        elapsed = time.monotonic() - self._dropped_at
+        self.metrics.recover_times.append(elapsed)
+        print(f"🔁 Stream recovered after {elapsed:.1f}s (reconnect attempts: {self._drop_attempts})")
+        self._dropped_at = None
+
+    async def _on_token(self, token: str) -> None:
+        self.resumption_token = token
+        self._last_event = time.monotonic()
+        self._recovered()
+        save_resumption_tokens(self.session_id, token, self.protocol_version)
+
+    async def _on_message(self, message) -> None:
+        try:
+            if isinstance(message, types.ServerNotification):
+                self._last_event = time.monotonic()
+                if isinstance(message.root, types.LoggingMessageNotification):
+                    log_data = message.root.params
+                    print(f"📡 [{log_data.logger}] {log_data.data}")
+                elif isinstance(message.root, types.ProgressNotification):
+                    # Keep support for progress notifications in case other tools use them
+                    progress = message.root.params
+                    print(f"📊 Progress: {progress.progress}/{progress.total} - {progress.message}")
+                elif isinstance(message.root, types.ResourceUpdatedNotification):
+                    print(f"🔄 Resource updated: {message.root.params.uri}")
+        except Exception:
+            # Silently ignore message handler errors to avoid breaking the flow
+            pass
+
+    async def _attempt(self) -> types.CallToolResult:
+        headers = None
+        if self.session_id:
+            headers = {MCP_SESSION_ID_HEADER: self.session_id, MCP_PROTOCOL_VERSION_HEADER: self.protocol_version}
+        async with streamablehttp_client(self.server_url, headers=headers, terminate_on_close=False) as (
+            read_stream, write_stream, get_session_id
+        ):
+            async with ClientSession(read_stream, write_stream, message_handler=self._on_message) as session:
+                if self.session_id is None:
                     result = await session.initialize()
+                    self.session_id = get_session_id()
+                    self.protocol_version = str(result.protocolVersion)
                     print(f"✅ Session initialized: {result.serverInfo.name}")
-                else:
-                    print("✅ Using existing session (no initialization needed)")
-                
-                # Set up resumption token callback (matching test signature)
-                async def on_resumption_token_update(token: str) -> None:
-                    print(f"💾 Resumption token received: {token[:20]}...")
-                    session_id = get_session_id()
-                    if session_id:
-                        protocol_version = getattr(session, 'negotiated_protocol_version', '2025-03-26')
-                        save_resumption_tokens(session_id, token, protocol_version)
-                        print(f"💾 Resumption token saved")
-                
-                # Prepare metadata with resumption support
-                if existing_tokens and existing_tokens.get("resumption_token"):
-                    # Resume existing task
+
+                if self.resumption_token:
                     print("🔄 Resuming long-running task...")
-                    metadata = ClientMessageMetadata(
-                        resumption_token=existing_tokens["resumption_token"]
-                    )
                 else:
-                    # Start new task
                     print("🚀 Starting long-running task...")
-                    metadata = ClientMessageMetadata(
-                        on_resumption_token_update=on_resumption_token_update
-                    )
-                
-                # Execute the long_running_agent tool
-                try:
-                    print("metadata:", metadata)
-                    result = await session.send_request(
+                metadata = ClientMessageMetadata(
+                    resumption_token=self.resumption_token,
+                    on_resumption_token_update=self._on_token,
+                )
+                self._sent = True
+                self._last_event = time.monotonic()
+                request = asyncio.create_task(
+                    session.send_request(
                         types.ClientRequest(
                             types.CallToolRequest(
                                 method="tools/call",
-                                params=types.CallToolRequestParams(
-                                    name="long_running_agent",
-                                    arguments={}
-                                ),
+                                params=types.CallToolRequestParams(name=self.tool_name, arguments=self.tool_args),
                             )
                         ),
                         types.CallToolResult,
                         metadata=metadata,
                     )
-                    
-                    # Task completed successfully
-                    content_text = "Task completed"
-                    if result.content and len(result.content) > 0:
-                        first_content = result.content[0]
-                        if isinstance(first_content, TextContent):
-                            content_text = first_content.text
-                    
-                    print(f"✅ Task completed: {content_text}")
-                    clear_resumption_tokens()
-                    
-                except Exception as e:
-                    print(f"❌ Task failed: {e}")
-                    # Keep tokens in case we want to retry
-                    
+                )
+                return await self._wait(request)
+
+    async def _wait(self, request: asyncio.Task) -> types.CallToolResult:
+        """Wait for `request`, cancelling it once no event has arrived for the stall timeout."""
+        while True:
+            remaining = self._last_event + self.stall_timeout - time.monotonic()
+            if remaining <= 0:
+                request.cancel()
+                await asyncio.gather(request, return_exceptions=True)
+                raise StreamStalled(f"no event for {self.stall_timeout:g}s")
+            done, _ = await asyncio.wait({request}, timeout=remaining)
+            if done:
+                return request.result()
+
+
+async def run_long_running_task(
+    server_url: str,
+    max_retry_time: float = DEFAULT_MAX_RETRY_TIME,
+    max_delay: float = DEFAULT_MAX_DELAY,
+    stall_timeout: float = DEFAULT_STALL_TIMEOUT,
+):
+    """Run the long_running_agent, resuming it in-process when its stream drops."""
+
+    # Check for existing tokens
+    existing_tokens = load_resumption_tokens()
+    if existing_tokens:
+        print("🔄 Resuming existing session (no initialization needed)...")
+    else:
+        print("🆕 Creating new session...")
+
+    supervisor = ResumeSupervisor(
+        server_url,
+        "long_running_agent",
+        {},
+        saved_tokens=existing_tokens,
+        max_retry_time=max_retry_time,
+        max_delay=max_delay,
+        stall_timeout=stall_timeout,
+    )
+    try:
+        result = await supervisor.run()
+        content_text = "Task completed"
+        if result.content and isinstance(result.content[0], TextContent):
+            content_text = result.content[0].text
+        print(f"✅ Task completed: {content_text}")
+        clear_resumption_tokens()
+    except SessionEnded as e:
+        # The tokens point at a session that is gone; resuming from them can never work
+        print(f"❌ {e}")
+        clear_resumption_tokens()
+        print("🗑️ Resumption tokens cleared; run again to start a new task")
+    except RecoveryFailed as e:
+        # Keep tokens so a later run can still resume
+        print(f"❌ {e}")
+        if supervisor.resumption_token:
+            print("💾 Resumption token kept; run again to resume")
     except Exception as e:
-        print(f"❌ Connection error: {e}")
+        print(f"❌ Task failed: {describe_error(e)}")
+    finally:
+        print(f"📈 Recovery: {supervisor.metrics.summary()}")
 
 
 async def main():
@@ -201,6 +393,12 @@ async def main():
     parser = argparse.ArgumentParser(description="Minimal Resumable MCP Client")
     parser.add_argument("--url", default="http://127.0.0.1:8006/mcp", help="MCP server URL")
     parser.add_argument("--clear-tokens", action="store_true", help="Clear resumption tokens and exit")
+    parser.add_argument("--max-retry-time", type=float, default=DEFAULT_MAX_RETRY_TIME,
+                        help=f"Seconds to keep reconnecting after a drop (default: {DEFAULT_MAX_RETRY_TIME:g})")
+    parser.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY,
+                        help=f"Longest wait between reconnect attempts (default: {DEFAULT_MAX_DELAY:g})")
+    parser.add_argument("--stall-timeout", type=float, default=DEFAULT_STALL_TIMEOUT,
+                        help=f"Seconds without an event before the stream counts as dropped (default: {DEFAULT_STALL_TIMEOUT:g})")
     
     args = parser.parse_args()
     
@@ -212,7 +410,7 @@ async def main():
     print("🤖 Minimal Resumable MCP Client")
     print(f"🔗 Connecting to: {args.url}")
     
-    await run_long_running_task(args.url)
+    await run_long_running_task(args.url, args.max_retry_time, args.max_delay, args.stall_timeout)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Client Session Pool for MCP Servers
+
+Before its first tool call a new client opens a connection, initializes a
+session, sends the initialized notification and lists the tools. For a
+short tool that handshake takes longer than the call itself. SessionPool
+keeps initialized sessions per server URL, together with their tool list,
+and hands them out to callers, so a borrowed session's first request is the
+tool call. That pays off when one process makes many calls, as the batch
+runner does. The interactive client and resumable_client hold a single
+session for their whole run and do not use the pool. Separate runs of
+them cannot share sessions through it either.
+
+All sessions of a URL share one httpx connection pool, so requests reuse
+keep-alive connections instead of connecting again; with the optional
+``h2`` package installed, https servers are spoken to over HTTP/2 and the
+sessions' requests share a connection. Idle sessions are pinged every
+``health_interval`` seconds, which also keeps a connection warm; sessions
+the server has ended, and those idle for longer than ``idle_timeout``, are
+closed and replaced so that ``min_idle`` stay ready.
+
+Each session's transport runs in its own task (PooledSession). A failed
+request takes the transport down with everything in its task group, so
+the session is reopened on the same session ID, without initializing
+again, while callers wait in ``PooledSession.get``.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+import mcp.types as types
+from mcp.client.streamable_http import streamable_http_client
+from mcp.server.streamable_http import MCP_PROTOCOL_VERSION_HEADER, MCP_SESSION_ID_HEADER
+from mcp.shared.exceptions import McpError
+
+from .utils import TrackedClientSession
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # HTTP/2 is optional; HTTP/1.1 keep-alive is always available
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 4
+DEFAULT_MIN_IDLE = 1
+DEFAULT_HEALTH_INTERVAL = 20.0
+DEFAULT_IDLE_TIMEOUT = 300.0
+# Seconds before the first reconnect attempt; doubled for each further one
+DEFAULT_RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 10.0
+# Shorter than the server's 30 second keep-alive, so the client drops idle connections first
+KEEPALIVE_EXPIRY = 25.0
+HTTP_TIMEOUT = httpx.Timeout(30.0, read=300.0)
+
+
+class SessionLost(Exception):
+    """The server ended the session, or it could not be opened."""
+
+
+def describe_error(error: BaseException) -> str:
+    """Message of an error, unwrapping task group errors that hold a single exception."""
+    while len(getattr(error, "exceptions", ())) == 1:
+        error = error.exceptions[0]
+    return str(error) or type(error).__name__
+
+
+class PooledSession:
+    """
+    An initialized session whose transport runs in its own task and reconnects when it fails.
+
+    - transport: the httpx transport shared by the URL's sessions
+    - session_kwargs: callbacks passed to each ClientSession (elicitation,
+      sampling, message handler)
+    """
+
+    def __init__(
+        self,
+        server_url: str,
+        transport: httpx.AsyncBaseTransport,
+        reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+        **session_kwargs: Any,
+    ) -> None:
+        self.server_url = server_url
+        self.reconnect_delay = reconnect_delay
+        self._transport = transport
+        self._session_kwargs = session_kwargs
+        self.session: Optional[TrackedClientSession] = None
+        self.session_id: Optional[str] = None
+        self.protocol_version: Optional[str] = None
+        # Tools listed when the session was opened
+        self.tools: list[types.Tool] = []
+        self.reconnects = 0
+        # Request IDs used so far; a reconnected ClientSession continues from here
+        self._next_request_id = 0
+        self.uses = 0
+        self.last_used = time.monotonic()
+        # Why the session can no longer be used
+        self.error: Optional[str] = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """True while the session is connected."""
+        return self.session is not None
+
+    def _http_client(self) -> httpx.AsyncClient:
+        headers = None
+        if self.session_id is not None:
+            headers = {MCP_SESSION_ID_HEADER: self.session_id, MCP_PROTOCOL_VERSION_HEADER: self.protocol_version}
+        # Never closed: closing a client closes the transport it shares with the other sessions
+        return httpx.AsyncClient(
+            transport=self._transport, headers=headers, timeout=HTTP_TIMEOUT, follow_redirects=True
+        )
+
+    async def start(self) -> None:
+        """Open and initialize the session and list its tools; raises SessionLost if that fails."""
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self.error is not None:
+            raise SessionLost(f"Could not open session: {self.error}")
+
+    async def get(self, timeout: Optional[float] = None) -> TrackedClientSession:
+        """Return the connected ClientSession, waiting up to `timeout` seconds while it reconnects.
+
+        Raises asyncio.TimeoutError if it is still reconnecting, and SessionLost if it has ended.
+        """
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        if self.session is None:
+            raise SessionLost(self.error or "Session closed")
+        return self.session
+
+    async def ping(self, timeout: float) -> bool:
+        """Ping the server; False if the session is down. Sets `error` if the server ended it."""
+        session = self.session
+        if session is None:
+            return False
+        try:
+            await asyncio.wait_for(session.send_ping(), timeout)
+            return True
+        except McpError as e:
+            if e.error.code != types.CONNECTION_CLOSED:
+                self.error = e.error.message
+            return False
+        except Exception:
+            return False
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                async with streamable_http_client(
+                    self.server_url, http_client=self._http_client(), terminate_on_close=False
+                ) as (read_stream, write_stream, get_session_id):
+                    async with TrackedClientSession(read_stream, write_stream, **self._session_kwargs) as session:
+                        # Calls sent before the reconnect may still be resumed under their IDs
+                        session.skip_request_ids([self._next_request_id - 1])
+                        if self.session_id is None:
+                            result = await session.initialize()
+                            self.session_id = get_session_id()
+                            self.protocol_version = str(result.protocolVersion)
+                            self.tools = (await session.list_tools()).tools
+                        else:
+                            # Fails with McpError if the server no longer knows the session
+                            await session.send_ping()
+                        self.session = session
+                        self._ready.set()
+                        delay = self.reconnect_delay
+                        try:
+                            await self._stop.wait()
+                        finally:
+                            self._next_request_id = session.next_request_id
+            except McpError as e:
+                self.error = e.error.message
+                break
+            except Exception as e:
+                if self.session_id is None:
+                    self.error = describe_error(e)
+                    break
+                self.reconnects += 1
+                logger.info(f"Session {self.session_id} lost its connection ({describe_error(e)}), reconnecting")
+            finally:
+                self.session = None
+                self._ready.clear()
+            if not self._stop.is_set():
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+        # Wake waiting callers so they see that the session is gone
+        self._ready.set()
+
+    async def close(self) -> None:
+        """Stop the session's task and end the session on the server."""
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+        if self.session_id is not None and self.error is None:
+            try:
+                await self._http_client().delete(self.server_url)
+            except httpx.HTTPError:
+                pass
+            self.error = "Session closed"
+
+
+class _Endpoint:
+    """The sessions of one server URL and the connection pool they share."""
+
+    def __init__(self, url: str, transport: httpx.AsyncHTTPTransport, max_sessions: int) -> None:
+        self.url = url
+        self.transport = transport
+        self.idle: list[PooledSession] = []
+        self.in_use: set[PooledSession] = set()
+        self.slots = asyncio.Semaphore(max_sessions)
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+
+
+class SessionPool:
+    """
+    Initialized sessions per server URL, handed out to callers and health-checked while idle.
+
+    - max_sessions: sessions per URL in use at once; further callers wait
+    - min_idle: idle sessions kept ready per URL that has been used
+    - health_interval: seconds between pings of idle sessions (None never pings)
+    - idle_timeout: seconds after which an idle session above min_idle is closed
+    - http2: use HTTP/2 for https URLs; None uses it when ``h2`` is installed
+    - session_kwargs: callbacks passed to each ClientSession
+
+    Use as an async context manager, or call close() when done::
+
+        async with SessionPool() as pool:
+            async with pool.session(url) as pooled:
+                session = await pooled.get()
+                result = await session.call_tool("travel_agent", {"destination": "Paris"})
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        min_idle: int = DEFAULT_MIN_IDLE,
+        health_interval: Optional[float] = DEFAULT_HEALTH_INTERVAL,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        http2: Optional[bool] = None,
+        reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+        **session_kwargs: Any,
+    ) -> None:
+        if max_sessions < 1:
+            raise ValueError(f"max_sessions must be at least 1, got {max_sessions}")
+        if health_interval is not None and health_interval <= 0:
+            raise ValueError(f"health_interval must be positive, got {health_interval}")
+        if http2 and h2 is None:
+            raise ValueError("HTTP/2 requires the 'h2' package (pip install 'httpx[http2]')")
+        self.max_sessions = max_sessions
+        self.min_idle = min(min_idle, max_sessions)
+        self.health_interval = health_interval
+        self.idle_timeout = idle_timeout
+        self.http2 = h2 is not None if http2 is None else http2
+        self.reconnect_delay = reconnect_delay
+        self._session_kwargs = session_kwargs
+        self._endpoints: dict[str, _Endpoint] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self._background: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def __aenter__(self) -> "SessionPool":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def _endpoint(self, url: str) -> _Endpoint:
+        if self._closed:
+            raise RuntimeError("SessionPool is closed")
+        endpoint = self._endpoints.get(url)
+        if endpoint is None:
+            transport = httpx.AsyncHTTPTransport(
+                http2=self.http2,
+                limits=httpx.Limits(keepalive_expiry=KEEPALIVE_EXPIRY),
+            )
+            endpoint = self._endpoints[url] = _Endpoint(url, transport, self.max_sessions)
+            if self._health_task is None and self.health_interval is not None:
+                self._health_task = asyncio.create_task(self._health_loop())
+        return endpoint
+
+    async def _open(self, endpoint: _Endpoint) -> PooledSession:
+        pooled = PooledSession(endpoint.url, endpoint.transport, self.reconnect_delay, **self._session_kwargs)
+        await pooled.start()
+        endpoint.opened += 1
+        return pooled
+
+    async def warm(self, url: str, count: Optional[int] = None) -> None:
+        """Open idle sessions to `url` ahead of use, up to `count` (default min_idle).
+
+        Sessions in use count against max_sessions, so warming never opens more than that.
+        """
+        endpoint = self._endpoint(url)
+        wanted = count if count is not None else self.min_idle
+        missing = min(wanted, self.max_sessions - len(endpoint.in_use)) - len(endpoint.idle)
+        if missing > 0:
+            endpoint.idle.extend(await asyncio.gather(*(self._open(endpoint) for _ in range(missing))))
+
+    async def acquire(self, url: str) -> PooledSession:
+        """Take an idle session to `url`, or open one; waits while max_sessions are in use."""
+        endpoint = self._endpoint(url)
+        await endpoint.slots.acquire()
+        try:
+            pooled = None
+            while endpoint.idle and pooled is None:
+                candidate = endpoint.idle.pop()
+                if candidate.error is None:
+                    pooled = candidate
+                    endpoint.reused += 1
+                else:
+                    self._discard(endpoint, candidate)
+            if pooled is None:
+                pooled = await self._open(endpoint)
+        except BaseException:
+            endpoint.slots.release()
+            raise
+        endpoint.in_use.add(pooled)
+        pooled.uses += 1
+        return pooled
+
+    def release(self, pooled: PooledSession) -> None:
+        """Return a session taken with acquire; ended sessions are closed instead of kept."""
+        endpoint = self._endpoints[pooled.server_url]
+        endpoint.in_use.discard(pooled)
+        endpoint.slots.release()
+        if pooled.error is not None or self._closed or len(endpoint.idle) >= self.max_sessions:
+            self._discard(endpoint, pooled)
+            return
+        pooled.last_used = time.monotonic()
+        endpoint.idle.append(pooled)
+
+    @asynccontextmanager
+    async def session(self, url: str) -> AsyncIterator[PooledSession]:
+        """Borrow a session to `url` for the duration of the block."""
+        pooled = await self.acquire(url)
+        try:
+            yield pooled
+        finally:
+            self.release(pooled)
+
+    def _discard(self, endpoint: _Endpoint, pooled: PooledSession) -> None:
+        endpoint.discarded += 1
+        task = asyncio.create_task(pooled.close())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for endpoint in list(self._endpoints.values()):
+                await self._check(endpoint)
+
+    async def _check(self, endpoint: _Endpoint) -> None:
+        """Close expired or ended idle sessions, ping the rest and top up to min_idle."""
+        now = time.monotonic()
+        for pooled in list(endpoint.idle):
+            expired = now - pooled.last_used > self.idle_timeout and len(endpoint.idle) > self.min_idle
+            if not expired and pooled.error is None:
+                # Sets `error` if the server ended the session; one that is reconnecting keeps its place
+                await pooled.ping(self.health_interval)
+            # A caller may have taken the session while it was being pinged
+            if (expired or pooled.error is not None) and pooled in endpoint.idle:
+                endpoint.idle.remove(pooled)
+                self._discard(endpoint, pooled)
+        try:
+            await self.warm(endpoint.url)
+        except SessionLost as e:
+            logger.warning(f"Could not refill the session pool for {endpoint.url}: {e}")
+
+    async def close(self) -> None:
+        """End every session and close the connection pools."""
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+        sessions = [pooled for endpoint in self._endpoints.values() for pooled in endpoint.idle + list(endpoint.in_use)]
+        await asyncio.gather(*(pooled.close() for pooled in sessions), *self._background)
+        for endpoint in self._endpoints.values():
+            await endpoint.transport.aclose()
+        self._endpoints.clear()
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        """Return per URL how many sessions are idle and in use, and how often sessions were reused."""
+        return {
+            url: {
+                "idle": len(endpoint.idle),
+                "in_use": len(endpoint.in_use),
+                "opened": endpoint.opened,
+                "reused": endpoint.reused,
+                "discarded": endpoint.discarded,
+                "reconnects": sum(p.reconnects for p in endpoint.idle + list(endpoint.in_use)),
+            }
+            for url, endpoint in self._endpoints.items()
+        }
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Resumption Token Store for MCP Clients
+
+Keeps the latest resumption token of every tool call that is still running,
+keyed by (session ID, request ID), so a client that restarts can resume all
+of its pending calls at once instead of only the last one.
+
+A long-running call receives a new token with every event, so saving each
+one would rewrite the store several times a second. Updates are kept in
+memory and written together at most once per ``flush_interval``; a crash
+loses at most that much, and resuming from a slightly older token only
+replays a few more events. Two backends are available:
+
+- ``JSONTokenStore``: one JSON file, replaced atomically (temp file plus
+  rename) so a crash never leaves a half-written file
+- ``SQLiteTokenStore``: one row per call, so only changed calls are written
+  and several client processes can share the file
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Any, Optional
+
+from rich.console import Console
+
+DEFAULT_TOKEN_FILE = "resumption_tokens.json"
+DEFAULT_TOKEN_DB = "resumption_tokens.db"
+# Seconds between writes of buffered token updates
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+console = Console()
+
+
+class PendingCall:
+    """A tool call that has not finished, with the token to resume it from."""
+
+    __slots__ = ("session_id", "request_id", "resumption_token", "tool", "args", "protocol_version", "updated_at")
+
+    def __init__(
+        self,
+        session_id: str,
+        request_id: int | str,
+        resumption_token: str,
+        tool: str,
+        args: dict,
+        protocol_version: Optional[str] = None,
+        updated_at: Optional[float] = None,
+    ) -> None:
+        self.session_id = session_id
+        # ID the call was first sent with; the server tags its progress with it
+        self.request_id = request_id
+        self.resumption_token = resumption_token
+        self.tool = tool
+        self.args = args
+        self.protocol_version = protocol_version
+        self.updated_at = updated_at if updated_at is not None else time.time()
+
+    @property
+    def key(self) -> tuple[str, int | str]:
+        return (self.session_id, self.request_id)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PendingCall":
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+class TokenStore:
+    """
+    Base class holding pending calls in memory and writing changes in batches.
+
+    Subclasses implement ``_load`` and ``_write``. Call ``close`` (or
+    ``flush``) before exiting so the latest tokens are written.
+    """
+
+    def __init__(self, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.flush_interval = flush_interval
+        self._calls: dict[tuple[str, int | str], PendingCall] = {}
+        # Keys saved or removed since the last write
+        self._dirty: set[tuple[str, int | str]] = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.updates = 0
+        self.writes = 0
+        for call in self._load():
+            self._calls[call.key] = call
+
+    def save(
+        self,
+        session_id: Optional[str],
+        request_id: Optional[int | str],
+        resumption_token: str,
+        tool: str,
+        args: dict,
+        protocol_version: Optional[str] = None,
+    ) -> bool:
+        """Record a call's latest resumption token; False if the session or request ID is unknown."""
+        if not session_id or request_id is None or not resumption_token:
+            return False
+        call = PendingCall(session_id, request_id, resumption_token, tool, args, protocol_version)
+        self._calls[call.key] = call
+        self._mark_dirty(call.key)
+        return True
+
+    def remove(self, session_id: Optional[str], request_id: Optional[int | str]) -> None:
+        """Forget a call that finished or was cancelled."""
+        key = (session_id, request_id)
+        if self._calls.pop(key, None) is not None:
+            self._mark_dirty(key)
+
+    def pending(self, session_id: Optional[str] = None) -> list[PendingCall]:
+        """Return the pending calls, oldest update first, optionally only those of one session."""
+        calls = [c for c in self._calls.values() if session_id is None or c.session_id == session_id]
+        return sorted(calls, key=lambda c: c.updated_at)
+
+    def latest_session(self) -> Optional[str]:
+        """Return the session of the most recently updated pending call."""
+        calls = self.pending()
+        return calls[-1].session_id if calls else None
+
+    def clear(self) -> bool:
+        """Forget every pending call and write that immediately; False if there were none."""
+        if not self._calls and not self._dirty:
+            return self._clear_storage()
+        self._dirty.update(self._calls)
+        self._calls.clear()
+        self.flush()
+        return True
+
+    def _mark_dirty(self, key: tuple[str, int | str]) -> None:
+        self.updates += 1
+        self._dirty.add(key)
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self) -> None:
+        """Write the buffered changes now."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        try:
+            self._write(dirty)
+            self.writes += 1
+        except Exception as e:
+            self._dirty |= dirty
+            console.print(f"[red]✗ Failed to save resumption tokens: {e}[/red]")
+
+    def close(self) -> None:
+        """Write any buffered changes and release the storage."""
+        self.flush()
+
+    def _load(self) -> list[PendingCall]:
+        raise NotImplementedError
+
+    def _write(self, dirty: set[tuple[str, int | str]]) -> None:
+        raise NotImplementedError
+
+    def _clear_storage(self) -> bool:
+        return False
+
+
+class JSONTokenStore(TokenStore):
+    """Pending calls in one JSON file that is replaced as a whole on each write."""
+
+    def __init__(self, path: str = DEFAULT_TOKEN_FILE, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.path = path
+        super().__init__(flush_interval)
+
+    def _load(self) -> list[PendingCall]:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if "calls" not in data:
+                console.print(f"[yellow]Ignoring {self.path}: written by an older client[/yellow]")
+                return []
+            return [PendingCall.from_dict(call) for call in data["calls"]]
+        except Exception as e:
+            console.print(f"[red]✗ Failed to load resumption tokens: {e}[/red]")
+            return []
+
+    def _write(self, dirty: set[tuple[str, int | str]]) -> None:
+        if not self._calls:
+            self._clear_storage()
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tokens-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"calls": [call.to_dict() for call in self.pending()]}, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _clear_storage(self) -> bool:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+            return True
+        return False
+
+
+class SQLiteTokenStore(TokenStore):
+    """Pending calls as rows of a SQLite table; each write upserts and deletes only the changed calls."""
+
+    def __init__(self, path: str = DEFAULT_TOKEN_DB, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        # request_id has no declared type so integer and string IDs keep their type
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_calls (
+                session_id TEXT NOT NULL,
+                request_id NOT NULL,
+                resumption_token TEXT NOT NULL,
+                tool TEXT NOT NULL,
+                args TEXT NOT NULL,
+                protocol_version TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (session_id, request_id)
+            )
+        """)
+        self._conn.commit()
+        super().__init__(flush_interval)
+
+    def _load(self) -> list[PendingCall]:
+        rows = self._conn.execute(
+            "SELECT session_id, request_id, resumption_token, tool, args, protocol_version, updated_at "
+            "FROM pending_calls"
+        ).fetchall()
+        return [
+            PendingCall(session_id, request_id, token, tool, json.loads(args), protocol_version, updated_at)
+            for session_id, request_id, token, tool, args, protocol_version, updated_at in rows
+        ]
+
+    def _write(self, dirty: set[tuple[str, int | str]]) -> None:
+        upserts = [self._calls[key] for key in dirty if key in self._calls]
+        deletes = [key for key in dirty if key not in self._calls]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO pending_calls VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id, request_id) DO UPDATE SET "
+                "resumption_token = excluded.resumption_token, updated_at = excluded.updated_at",
+                [
+                    (c.session_id, c.request_id, c.resumption_token, c.tool, json.dumps(c.args),
+                     c.protocol_version, c.updated_at)
+                    for c in upserts
+                ],
+            )
+            self._conn.executemany("DELETE FROM pending_calls WHERE session_id = ? AND request_id = ?", deletes)
+
+    def _clear_storage(self) -> bool:
+        with self._conn:
+            return self._conn.execute("DELETE FROM pending_calls").rowcount > 0
+
+    def close(self) -> None:
+        super().close()
+        self._conn.close()
+
+
+TOKEN_STORE_BACKENDS = {"json": (JSONTokenStore, DEFAULT_TOKEN_FILE), "sqlite": (SQLiteTokenStore, DEFAULT_TOKEN_DB)}
+
+
+def create_token_store(
+    backend: str = "json",
+    path: Optional[str] = None,
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+) -> TokenStore:
+    """Open the token store of the given backend ("json" or "sqlite"), at its default path unless one is given."""
+    if backend not in TOKEN_STORE_BACKENDS:
+        raise ValueError(f"Unknown token store backend: {backend} (expected one of {tuple(TOKEN_STORE_BACKENDS)})")
+    store_class, default_path = TOKEN_STORE_BACKENDS[backend]
+    return store_class(path or default_path, flush_interval)
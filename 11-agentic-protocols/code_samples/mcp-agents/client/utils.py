@@ -2,20 +2,37 @@
 """
 Client Utilities for MCP Session Management
 
-This module provides utilities for managing MCP client sessions,
-including token persistence and session resumption.
+This module provides helpers shared by the MCP clients. Resumption tokens
+are kept by the stores in token_store.
 """
 
-import json
-import os
-from typing import Optional, Dict, Any
+from typing import Iterable
 
-from rich.console import Console
+from mcp import ClientSession
+from mcp.types import RequestId
 
-# Import shared constants locally
-DEFAULT_TOKEN_FILE = "resumption_tokens.json"
 
-console = Console()
+class TrackedClientSession(ClientSession):
+    """
+    ClientSession whose request IDs can be read before sending and moved past IDs still in use.
+
+    Request IDs count up from 0 in every ClientSession, but a server session
+    outlives the ClientSession that resumes it: calls resumed after a restart
+    or reconnect keep the IDs they were first sent with, and a new call that
+    reused one would be mixed up with it on the server.
+    """
+
+    @property
+    def next_request_id(self) -> int:
+        """ID the next send_request will use; send_request takes it before its first await."""
+        return self._request_id
+
+    def skip_request_ids(self, request_ids: Iterable[RequestId]) -> None:
+        """Make new requests use IDs above every integer ID in `request_ids`."""
+        numeric = [request_id for request_id in request_ids if isinstance(request_id, int)]
+        if numeric:
+            self._request_id = max(self._request_id, max(numeric) + 1)
+
 
 
 def cast_input_value(value: str, prop_info: dict):
@@ -37,83 +54,3 @@ def cast_input_value(value: str, prop_info: dict):
     except ValueError:
         # If casting fails, return the original string
         return value
-
-
-class TokenManager:
-    """Manages resumption tokens and session information."""
-    
-    def __init__(self, token_file: str = DEFAULT_TOKEN_FILE):
-        self.token_file = token_file
-    
-    def save_tokens(self, session_id: str, resumption_token: str, protocol_version: Optional[str] = None, 
-                   last_tool: Optional[str] = None, last_args: Optional[dict] = None) -> bool:
-        """Save session ID, resumption token, protocol version, and last tool info to file.
-        
-        Only creates a token file when we have an actual resumption token from the server.
-        Never creates empty or placeholder token files.
-        """
-        # Validate that we have real tokens, not placeholders
-        if not session_id or not resumption_token:
-            console.print(f"[red]✗ Cannot save tokens: missing session_id or resumption_token[/red]")
-            return False
-            
-        if resumption_token.startswith("pending_") or resumption_token.startswith("temp_"):
-            console.print(f"[red]✗ Cannot save placeholder token: {resumption_token}[/red]")
-            return False
-        
-        data: Dict[str, Any] = {
-            "session_id": session_id,
-            "resumption_token": resumption_token,
-        }
-        if protocol_version:
-            data["protocol_version"] = protocol_version
-        if last_tool:
-            data["last_tool"] = last_tool
-        if last_args:
-            data["last_args"] = last_args
-        
-        try:
-            with open(self.token_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            console.print(f"[green]✓ Saved resumption token to {self.token_file}[/green]")
-            return True
-        except Exception as e:
-            console.print(f"[red]✗ Failed to save tokens: {e}[/red]")
-            return False
-    
-    def load_tokens(self) -> Optional[Dict[str, Any]]:
-        """Load session ID, resumption token, and tool info from file."""
-        if not os.path.exists(self.token_file):
-            console.print(f"[yellow]No resumption token file found ({self.token_file})[/yellow]")
-            return None
-            
-        try:
-            with open(self.token_file, 'r') as f:
-                data = json.load(f)
-            
-            if "session_id" in data and "resumption_token" in data:
-                console.print(f"[cyan]📄 Found resumption tokens in {self.token_file}[/cyan]")
-                console.print(f"[cyan]   Session ID: {data['session_id']}[/cyan]")
-                console.print(f"[cyan]   Token: {data['resumption_token'][:20]}...[/cyan]")
-                if "last_tool" in data:
-                    console.print(f"[cyan]   Last Tool: {data['last_tool']}[/cyan]")
-                return data
-            else:
-                console.print(f"[yellow]Invalid token file format[/yellow]")
-                return None
-                
-        except Exception as e:
-            console.print(f"[red]✗ Failed to load tokens: {e}[/red]")
-            return None
-    
-    def delete_tokens(self) -> bool:
-        """Delete the resumption token file."""
-        try:
-            if os.path.exists(self.token_file):
-                os.remove(self.token_file)
-                return True
-            else:
-                return False
-        except Exception as e:
-            console.print(f"[red]✗ Failed to delete token file: {e}[/red]")
-            return False
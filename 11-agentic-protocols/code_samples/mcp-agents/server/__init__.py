@@ -5,4 +5,17 @@ This package contains various MCP server implementations:
 - server.py: Basic MCP server
 - resumable_server.py: Server with event store and resumption support
 - event_store.py: Event store implementation for session resumption
+- log_event_store.py: Append-only segmented log event store
+- sharded_event_store.py: Event store wrapper that shards streams across stores
+- event_store_factory.py: Event store selection from CLI/config settings
+- event_compression.py: Dictionary-based payload compression for the event store
+- multiworker.py: Multi-process serving behind a session-affinity proxy
+- notification_coalescer.py: Rate-limited, coalesced progress notifications for tools
+- tool_scheduler.py: Per-tool and per-session limits with fair queueing for tool calls
+- tool_registry.py: Tool registry with a cached tools/list result and ETag
+- checkpoint_store.py: Durable step checkpoints for resuming tool calls after a restart
+- tool_result_cache.py: TTL/LRU tool result cache with in-flight deduplication
+- interaction_policy.py: Pre-answered elicitation/sampling and interaction timeouts
+- abandonment.py: Cancels tool calls of abandoned sessions and releases their events
+- metrics.py: Latency histograms, gauges and counters served on /metrics
 """
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Abandoned Session Cleanup for the Resumable MCP Server
+
+A client that disconnects in the middle of a tool call may come back and
+resume from the event store, so the call keeps running. A client that never
+comes back leaves the call running to completion, writing events nobody will
+replay. This module ends a session once it has had no open request or stream
+for a grace period, which cancels its in-flight tool calls, and then deletes
+the events its streams left in the event store, since a session that has
+ended cannot be resumed.
+
+Stream IDs are the request IDs chosen by each client, so two sessions'
+streams can share an ID. Each session therefore stores its events under
+``<session ID>/<stream ID>`` through a ``SessionEventStore`` view, which
+lets its streams be deleted without touching another session's.
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Optional
+
+import anyio
+
+from mcp.server.streamable_http import (
+    EventCallback,
+    EventId,
+    EventMessage,
+    EventStore,
+    StreamableHTTPServerTransport,
+    StreamId,
+)
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from mcp.types import JSONRPCMessage
+
+logger = logging.getLogger(__name__)
+
+# Separates the session ID from the stream ID in the shared event store
+SESSION_STREAM_SEPARATOR = "/"
+
+
+class SessionEventStore(EventStore):
+    """One session's view of a shared event store, with its streams namespaced by session ID."""
+
+    def __init__(self, store: EventStore, session_id: str) -> None:
+        self._store = store
+        self.session_id = session_id
+        self._prefix = f"{session_id}{SESSION_STREAM_SEPARATOR}"
+        # Events stored per stream of this session
+        self.stream_events: Counter = Counter()
+
+    async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
+        """Store an event under this session's name for the stream."""
+        event_id = await self._store.store_event(self._prefix + stream_id, message)
+        self.stream_events[stream_id] += 1
+        return event_id
+
+    async def replay_events_after(
+        self,
+        last_event_id: EventId,
+        send_callback: EventCallback,
+    ) -> StreamId | None:
+        """Replay events after the specified ID and return the stream's ID within this session."""
+        # The stream is only known once the store has found it, so hold the
+        # events back until it is shown to be this session's
+        events: list[EventMessage] = []
+
+        async def collect(event: EventMessage) -> None:
+            events.append(event)
+
+        stream_id = await self._store.replay_events_after(last_event_id, collect)
+        if stream_id is None:
+            return None
+        if not stream_id.startswith(self._prefix):
+            logger.warning(f"Event {last_event_id} does not belong to session {self.session_id}")
+            return None
+        for event in events:
+            await send_callback(event)
+        return stream_id[len(self._prefix):]
+
+    async def delete_streams(self) -> int:
+        """Delete the events of every stream this session wrote; return how many were deleted."""
+        if not hasattr(self._store, "delete_stream"):
+            return 0
+        deleted = 0
+        for stream_id in self.stream_events:
+            deleted += await self._store.delete_stream(self._prefix + stream_id)
+        self.stream_events.clear()
+        return deleted
+
+
+class AbandonmentMonitor:
+    """
+    Ends sessions that stay disconnected past a grace period and counts the work saved.
+
+    - grace_period: seconds a session may have no open request or stream
+      before it is ended and its tool calls are cancelled (None never ends
+      an idle session)
+
+    Work saved by a cancelled call is estimated from its latest progress
+    update: a call that was a quarter done after 10 seconds had about 30
+    seconds and three times its events still to go. Calls that report no
+    progress count towards cancelled_calls only.
+    """
+
+    def __init__(self, grace_period: Optional[float] = 60.0) -> None:
+        if grace_period is not None and grace_period <= 0:
+            raise ValueError(f"grace_period must be positive, got {grace_period}")
+        self.grace_period = grace_period
+        self._views: dict[str, SessionEventStore] = {}
+        self.abandoned_sessions = 0
+        self.cancelled_calls = 0
+        self.seconds_saved = 0.0
+        self.events_avoided = 0
+        self.events_released = 0
+
+    def event_store_for(self, store: EventStore, session_id: str) -> SessionEventStore:
+        """Return the view of `store` that a new session writes its events through."""
+        view = self._views[session_id] = SessionEventStore(store, session_id)
+        return view
+
+    async def session_ended(self, session_id: str, abandoned: bool) -> None:
+        """Delete an ended session's events; `abandoned` if it ran out its grace period."""
+        view = self._views.pop(session_id, None)
+        if view is None:
+            return
+        if abandoned:
+            self.abandoned_sessions += 1
+        released = await view.delete_streams()
+        self.events_released += released
+        if abandoned or released:
+            logger.info(
+                f"Session {session_id} {'abandoned' if abandoned else 'ended'}, "
+                f"released {released} events"
+            )
+
+    def record_cancelled(self, tool: str, elapsed: float, progress: Optional[float], events_sent: int) -> None:
+        """Count a cancelled tool call and estimate the run time and events it would still have used."""
+        self.cancelled_calls += 1
+        if progress is None or not 0 < progress < 1:
+            logger.info(f"Cancelled {tool} after {elapsed:.1f}s")
+            return
+        remaining = (1 - progress) / progress
+        self.seconds_saved += elapsed * remaining
+        self.events_avoided += round(events_sent * remaining)
+        logger.info(
+            f"Cancelled {tool} after {elapsed:.1f}s at {progress:.0%}, "
+            f"saving about {elapsed * remaining:.1f}s and {round(events_sent * remaining)} events"
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return abandoned session and cancelled call counts and the work they saved."""
+        return {
+            "abandoned_sessions": self.abandoned_sessions,
+            "cancelled_calls": self.cancelled_calls,
+            "seconds_saved": round(self.seconds_saved, 3),
+            "events_avoided": self.events_avoided,
+            "events_released": self.events_released,
+        }
+
+
+class AbandonmentAwareSessionManager(StreamableHTTPSessionManager):
+    """Session manager that ends idle sessions after the monitor's grace period and releases their events."""
+
+    def __init__(self, *args: Any, monitor: AbandonmentMonitor, **kwargs: Any) -> None:
+        super().__init__(*args, session_idle_timeout=monitor.grace_period, **kwargs)
+        self.monitor = monitor
+
+    def _admit_session(self, requestor: Any) -> StreamableHTTPServerTransport | None:
+        transport = super()._admit_session(requestor)
+        if transport is not None and self.event_store is not None:
+            # Swapped in before the session serves its first request
+            transport._event_store = self.monitor.event_store_for(self.event_store, transport.mcp_session_id)
+        return transport
+
+    async def _discard_session(self, session_id: str, transport: StreamableHTTPServerTransport) -> None:
+        await super()._discard_session(session_id, transport)
+        abandoned = transport.idle_scope is not None and transport.idle_scope.cancel_called
+        # Also called while the session's task is being cancelled at shutdown
+        with anyio.CancelScope(shield=True):
+            await self.monitor.session_ended(session_id, abandoned)
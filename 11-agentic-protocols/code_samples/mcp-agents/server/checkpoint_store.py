@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Durable Step Checkpoints for Long-Running Tools
+
+Event replay lets a client catch up on notifications it missed, but if the
+server process restarts, the tool call itself is lost. This module lets tools
+record how far they got (a step index and a small JSON state) in SQLite. When
+the client repeats the call with the same ``_meta.checkpointKey`` after a
+restart, the tool continues from its last checkpoint instead of from step 0,
+and a call that already finished returns its stored result.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from pydantic import TypeAdapter
+
+from mcp.types import ContentBlock
+
+logger = logging.getLogger(__name__)
+
+_content_adapter = TypeAdapter(list[ContentBlock])
+
+
+class ToolCheckpoint:
+    """
+    Progress of one tool call, handed to the tool as ``checkpoint``.
+
+    ``step`` is the number of steps already completed (0 for a fresh call)
+    and ``state`` holds whatever the tool saved with them. Without a store
+    (no checkpoint key, or checkpoints disabled) ``save`` only updates the
+    object, so tools do not need to check whether checkpointing is on.
+    """
+
+    def __init__(
+        self,
+        store: Optional["CheckpointStore"] = None,
+        key: Optional[str] = None,
+        tool: str = "",
+        arguments: Optional[dict[str, Any]] = None,
+        step: int = 0,
+        state: Optional[dict[str, Any]] = None,
+        result: Optional[list[ContentBlock]] = None,
+    ) -> None:
+        self._store = store
+        self.key = key
+        self.tool = tool
+        self.arguments = arguments or {}
+        self.step = step
+        self.state = state or {}
+        # Content of a call that already completed under this key
+        self.result = result
+
+    @property
+    def resumed(self) -> bool:
+        """True if this call continues from a saved checkpoint."""
+        return self.step > 0
+
+    async def save(self, step: int, **state: Any) -> None:
+        """Record that `step` steps are done, merging `state` into the saved state."""
+        self.step = step
+        self.state.update(state)
+        if self._store is not None:
+            await asyncio.to_thread(self._store._save_sync, self.key, self.tool, self.arguments, step, self.state)
+
+    async def complete(self, result: list[ContentBlock]) -> None:
+        """Store the call's result, so repeating the call returns it without rerunning."""
+        self.result = result
+        if self._store is not None:
+            await asyncio.to_thread(self._store._complete_sync, self.key, result)
+
+
+class CheckpointStore:
+    """
+    SQLite store of tool checkpoints, keyed by the client's checkpoint key.
+
+    A key is bound to the tool and arguments it was first used with; reusing
+    it for a different call starts that call afresh. Completed calls are kept
+    for ``completed_ttl`` seconds so a client that missed the response can
+    still collect it.
+    """
+
+    def __init__(self, storage_path: str = "checkpoints.db", completed_ttl: float = 3600.0) -> None:
+        self.storage_path = storage_path
+        self.completed_ttl = completed_ttl
+        self._conn = sqlite3.connect(storage_path, check_same_thread=False, timeout=10.0)
+        self._lock = threading.Lock()
+        # Several workers may share the file; WAL lets them read while one writes
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                key TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                arguments TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                result TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self._prune_sync()
+        logger.info(f"CheckpointStore initialized with storage: {storage_path}")
+
+    @staticmethod
+    def _encode_arguments(arguments: dict[str, Any]) -> str:
+        return json.dumps(arguments, sort_keys=True, separators=(",", ":"))
+
+    async def begin(self, key: str, tool: str, arguments: dict[str, Any]) -> ToolCheckpoint:
+        """Return the checkpoint saved under `key`, or a fresh one if it does not match this call."""
+        row = await asyncio.to_thread(self._load_sync, key)
+        if row is None or row[0] != tool or row[1] != self._encode_arguments(arguments):
+            return ToolCheckpoint(self, key, tool, arguments)
+        _, _, step, state, result = row
+        content = _content_adapter.validate_json(result) if result is not None else None
+        if content is None:
+            logger.info(f"Resuming {tool} from checkpoint '{key}' at step {step}")
+        return ToolCheckpoint(self, key, tool, arguments, step, json.loads(state), content)
+
+    def _load_sync(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT tool, arguments, step, state, result FROM checkpoints WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _save_sync(self, key: str, tool: str, arguments: dict[str, Any], step: int, state: dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (key, tool, arguments, step, state, result, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, NULL, ?)",
+                (key, tool, self._encode_arguments(arguments), step, json.dumps(state), time.time()),
+            )
+
+    def _complete_sync(self, key: str, result: list[ContentBlock]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE checkpoints SET result = ?, updated_at = ? WHERE key = ?",
+                (_content_adapter.dump_json(result, by_alias=True, exclude_none=True).decode("utf-8"),
+                 time.time(), key),
+            )
+        self._prune_sync()
+
+    def _prune_sync(self) -> None:
+        """Delete completed calls older than completed_ttl."""
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                "DELETE FROM checkpoints WHERE result IS NOT NULL AND updated_at < ?",
+                (time.time() - self.completed_ttl,),
+            ).rowcount
+        if deleted:
+            logger.debug(f"Pruned {deleted} completed checkpoints")
+
+    def get_pending_count(self) -> int:
+        """Get the number of calls that have checkpoints but no result yet."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM checkpoints WHERE result IS NULL").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Event Payload Compression for the MCP Event Store
+
+Progress and log notifications are small, nearly identical JSON-RPC messages,
+so they compress poorly on their own. This module compresses them against a
+shared dictionary built from the notification shapes the server sends, using
+zlib or, when the optional ``zstandard`` package is installed, zstd.
+
+Compressed payloads start with a one-byte codec tag and a two-byte dictionary
+ID, so they can be told apart from plain JSON (which starts with ``{``) and
+decompressed with the dictionary they were written with.
+"""
+
+import json
+import struct
+import threading
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+ZLIB_TAG = 0x01
+ZSTD_TAG = 0x02
+_CODEC_TAGS = {"zlib": ZLIB_TAG, "zstd": ZSTD_TAG}
+_HEADER = struct.Struct(">BH")
+
+
+def available_codecs() -> tuple[str, ...]:
+    """Return the codecs usable in this environment."""
+    return ("zlib", "zstd") if zstandard is not None else ("zlib",)
+
+
+def resolve_codec(compression: Optional[str]) -> Optional[str]:
+    """Map a compression setting (None, "auto", "zlib", "zstd") to a codec name."""
+    if compression is None or compression == "none":
+        return None
+    if compression == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if compression not in _CODEC_TAGS:
+        raise ValueError(f"Unknown compression: {compression} (expected none, auto, zlib or zstd)")
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires the 'zstandard' package")
+    return compression
+
+
+def build_dictionary() -> bytes:
+    """Build a dictionary from the JSON-RPC notification shapes the server emits.
+
+    The samples are serialized the same way the event store serializes
+    messages. zlib favours content near the end of its dictionary, so the
+    most common shapes (log and progress notifications) come last.
+    """
+    def dump(message: dict) -> str:
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    samples = [
+        dump({"result": {"content": [{"type": "text", "text": "✅ Task completed successfully!"}], "isError": False},
+              "jsonrpc": "2.0", "id": 1}),
+        dump({"method": "elicitation/create", "params": {"message": "Please confirm", "requestedSchema": {}},
+              "jsonrpc": "2.0", "id": 1}),
+        dump({"method": "sampling/createMessage", "params": {"messages": [{"role": "user", "content": {
+            "type": "text", "text": "Please summarize"}}], "maxTokens": 100}, "jsonrpc": "2.0", "id": 1}),
+    ]
+    progress_messages = ["Checking flights...", "Gathering sources...", "Analyzing data...",
+                         "Summarizing findings...", "Research completed successfully"]
+    for i, text in enumerate(progress_messages):
+        samples.append(dump({"method": "notifications/progress", "params": {
+            "progressToken": 1, "progress": float(i * 25), "total": 100.0, "message": text},
+            "jsonrpc": "2.0"}))
+    for step in (1, 10, 25, 50):
+        samples.append(dump({"method": "notifications/message", "params": {
+            "level": "info", "logger": "long_running_agent",
+            "data": f"Processing step {step}/50 ({step * 2}%)"}, "jsonrpc": "2.0"}))
+    return "".join(samples).encode("utf-8")
+
+
+def is_compressed(data: bytes | str) -> bool:
+    """Return True if a stored payload carries a compression header."""
+    return isinstance(data, bytes) and len(data) >= _HEADER.size and data[0] in (ZLIB_TAG, ZSTD_TAG)
+
+
+def payload_dictionary_id(data: bytes) -> int:
+    """Return the dictionary ID a compressed payload was written with."""
+    return _HEADER.unpack_from(data)[1]
+
+
+class PayloadCompressor:
+    """Compresses and decompresses event payloads with one codec and dictionary."""
+
+    def __init__(self, codec: str, dictionary: bytes, dictionary_id: int, level: Optional[int] = None):
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        self.codec = codec
+        self.dictionary = dictionary
+        self.dictionary_id = dictionary_id
+        self._header = _HEADER.pack(_CODEC_TAGS[codec], dictionary_id)
+
+        if codec == "zstd":
+            self.level = 3 if level is None else level
+            self._zstd_dict = zstandard.ZstdCompressionDict(
+                dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT
+            )
+            # The payload header already identifies the dictionary
+            self._compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self._zstd_dict, write_dict_id=False
+            )
+            # zstd (de)compressors are not thread-safe, and replays decompress
+            # from several reader threads at once
+            self._local = threading.local()
+            self._compress_lock = threading.Lock()
+        else:
+            self.level = 6 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a serialized message and prefix the payload header."""
+        if self.codec == "zstd":
+            with self._compress_lock:
+                body = self._compressor.compress(data)
+        else:
+            # Raw deflate (negative wbits) skips the zlib header and checksum
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=self.dictionary)
+            body = compressor.compress(data) + compressor.flush()
+        return self._header + body
+
+    def decompress(self, data: bytes) -> bytes:
+        """Strip the payload header and decompress the message."""
+        body = memoryview(data)[_HEADER.size:]
+        if self.codec == "zstd":
+            decompressor = getattr(self._local, "decompressor", None)
+            if decompressor is None:
+                decompressor = self._local.decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict)
+            return decompressor.decompress(body)
+        decompressor = zlib.decompressobj(-15, zdict=self.dictionary)
+        return decompressor.decompress(body) + decompressor.flush()
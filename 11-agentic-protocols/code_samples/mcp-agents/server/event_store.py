@@ -8,8 +8,15 @@ by storing and replaying events after client reconnection.
 
 import asyncio
 import logging
+import queue
 import sqlite3
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
 
 from pydantic import TypeAdapter
 
@@ -20,25 +27,119 @@ from mcp.server.streamable_http import (
     EventStore,
     StreamId,
 )
-from mcp.types import JSONRPCMessage
+from mcp.types import JSONRPCError, JSONRPCMessage, JSONRPCNotification, JSONRPCResponse
+
+from .event_compression import (
+    PayloadCompressor,
+    build_dictionary,
+    is_compressed,
+    payload_dictionary_id,
+    resolve_codec,
+)
 
 logger = logging.getLogger(__name__)
 
+# Logger name used for the notification sent when a resume point was evicted
+RESUME_WINDOW_EXPIRED = "resume_window_expired"
+
+
+class _StreamEvents:
+    """Events retained for a single stream, oldest first."""
+
+    __slots__ = ("events", "first_seq", "bytes")
+
+    def __init__(self) -> None:
+        # (event_id, message, size_in_bytes) tuples
+        self.events: deque[tuple[EventId, JSONRPCMessage, int]] = deque()
+        # Per-stream sequence number of events[0]
+        self.first_seq = 0
+        self.bytes = 0
+
+    @property
+    def next_seq(self) -> int:
+        return self.first_seq + len(self.events)
+
+    def tail_after(self, seq: int) -> list[tuple[EventId, JSONRPCMessage, int]]:
+        """Return the events stored after sequence number `seq`, in O(k)."""
+        count = self.next_seq - seq - 1
+        if count <= 0:
+            return []
+        return list(islice(reversed(self.events), count))[::-1]
+
 
 class SimpleEventStore(EventStore):
-    """Simple in-memory event store for testing resumption functionality."""
+    """
+    Simple in-memory event store for testing resumption functionality.
 
-    def __init__(self):
-        self._events: list[tuple[StreamId, EventId, JSONRPCMessage]] = []
+    Events are partitioned per stream and indexed by event ID, so resuming
+    from a known event is a dictionary lookup followed by a slice of that
+    stream's events only, regardless of how many events other streams hold.
+
+    By default the store is unbounded. Passing any of the limits enables
+    bounded mode, in which the oldest events are evicted first once a global
+    or per-stream cap is exceeded or an event is older than ``ttl_seconds``.
+    A client resuming from an evicted event receives a log notification
+    from the ``resume_window_expired`` logger instead of a replay.
+    """
+
+    def __init__(
+        self,
+        max_events: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_events_per_stream: Optional[int] = None,
+        max_bytes_per_stream: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self._streams: dict[StreamId, _StreamEvents] = {}
+        # Event ID -> (stream ID, sequence within stream, stored_at), oldest first
+        self._index: OrderedDict[EventId, tuple[StreamId, int, float]] = OrderedDict()
         self._event_id_counter = 0
-        logger.info("SimpleEventStore initialized")
+
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.max_events_per_stream = max_events_per_stream
+        self.max_bytes_per_stream = max_bytes_per_stream
+        self.ttl_seconds = ttl_seconds
+        self._bounded = any(
+            limit is not None
+            for limit in (max_events, max_bytes, max_events_per_stream, max_bytes_per_stream, ttl_seconds)
+        )
+
+        # Memory usage counters
+        self._total_bytes = 0
+        self._evicted_events = 0
+        self._evicted_bytes = 0
+        self._expired_resumes = 0
+
+        if self._bounded:
+            logger.info(
+                f"SimpleEventStore initialized in bounded mode (max_events={max_events}, "
+                f"max_bytes={max_bytes}, max_events_per_stream={max_events_per_stream}, "
+                f"max_bytes_per_stream={max_bytes_per_stream}, ttl_seconds={ttl_seconds})"
+            )
+        else:
+            logger.info("SimpleEventStore initialized")
 
     async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
         """Store an event and return its ID."""
         self._event_id_counter += 1
         event_id = str(self._event_id_counter)
-        self._events.append((stream_id, event_id, message))
-        logger.info(f"Stored event {event_id} for stream {stream_id}")
+
+        # Sizes are only measured in bounded mode, where they drive eviction
+        size = self._message_size(message) if self._bounded else 0
+
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            stream = self._streams[stream_id] = _StreamEvents()
+        self._index[event_id] = (stream_id, stream.next_seq, time.monotonic())
+        stream.events.append((event_id, message, size))
+        stream.bytes += size
+        self._total_bytes += size
+        logger.debug(f"Stored event {event_id} for stream {stream_id}")
+
+        if self._bounded:
+            self._enforce_stream_limits(stream_id, stream)
+            self._enforce_global_limits()
         return event_id
 
     async def replay_events_after(
@@ -46,58 +147,338 @@ class SimpleEventStore(EventStore):
         last_event_id: EventId,
         send_callback: EventCallback,
     ) -> StreamId | None:
-        """Replay events after the specified ID."""
+        """Replay events after the specified ID, limited to the stream of that event."""
         logger.info(f"Replaying events after {last_event_id}")
-        
-        # Find the index of the last event ID
-        start_index = None
-        for i, (_, event_id, _) in enumerate(self._events):
-            if event_id == last_event_id:
-                start_index = i + 1
-                break
-
-        if start_index is None:
-            # If event ID not found, start from beginning
-            start_index = 0
-            logger.info("Event ID not found, starting from beginning")
-
-        stream_id = None
-        # Replay events
+
+        if self.ttl_seconds is not None:
+            self._evict_expired()
+
+        location = self._index.get(last_event_id)
+        if location is None:
+            if self._was_evicted(last_event_id):
+                self._expired_resumes += 1
+                logger.warning(f"Resume window expired: event {last_event_id} was evicted")
+                await self._send_window_expired(last_event_id, send_callback)
+            else:
+                logger.warning(f"Event ID {last_event_id} not found")
+            return None
+
+        stream_id, seq, _ = location
+
+        # Snapshot the tail so events stored while we are sending are delivered
+        # live instead of being skipped or duplicated.
         replayed_count = 0
-        for _, event_id, message in self._events[start_index:]:
+        for event_id, message, _ in self._streams[stream_id].tail_after(seq):
+            # Priming events carry no message and are not replayed
+            if message is None:
+                continue
             await send_callback(EventMessage(message, event_id))
             replayed_count += 1
-            # Capture the stream ID from the first replayed event
-            if stream_id is None and len(self._events) > start_index:
-                stream_id = self._events[start_index][0]
 
         logger.info(f"Replayed {replayed_count} events, stream_id: {stream_id}")
         return stream_id
 
+    def _was_evicted(self, event_id: EventId) -> bool:
+        """Event IDs are sequential, so an issued ID missing from the index was evicted."""
+        try:
+            return 0 < int(event_id) <= self._event_id_counter
+        except (ValueError, TypeError):
+            return False
+
+    async def _send_window_expired(self, last_event_id: EventId, send_callback: EventCallback) -> None:
+        """Tell the client its resume point is gone so it can restart the request."""
+        notification = JSONRPCNotification(
+            jsonrpc="2.0",
+            method="notifications/message",
+            params={
+                "level": "warning",
+                "logger": RESUME_WINDOW_EXPIRED,
+                "data": f"Resume window expired: event {last_event_id} is no longer available",
+            },
+        )
+        # No event ID, so the client's Last-Event-ID is left untouched
+        await send_callback(EventMessage(JSONRPCMessage(notification), None))
+
+    @staticmethod
+    def _message_size(message: JSONRPCMessage | None) -> int:
+        """Approximate the memory held by a message by its serialized size."""
+        if message is None:
+            return 0
+        return len(message.model_dump_json(by_alias=True, exclude_none=True))
+
+    def _evict_oldest_from_stream(self, stream_id: StreamId, stream: _StreamEvents) -> None:
+        event_id, _, size = stream.events.popleft()
+        stream.first_seq += 1
+        stream.bytes -= size
+        del self._index[event_id]
+        self._total_bytes -= size
+        self._evicted_events += 1
+        self._evicted_bytes += size
+        if not stream.events:
+            del self._streams[stream_id]
+
+    def _evict_oldest(self) -> None:
+        # The globally oldest event is always the head of its own stream
+        event_id, (stream_id, _, _) = next(iter(self._index.items()))
+        self._evict_oldest_from_stream(stream_id, self._streams[stream_id])
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._index and next(iter(self._index.values()))[2] < cutoff:
+            self._evict_oldest()
+
+    def _enforce_stream_limits(self, stream_id: StreamId, stream: _StreamEvents) -> None:
+        # Always keep the newest event so the stream can still be resumed from it
+        while len(stream.events) > 1 and (
+            (self.max_events_per_stream is not None and len(stream.events) > self.max_events_per_stream)
+            or (self.max_bytes_per_stream is not None and stream.bytes > self.max_bytes_per_stream)
+        ):
+            self._evict_oldest_from_stream(stream_id, stream)
+
+    def _enforce_global_limits(self) -> None:
+        if self.ttl_seconds is not None:
+            self._evict_expired()
+        while len(self._index) > 1 and (
+            (self.max_events is not None and len(self._index) > self.max_events)
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            self._evict_oldest()
+
+    async def delete_stream(self, stream_id: StreamId) -> int:
+        """Delete all events of a stream that can no longer be resumed; return how many."""
+        stream = self._streams.pop(stream_id, None)
+        if stream is None:
+            return 0
+        for event_id, _, _ in stream.events:
+            del self._index[event_id]
+        self._total_bytes -= stream.bytes
+        return len(stream.events)
+
     def get_event_count(self) -> int:
         """Get the total number of stored events."""
-        return len(self._events)
+        return len(self._index)
+
+    def get_stream_count(self) -> int:
+        """Get the number of streams with stored events."""
+        return len(self._streams)
+
+    def get_memory_stats(self) -> dict[str, Any]:
+        """Get memory usage and eviction counters, for sizing the bounded mode."""
+        return {
+            "events": len(self._index),
+            "streams": len(self._streams),
+            "bytes": self._total_bytes,
+            "evicted_events": self._evicted_events,
+            "evicted_bytes": self._evicted_bytes,
+            "expired_resumes": self._expired_resumes,
+            "bounded": self._bounded,
+        }
 
-    def clear_events(self) -> None:
+    async def clear_events(self) -> None:
         """Clear all stored events."""
-        self._events.clear()
+        self._streams.clear()
+        self._index.clear()
         self._event_id_counter = 0
+        self._total_bytes = 0
         logger.info("Event store cleared")
 
 
+class RawJSONRPCMessage:
+    """
+    A stored JSON-RPC message replayed without a pydantic round trip.
+
+    The streamable HTTP transport only calls ``model_dump_json()`` on replayed
+    messages, which returns the stored JSON as-is. Any other attribute access
+    validates the JSON once and delegates to the resulting JSONRPCMessage.
+    """
+
+    __slots__ = ("_data", "_message")
+
+    _adapter = TypeAdapter(JSONRPCMessage)
+
+    def __init__(self, data: bytes | memoryview | str) -> None:
+        self._data = data
+        self._message: JSONRPCMessage | None = None
+
+    def model_dump_json(self, **kwargs: Any) -> str:
+        """Return the stored JSON, which was serialized the way the transport sends it."""
+        data = self._data
+        return data if isinstance(data, str) else str(data, "utf-8")
+
+    def validate(self) -> JSONRPCMessage:
+        """Parse the stored JSON into a JSONRPCMessage, once."""
+        if self._message is None:
+            data = self._data
+            self._message = self._adapter.validate_json(bytes(data) if isinstance(data, memoryview) else data)
+        return self._message
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.validate(), name)
+
+
 class PersistentEventStore(EventStore):
     """
     Event store that persists events to disk using SQLite.
+
+    Writes go through a write-behind pipeline: ``store_event`` assigns the
+    event ID immediately, in call order, and queues the row for a background
+    writer that inserts queued rows with a single commit per batch. The
+    ``durability`` setting controls when ``store_event`` returns:
+
+    - ``"event"``: insert and commit each event on its own (no batching)
+    - ``"batch"``: wait until the batch containing the event is committed
+    - ``"async"``: return as soon as the event is queued; a crash may lose
+      events that were not yet committed
+
+    With ``shared=True`` several processes can use the same database file:
+    SQLite assigns event IDs inside each write transaction instead of this
+    process, so IDs stay unique across processes. ``store_event`` then
+    returns once the event is committed, so ``"async"`` is not available.
+
+    Replays page through the ``(stream_id, id)`` index ``chunk_size`` rows at
+    a time, so memory stays bounded however far behind the client is.
+
+    Messages are stored as the JSON bytes the transport sends. With
+    ``replay_validation="lazy"`` replayed rows are passed to the send path as
+    RawJSONRPCMessage objects and only validated if something inspects them;
+    ``"full"`` validates every row before sending it.
+
+    Old events can be removed by ``run_retention`` or a background task
+    started with ``start_retention``, which delete in small slices and then
+    return the freed pages to the filesystem with incremental vacuum.
+
+    ``compression`` ("zlib", "zstd" or "auto") compresses stored payloads
+    against a shared dictionary of notification shapes; see event_compression.
+
+    The database runs in WAL mode with a single writer connection and a pool
+    of read-only connections used for replays, so replay traffic never waits
+    behind ingestion. ``synchronous``, ``mmap_size`` and ``cache_size`` are
+    passed straight to the matching SQLite pragmas.
     """
-    
-    def __init__(self, storage_path: str = "events.db") -> None:
+
+    DURABILITY_MODES = ("event", "batch", "async")
+    REPLAY_VALIDATION_MODES = ("full", "lazy")
+    SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+    def __init__(
+        self,
+        storage_path: str = "events.db",
+        durability: str = "batch",
+        batch_size: int = 256,
+        batch_interval: float = 0.0,
+        synchronous: str = "NORMAL",
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size: int = -16000,
+        read_pool_size: int = 4,
+        chunk_size: int = 256,
+        replay_validation: str = "full",
+        compression: Optional[str] = None,
+        compression_level: Optional[int] = None,
+        shared: bool = False,
+    ) -> None:
+        if durability not in self.DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability} (expected one of {self.DURABILITY_MODES})")
+        if shared and durability == "async":
+            raise ValueError("A shared PersistentEventStore cannot use async durability")
+        if replay_validation not in self.REPLAY_VALIDATION_MODES:
+            raise ValueError(
+                f"Unknown replay validation mode: {replay_validation} "
+                f"(expected one of {self.REPLAY_VALIDATION_MODES})"
+            )
+        synchronous = synchronous.upper()
+        if synchronous not in self.SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown synchronous level: {synchronous} (expected one of {self.SYNCHRONOUS_LEVELS})")
+
         self.storage_path = storage_path
+        self.durability = durability
+        self.shared = shared
+        # Maximum rows per commit, and how long the writer lingers to grow a batch
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        # Rows fetched per query when replaying
+        self.chunk_size = chunk_size
+        self.replay_validation = replay_validation
+        self.compression = resolve_codec(compression)
+        self.synchronous = synchronous
+        # mmap_size in bytes; cache_size in pages, or KiB when negative
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
         self._adapter = TypeAdapter(JSONRPCMessage)
 
-        # Use check_same_thread=False to allow access from asyncio executor threads
+        # Single writer connection. Use check_same_thread=False to allow access
+        # from asyncio executor threads
         self._conn = sqlite3.connect(self.storage_path, check_same_thread=False)
+        # Serializes writes from concurrent executor threads on the writer connection
+        self._write_lock = threading.Lock()
+        self._configure_writer()
         self._create_table()
-        logger.info(f"PersistentEventStore initialized with {self.storage_path}")
+        self._migrate()
+
+        # Compressors by dictionary ID, for payloads written with any dictionary
+        self._decompressors: dict[int, PayloadCompressor] = {}
+        self._compressor: Optional[PayloadCompressor] = None
+        if self.compression is not None:
+            self._compressor = self._load_compressor(self.compression, compression_level)
+
+        # Read-only connections for replays, opened after the table exists.
+        # An in-memory database is private to its connection, so it reads
+        # through the writer instead.
+        self._readers: Optional[queue.Queue[sqlite3.Connection]] = None
+        if self.storage_path != ":memory:" and read_pool_size > 0:
+            self._readers = queue.Queue()
+            for _ in range(read_pool_size):
+                self._readers.put(self._open_reader())
+
+        # Event IDs are assigned here rather than by SQLite so they can be
+        # returned before the row is written
+        self._last_event_id = self._load_last_event_id()
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+        self._retention_task: Optional[asyncio.Task] = None
+        self.last_retention_report: Optional[dict[str, Any]] = None
+        self._vacuum_warning_logged = False
+
+        logger.info(
+            f"PersistentEventStore initialized with {self.storage_path} "
+            f"(durability={durability}, synchronous={synchronous}, read_pool_size={read_pool_size})"
+        )
+
+    def _apply_cache_pragmas(self, conn: sqlite3.Connection) -> None:
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+
+    def _configure_writer(self) -> None:
+        """Switch the database to WAL mode and tune the writer connection."""
+        # Must precede anything that writes the file header, and only takes
+        # effect for new databases; existing ones need a full vacuum()
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        journal_mode = self._conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            # In-memory databases cannot use WAL
+            logger.warning(f"WAL mode unavailable for {self.storage_path}, using journal_mode={journal_mode}")
+        self._conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        self._apply_cache_pragmas(self._conn)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        """Open a read-only connection to the database."""
+        uri = f"{Path(self.storage_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._apply_cache_pragmas(conn)
+        return conn
+
+    @contextmanager
+    def _reader(self):
+        """Borrow a read-only connection from the pool, waiting if all are in use."""
+        if self._readers is None:
+            with self._write_lock:
+                yield self._conn
+            return
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
 
     def _create_table(self) -> None:
         """Create the events table if it doesn't exist."""
@@ -107,7 +488,7 @@ class PersistentEventStore(EventStore):
                 CREATE TABLE IF NOT EXISTS events (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     stream_id TEXT NOT NULL,
-                    message TEXT NOT NULL
+                    message BLOB NOT NULL
                 )
             """)
             self._conn.commit()
@@ -124,26 +505,197 @@ class PersistentEventStore(EventStore):
             except Exception:
                 logger.exception("Failed to close SQLite cursor after table creation")
     
+    # Schema migrations applied in order; PRAGMA user_version records how many ran
+    _MIGRATIONS = (
+        # 1: index stream replays so they seek instead of scanning the table
+        "CREATE INDEX IF NOT EXISTS idx_events_stream_id ON events (stream_id, id)",
+        # 2: dictionaries that compressed payloads reference by ID
+        """CREATE TABLE IF NOT EXISTS compression_dictionaries (
+            id INTEGER PRIMARY KEY,
+            codec TEXT NOT NULL,
+            data BLOB NOT NULL
+        )""",
+        # 3: event timestamps for age-based retention (NULL for older rows)
+        "ALTER TABLE events ADD COLUMN created_at REAL",
+        # 4: streams whose request has been answered, for retention
+        """CREATE TABLE IF NOT EXISTS completed_streams (
+            stream_id TEXT PRIMARY KEY,
+            completed_at REAL NOT NULL
+        )""",
+        # 5: the event that completed the stream; retention deletes only up to it (NULL for older rows)
+        "ALTER TABLE completed_streams ADD COLUMN last_event_id INTEGER",
+    )
+
+    def _migrate(self) -> None:
+        """Bring the schema up to date with _MIGRATIONS."""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= len(self._MIGRATIONS):
+            return
+        # Take the write lock before re-reading the version, so processes
+        # opening the same file at once do not apply a migration twice
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, statement in enumerate(self._MIGRATIONS[version:], start=version + 1):
+                logger.info(f"Applying PersistentEventStore schema migration {number}")
+                self._conn.execute(statement)
+                self._conn.execute(f"PRAGMA user_version = {number}")
+            self._conn.commit()
+        except sqlite3.Error:
+            self._conn.rollback()
+            raise
+
+    def _load_compressor(self, codec: str, level: Optional[int]) -> PayloadCompressor:
+        """Return a compressor for the current dictionary, registering it if it is new."""
+        dictionary = build_dictionary()
+        with self._write_lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM compression_dictionaries WHERE codec = ? AND data = ?",
+                (codec, dictionary)
+            ).fetchone()
+            if row:
+                dictionary_id = row[0]
+            else:
+                dictionary_id = self._conn.execute(
+                    "INSERT INTO compression_dictionaries (codec, data) VALUES (?, ?)",
+                    (codec, dictionary)
+                ).lastrowid
+        compressor = PayloadCompressor(codec, dictionary, dictionary_id, level)
+        self._decompressors[dictionary_id] = compressor
+        return compressor
+
+    def _decompress(self, data: bytes) -> bytes:
+        dictionary_id = payload_dictionary_id(data)
+        decompressor = self._decompressors.get(dictionary_id)
+        if decompressor is None:
+            # Written with an older dictionary, or by another process
+            with self._reader() as conn:
+                row = conn.execute(
+                    "SELECT codec, data FROM compression_dictionaries WHERE id = ?", (dictionary_id,)
+                ).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown compression dictionary {dictionary_id}")
+            decompressor = self._decompressors[dictionary_id] = PayloadCompressor(row[0], row[1], dictionary_id)
+        return decompressor.decompress(data)
+
+    def _load_last_event_id(self) -> int:
+        """Return the highest event ID ever issued, including deleted ones."""
+        cursor = self._conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'")
+        row = cursor.fetchone()
+        last_seq = row[0] if row else 0
+        cursor.execute("SELECT MAX(id) FROM events")
+        row = cursor.fetchone()
+        return max(last_seq, row[0] or 0)
+
     async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
         """Store an event and return its ID."""
-        # Serialize message to JSON
-        json_str = self._adapter.dump_json(message).decode('utf-8')
+        # Serialize exactly as the transport will send it, so replays can reuse
+        # the bytes. Priming events have no message and are stored empty.
+        data = b"" if message is None else self._adapter.dump_json(message, by_alias=True, exclude_none=True)
 
-        # Run DB operation in thread pool to avoid blocking event loop
-        return await asyncio.to_thread(self._store_event_sync, stream_id, json_str)
+        # A response or error is the last event of its request's stream
+        completed = message is not None and isinstance(message.root, (JSONRPCResponse, JSONRPCError))
 
-    def _store_event_sync(self, stream_id: StreamId, json_str: str) -> EventId:
-        cursor = self._conn.cursor()
-        cursor.execute(
-            "INSERT INTO events (stream_id, message) VALUES (?, ?)",
-            (stream_id, json_str)
-        )
-        self._conn.commit()
+        # Assign the ID before any await so IDs follow call order; a shared
+        # store leaves it to SQLite
+        if self.shared:
+            event_id = None
+        else:
+            self._last_event_id += 1
+            event_id = self._last_event_id
+        row = (event_id, stream_id, data, time.time(), completed)
+
+        if self.durability == "event":
+            # Run DB operation in thread pool to avoid blocking event loop
+            event_ids = await asyncio.to_thread(self._store_events_sync, [row])
+            return str(event_ids[0])
+
+        committed = asyncio.get_running_loop().create_future() if self.durability == "batch" else None
+        self._ensure_writer().put_nowait((row, committed))
+        if committed is not None:
+            event_id = await committed
+        return str(event_id)
+
+    def _ensure_writer(self) -> asyncio.Queue:
+        """Start the background writer on first use, inside the running event loop."""
+        if self._writer_task is None or self._writer_task.done():
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer_loop(self._queue))
+        return self._queue
+
+    async def _writer_loop(self, queue: asyncio.Queue) -> None:
+        """Commit queued events in batches until cancelled."""
+        while True:
+            batch = [await queue.get()]
+            self._drain_queue(queue, batch)
+            if len(batch) < self.batch_size and self.batch_interval > 0:
+                await asyncio.sleep(self.batch_interval)
+                self._drain_queue(queue, batch)
+
+            try:
+                event_ids = await asyncio.to_thread(self._store_events_sync, [row for row, _ in batch])
+            except Exception as e:
+                logger.error(f"Failed to store batch of {len(batch)} events: {e}")
+                for _, committed in batch:
+                    if committed is not None and not committed.done():
+                        committed.set_exception(e)
+            else:
+                for (_, committed), event_id in zip(batch, event_ids):
+                    if committed is not None and not committed.done():
+                        committed.set_result(event_id)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _drain_queue(self, queue: asyncio.Queue, batch: list) -> None:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    def _store_events_sync(self, rows: list[tuple[Optional[int], StreamId, bytes, float, bool]]) -> list[int]:
+        """Insert rows in one transaction and return their event IDs."""
+        # Compress here, off the event loop; empty priming payloads stay empty
+        compress = self._compressor.compress if self._compressor is not None else None
+        values = [
+            (event_id, stream_id, compress(data) if compress and data else data, created_at)
+            for event_id, stream_id, data, created_at, _ in rows
+        ]
+        insert = "INSERT INTO events (id, stream_id, message, created_at) VALUES (?, ?, ?, ?)"
+        with self._write_lock:
+            try:
+                if self.shared:
+                    # IDs come from SQLite, one insert at a time to read each one back
+                    event_ids = [self._conn.execute(insert, row).lastrowid for row in values]
+                else:
+                    self._conn.executemany(insert, values)
+                    event_ids = [row[0] for row in values]
+                # Stream IDs are request IDs, which other sessions reuse: record the
+                # completing event so retention leaves later events of the same ID alone
+                completions = [
+                    (stream_id, created_at, event_id)
+                    for (_, stream_id, _, created_at, completed), event_id in zip(rows, event_ids)
+                    if completed
+                ]
+                if completions:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO completed_streams (stream_id, completed_at, last_event_id) "
+                        "VALUES (?, ?, ?)",
+                        completions
+                    )
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        logger.debug(f"Stored {len(rows)} events up to {event_ids[-1]}")
+        return event_ids
+
+    async def flush(self) -> None:
+        """Wait until every queued event has been written."""
+        if self._queue is not None and self._writer_task is not None and not self._writer_task.done():
+            await self._queue.join()
 
-        event_id = str(cursor.lastrowid)
-        logger.info(f"Stored event {event_id} for stream {stream_id}")
-        return event_id
-    
     async def replay_events_after(
         self,
         last_event_id: EventId,
@@ -152,76 +704,310 @@ class PersistentEventStore(EventStore):
         """Replay events after the specified ID, filtered by the stream of the last event."""
         logger.info(f"Replaying events after {last_event_id}")
 
-        # Fetch events in thread pool
-        events_data = await asyncio.to_thread(self._fetch_events_sync, last_event_id)
+        # Make sure events that are still queued are visible to the query
+        await self.flush()
+
+        try:
+            target_id = int(last_event_id)
+        except (ValueError, TypeError):
+            logger.warning(f"Invalid event ID format: {last_event_id}")
+            return None
 
-        if events_data is None:
+        # Identify the stream from the last event ID
+        stream_id = await asyncio.to_thread(self._fetch_stream_id_sync, target_id)
+        if stream_id is None:
             logger.warning(f"Could not resume stream from event {last_event_id}")
             return None
 
-        stream_id = None
         replayed_count = 0
-
-        for event_id, row_stream_id, message_json in events_data:
-            if stream_id is None:
-                stream_id = row_stream_id
-
+        lazy = self.replay_validation == "lazy"
+        async for event_id, message_json in self.iter_stream_events(stream_id, target_id):
+            # Priming events carry no message and are not replayed
+            if not message_json:
+                continue
             try:
-                message = self._adapter.validate_json(message_json)
-                await send_callback(EventMessage(message, event_id))
-                replayed_count += 1
+                message = RawJSONRPCMessage(message_json) if lazy else self._adapter.validate_json(message_json)
             except Exception as e:
                 logger.error(f"Failed to deserialize event {event_id}: {e}")
+                continue
+            await send_callback(EventMessage(message, event_id))
+            replayed_count += 1
 
         logger.info(f"Replayed {replayed_count} events for stream {stream_id}")
         return stream_id
 
-    def _fetch_events_sync(self, last_event_id: EventId) -> list[tuple[EventId, StreamId, str]] | None:
-        try:
-            target_id = int(last_event_id)
-        except (ValueError, TypeError):
-            logger.warning(f"Invalid event ID format: {last_event_id}")
-            return None
-
-        cursor = self._conn.cursor()
-
-        # 1. Identify the stream from the last event ID
-        cursor.execute("SELECT stream_id FROM events WHERE id = ?", (target_id,))
-        result = cursor.fetchone()
+    async def iter_stream_events(self, stream_id: StreamId, after_id: int) -> AsyncIterator[tuple[EventId, bytes | str]]:
+        """Yield (event_id, message_json) for a stream's events after `after_id`, one chunk per query."""
+        while True:
+            rows = await asyncio.to_thread(self._fetch_chunk_sync, stream_id, after_id)
+            for event_id, message_json in rows:
+                yield str(event_id), message_json
+            if len(rows) < self.chunk_size:
+                return
+            after_id = rows[-1][0]
 
+    def _fetch_stream_id_sync(self, event_id: int) -> StreamId | None:
+        with self._reader() as conn:
+            result = conn.execute("SELECT stream_id FROM events WHERE id = ?", (event_id,)).fetchone()
         if not result:
-            logger.warning(f"Event ID {target_id} not found")
+            logger.warning(f"Event ID {event_id} not found")
             return None
+        return result[0]
 
-        stream_id = result[0]
-
-        # 2. Fetch subsequent events for THIS STREAM ONLY
-        cursor.execute(
-            "SELECT id, stream_id, message FROM events WHERE id > ? AND stream_id = ? ORDER BY id ASC",
-            (target_id, stream_id)
-        )
-
-        # Convert rows to list of (str_id, stream_id, msg_json)
-        return [(str(row[0]), row[1], row[2]) for row in cursor.fetchall()]
+    def _fetch_chunk_sync(self, stream_id: StreamId, after_id: int) -> list[tuple[int, bytes | str]]:
+        # Keyset pagination over the (stream_id, id) index; each chunk is its own
+        # short read so a slow client never pins a WAL snapshot
+        with self._reader() as conn:
+            rows = conn.execute(
+                "SELECT id, message FROM events WHERE stream_id = ? AND id > ? ORDER BY id ASC LIMIT ?",
+                (stream_id, after_id, self.chunk_size)
+            ).fetchall()
+        # Decompress here, off the event loop
+        return [
+            (event_id, self._decompress(data) if is_compressed(data) else data)
+            for event_id, data in rows
+        ]
 
     def get_event_count(self) -> int:
         """Get the total number of stored events."""
-        cursor = self._conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM events")
-        result = cursor.fetchone()
+        with self._reader() as conn:
+            result = conn.execute("SELECT COUNT(*) FROM events").fetchone()
         return result[0] if result else 0
 
-    def clear_events(self) -> None:
-        """Clear all stored events."""
-        cursor = self._conn.cursor()
-        cursor.execute("DELETE FROM events")
-        # Reset auto-increment sequence
-        cursor.execute("DELETE FROM sqlite_sequence WHERE name='events'")
-        self._conn.commit()
+    async def clear_events(self) -> None:
+        """Clear all stored events, after writing the queued ones."""
+        # A queued row written after the delete would survive it and, with the
+        # counter reset, collide with the IDs handed out next
+        await self.flush()
+        with self._write_lock:
+            cursor = self._conn.cursor()
+            cursor.execute("DELETE FROM events")
+            cursor.execute("DELETE FROM completed_streams")
+            # Reset auto-increment sequence
+            cursor.execute("DELETE FROM sqlite_sequence WHERE name='events'")
+            self._conn.commit()
+        self._last_event_id = 0
         logger.info("Event store cleared")
 
+    def start_retention(
+        self,
+        interval: float = 60.0,
+        max_age: Optional[float] = None,
+        completed_ttl: Optional[float] = 300.0,
+        max_events_per_stream: Optional[int] = None,
+    ) -> asyncio.Task:
+        """Run run_retention every `interval` seconds in a background task until aclose()."""
+        async def retention_loop() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.run_retention(max_age, completed_ttl, max_events_per_stream)
+                except Exception:
+                    logger.exception("Event store retention pass failed")
+
+        if self._retention_task is not None:
+            self._retention_task.cancel()
+        self._retention_task = asyncio.create_task(retention_loop())
+        return self._retention_task
+
+    async def run_retention(
+        self,
+        max_age: Optional[float] = None,
+        completed_ttl: Optional[float] = None,
+        max_events_per_stream: Optional[int] = None,
+        slice_size: int = 500,
+        vacuum_pages: int = 256,
+    ) -> dict[str, Any]:
+        """
+        Delete events that are no longer needed and reclaim their space.
+
+        - max_age: delete events older than this many seconds (events stored
+          before timestamps were recorded count as expired)
+        - completed_ttl: delete the events of streams whose response was
+          stored more than this many seconds ago, up to that response
+        - max_events_per_stream: keep only the newest events of each stream
+
+        Work is done in slices of `slice_size` rows and `vacuum_pages` pages,
+        each in its own transaction, yielding to the event loop in between.
+        Returns a report of deleted events, reclaimed bytes and duration.
+        """
+        start = time.perf_counter()
+        size_before = await asyncio.to_thread(self._database_size_sync)
+        deleted = 0
+        completed_streams = 0
+
+        # Age: ids grow with time, so the expired events are the oldest ids
+        if max_age is not None:
+            cutoff = time.time() - max_age
+            while True:
+                count = await asyncio.to_thread(self._delete_expired_slice_sync, cutoff, slice_size)
+                deleted += count
+                if count < slice_size:
+                    break
+                await asyncio.sleep(0)
+
+        # Completed streams past their grace period
+        if completed_ttl is not None:
+            cutoff = time.time() - completed_ttl
+            completions = await asyncio.to_thread(self._fetch_completed_streams_sync, cutoff)
+            for stream_id, last_event_id in completions:
+                deleted += await self._delete_stream_events(stream_id, last_event_id, slice_size)
+                if last_event_id is not None:
+                    await asyncio.to_thread(self._forget_completion_sync, stream_id, last_event_id)
+                completed_streams += 1
+
+        # Per-stream caps: drop everything older than the newest N events
+        if max_events_per_stream is not None:
+            thresholds = await asyncio.to_thread(self._fetch_stream_thresholds_sync, max_events_per_stream)
+            for stream_id, threshold_id in thresholds:
+                deleted += await self._delete_stream_events(stream_id, threshold_id, slice_size)
+
+        # Return freed pages to the filesystem a slice at a time
+        while await asyncio.to_thread(self._incremental_vacuum_sync, vacuum_pages):
+            await asyncio.sleep(0)
+
+        size_after = await asyncio.to_thread(self._database_size_sync)
+        report = {
+            "deleted_events": deleted,
+            "completed_streams": completed_streams,
+            "reclaimed_bytes": max(size_before - size_after, 0),
+            "duration_seconds": time.perf_counter() - start,
+        }
+        self.last_retention_report = report
+        logger.info(
+            f"Retention removed {deleted} events ({completed_streams} completed streams), "
+            f"reclaimed {report['reclaimed_bytes']} bytes in {report['duration_seconds']:.3f}s"
+        )
+        return report
+
+    async def _delete_stream_events(self, stream_id: StreamId, up_to_id: Optional[int], slice_size: int) -> int:
+        """Delete a stream's events (all, or those with id <= up_to_id) slice by slice."""
+        deleted = 0
+        while True:
+            count = await asyncio.to_thread(self._delete_stream_slice_sync, stream_id, up_to_id, slice_size)
+            deleted += count
+            if count < slice_size:
+                return deleted
+            await asyncio.sleep(0)
+
+    async def delete_stream(self, stream_id: StreamId, slice_size: int = 500) -> int:
+        """Delete all events of a stream that can no longer be resumed; return how many."""
+        # Queued events of the stream would otherwise be written after the delete
+        await self.flush()
+        return await self._delete_stream_events(stream_id, None, slice_size)
+
+    def _delete_expired_slice_sync(self, cutoff: float, slice_size: int) -> int:
+        with self._write_lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, created_at FROM events ORDER BY id ASC LIMIT ?", (slice_size,)
+            ).fetchall()
+            expired = []
+            for event_id, created_at in rows:
+                if created_at is not None and created_at >= cutoff:
+                    break
+                expired.append((event_id,))
+            self._conn.executemany("DELETE FROM events WHERE id = ?", expired)
+        return len(expired)
+
+    def _fetch_completed_streams_sync(self, cutoff: float) -> list[tuple[StreamId, Optional[int]]]:
+        """Return (stream_id, completing event id) of streams completed before `cutoff`."""
+        with self._reader() as conn:
+            return conn.execute(
+                "SELECT stream_id, last_event_id FROM completed_streams WHERE completed_at < ?", (cutoff,)
+            ).fetchall()
+
+    def _forget_completion_sync(self, stream_id: StreamId, last_event_id: int) -> None:
+        # A newer completion of the same stream ID replaced the row; keep that one
+        with self._write_lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM completed_streams WHERE stream_id = ? AND last_event_id = ?", (stream_id, last_event_id)
+            )
+
+    def _fetch_stream_thresholds_sync(self, keep: int) -> list[tuple[StreamId, int]]:
+        """Return (stream_id, highest id to delete) for streams holding more than `keep` events."""
+        with self._reader() as conn:
+            streams = conn.execute(
+                "SELECT stream_id FROM events GROUP BY stream_id HAVING COUNT(*) > ?", (keep,)
+            ).fetchall()
+            thresholds = []
+            for (stream_id,) in streams:
+                row = conn.execute(
+                    "SELECT id FROM events WHERE stream_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (stream_id, keep)
+                ).fetchone()
+                if row:
+                    thresholds.append((stream_id, row[0]))
+        return thresholds
+
+    def _delete_stream_slice_sync(self, stream_id: StreamId, up_to_id: Optional[int], slice_size: int) -> int:
+        # IDs are signed 64-bit integers in SQLite
+        upper = up_to_id if up_to_id is not None else 2 ** 63 - 1
+        with self._write_lock, self._conn:
+            count = self._conn.execute(
+                "DELETE FROM events WHERE id IN "
+                "(SELECT id FROM events WHERE stream_id = ? AND id <= ? ORDER BY id LIMIT ?)",
+                (stream_id, upper, slice_size)
+            ).rowcount
+            if up_to_id is None and count < slice_size:
+                self._conn.execute("DELETE FROM completed_streams WHERE stream_id = ?", (stream_id,))
+        return count
+
+    def _incremental_vacuum_sync(self, pages: int) -> bool:
+        """Free up to `pages` pages; return True while free pages remain."""
+        with self._write_lock:
+            if self._conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                if not self._vacuum_warning_logged:
+                    logger.info(
+                        "Database was created without incremental auto_vacuum; deleted space is "
+                        "reused but not returned to the filesystem until vacuum() is run once"
+                    )
+                    self._vacuum_warning_logged = True
+                return False
+            self._conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return self._conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+
+    def _database_size_sync(self) -> int:
+        with self._write_lock:
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    async def vacuum(self) -> None:
+        """Rebuild the database file and enable incremental vacuum on it (blocks writes while running)."""
+        def vacuum_sync() -> None:
+            with self._write_lock:
+                self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                self._conn.execute("VACUUM")
+
+        await self.flush()
+        await asyncio.to_thread(vacuum_sync)
+        logger.info("PersistentEventStore vacuumed")
+
+    async def aclose(self) -> None:
+        """Write any queued events, stop the background tasks and close the connection."""
+        if self._retention_task is not None:
+            self._retention_task.cancel()
+            self._retention_task = None
+        await self.flush()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        self.close()
+
     def close(self) -> None:
-        """Close the underlying SQLite connection."""
+        """Close the underlying SQLite connections."""
+        if self._queue is not None and self._queue.qsize():
+            logger.warning(f"Closing PersistentEventStore with {self._queue.qsize()} unwritten events; use aclose()")
+        readers = getattr(self, "_readers", None)
+        while readers is not None and not readers.empty():
+            try:
+                readers.get_nowait().close()
+            except sqlite3.Error as exc:
+                logger.warning("Error closing PersistentEventStore reader connection: %s", exc)
         conn = getattr(self, "_conn", None)
         if conn is None:
             return
@@ -240,3 +1026,11 @@ class PersistentEventStore(EventStore):
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         """Exit the runtime context and close the connection."""
         self.close()
+
+    async def __aenter__(self) -> "PersistentEventStore":
+        """Enter the async runtime context related to this object."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Exit the async runtime context, flushing queued events first."""
+        await self.aclose()
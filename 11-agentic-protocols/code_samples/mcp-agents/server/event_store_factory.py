@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Event Store Selection for the Resumable MCP Server
+
+This module builds the event store the server runs with from a backend name,
+an optional shard count and backend-specific tuning options, as given on the
+command line or in a JSON config file.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Optional
+
+from mcp.server.streamable_http import EventStore
+
+from .event_store import PersistentEventStore, SimpleEventStore
+from .log_event_store import LogEventStore
+from .sharded_event_store import ShardedEventStore
+
+logger = logging.getLogger(__name__)
+
+EVENT_STORE_BACKENDS = ("memory", "sqlite", "log", "none")
+
+# Default storage location per backend (a file for sqlite, a directory for log)
+_DEFAULT_PATHS = {"sqlite": "events.db", "log": "events_log"}
+
+
+def _shard_path(path: str, shard: int) -> str:
+    """Derive a shard's storage path, e.g. events.db -> events-0.db."""
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}-{shard}{p.suffix}"))
+
+
+def _create_single_store(backend: str, path: Optional[str], options: dict[str, Any]) -> EventStore:
+    try:
+        if backend == "memory":
+            return SimpleEventStore(**options)
+        if backend == "sqlite":
+            return PersistentEventStore(path or _DEFAULT_PATHS["sqlite"], **options)
+        if backend == "log":
+            return LogEventStore(path or _DEFAULT_PATHS["log"], **options)
+    except TypeError as e:
+        raise ValueError(f"Invalid option for '{backend}' event store: {e}") from e
+    raise ValueError(f"Unknown event store backend: {backend} (expected one of {EVENT_STORE_BACKENDS})")
+
+
+def create_event_store(
+    backend: str = "memory",
+    path: Optional[str] = None,
+    shards: int = 1,
+    options: Optional[dict[str, Any]] = None,
+) -> Optional[EventStore]:
+    """
+    Create an event store.
+
+    - backend: "memory", "sqlite", "log" or "none" (no resumption)
+    - path: database file (sqlite) or directory (log); shards get numbered copies
+    - shards: when greater than 1, wrap that many stores in a ShardedEventStore
+    - options: keyword arguments for the backend's constructor, e.g.
+      {"durability": "async", "compression": "zlib"} for sqlite
+    """
+    options = dict(options or {})
+    if backend == "none":
+        return None
+    if shards < 1:
+        raise ValueError(f"Shard count must be at least 1, got {shards}")
+    if shards == 1:
+        return _create_single_store(backend, path, options)
+
+    base_path = path or _DEFAULT_PATHS.get(backend)
+    stores = [
+        _create_single_store(backend, _shard_path(base_path, i) if base_path else None, options)
+        for i in range(shards)
+    ]
+    return ShardedEventStore(stores)
+
+
+def load_event_store_config(config_path: str) -> dict[str, Any]:
+    """
+    Load event store settings from a JSON file, e.g.
+
+        {"backend": "sqlite", "path": "data/events.db", "shards": 4,
+         "options": {"durability": "batch", "synchronous": "NORMAL"}}
+    """
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    unknown = set(config) - {"backend", "path", "shards", "options"}
+    if unknown:
+        raise ValueError(f"Unknown event store config keys: {', '.join(sorted(unknown))}")
+    return config
+
+
+def parse_option(option: str) -> tuple[str, Any]:
+    """Parse a KEY=VALUE option; VALUE is read as JSON when possible."""
+    key, separator, value = option.partition("=")
+    if not separator or not key:
+        raise ValueError(f"Option must be KEY=VALUE, got '{option}'")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Pre-Answered Elicitation and Sampling for Tools
+
+``travel_agent`` asks the client to confirm a price (elicitation) and
+``research_agent`` asks it for a summary (sampling). Each question is a full
+server-to-client round trip in the middle of the tool, while it holds a
+scheduler slot. A client that already knows its answers can supply them up
+front, and the tool then continues without asking:
+
+- per call, in the tools/call request's ``_meta.interactionPolicy``
+- per session, as ``capabilities.experimental.interactionPolicy`` when
+  initializing (a call's policy takes precedence)
+
+A policy looks like::
+
+    {"elicitation": {"action": "accept", "content": {"confirm": true, "notes": "ok"}},
+     "sampling": {"text": "AI agents are moving to open protocols"},
+     "timeout": 30}
+
+``"sampling": "skip"`` continues without a summary. Questions that are
+asked are bounded by ``timeout`` (or the server default): an unanswered
+elicitation counts as cancelled and an unanswered sampling request as
+skipped, so a client that never answers cannot hold the tool open forever.
+"""
+
+import logging
+from typing import Any, Optional
+
+import anyio
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+from mcp.shared.context import RequestContext
+from mcp.types import CreateMessageResult, ElicitResult, SamplingMessage, TextContent
+
+logger = logging.getLogger(__name__)
+
+POLICY_KEY = "interactionPolicy"
+
+
+class InteractionPolicy:
+    """Pre-supplied answers and a timeout for a tool call's questions to the client."""
+
+    __slots__ = ("elicitation", "sampling", "skip_sampling", "timeout")
+
+    def __init__(
+        self,
+        elicitation: Optional[ElicitResult] = None,
+        sampling: Optional[CreateMessageResult] = None,
+        skip_sampling: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.elicitation = elicitation
+        self.sampling = sampling
+        self.skip_sampling = skip_sampling
+        self.timeout = timeout
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict[str, Any]]) -> "InteractionPolicy":
+        """Parse a policy as sent by a client; raises ValueError if it is malformed."""
+        if not data:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError(f"{POLICY_KEY} must be an object")
+        unknown = set(data) - {"elicitation", "sampling", "timeout"}
+        if unknown:
+            raise ValueError(f"Unknown {POLICY_KEY} keys: {', '.join(sorted(unknown))}")
+
+        elicitation = ElicitResult.model_validate(data["elicitation"]) if data.get("elicitation") else None
+        sampling_data = data.get("sampling")
+        sampling = None
+        if isinstance(sampling_data, dict):
+            if not isinstance(sampling_data.get("text"), str):
+                raise ValueError(f"{POLICY_KEY}.sampling must be \"skip\" or {{\"text\": ...}}")
+            sampling = CreateMessageResult(
+                role="assistant",
+                content=TextContent(type="text", text=sampling_data["text"]),
+                model=sampling_data.get("model", "pre-supplied"),
+            )
+        elif sampling_data not in (None, "skip"):
+            raise ValueError(f"{POLICY_KEY}.sampling must be \"skip\" or {{\"text\": ...}}")
+
+        timeout = data.get("timeout")
+        if timeout is not None and (not isinstance(timeout, (int, float)) or timeout <= 0):
+            raise ValueError(f"{POLICY_KEY}.timeout must be a positive number of seconds")
+        return cls(elicitation, sampling, sampling_data == "skip", timeout)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the policy in the form ``from_dict`` accepts, without unset fields."""
+        data: dict[str, Any] = {}
+        if self.elicitation is not None:
+            data["elicitation"] = self.elicitation.model_dump(mode="json", exclude_none=True)
+        if self.skip_sampling:
+            data["sampling"] = "skip"
+        elif self.sampling is not None:
+            data["sampling"] = {"text": self.sampling.content.text, "model": self.sampling.model}
+        if self.timeout is not None:
+            data["timeout"] = self.timeout
+        return data
+
+    def merged_over(self, base: "InteractionPolicy") -> "InteractionPolicy":
+        """Return this policy with unset fields taken from `base`."""
+        has_sampling = self.sampling is not None or self.skip_sampling
+        return InteractionPolicy(
+            self.elicitation if self.elicitation is not None else base.elicitation,
+            self.sampling if has_sampling else base.sampling,
+            self.skip_sampling if has_sampling else base.skip_sampling,
+            self.timeout if self.timeout is not None else base.timeout,
+        )
+
+
+def resolve_policy(ctx: RequestContext) -> InteractionPolicy:
+    """Combine the session's policy with the call's, which takes precedence."""
+    session_policy = None
+    client_params = ctx.session.client_params
+    if client_params is not None and client_params.capabilities.experimental:
+        session_policy = client_params.capabilities.experimental.get(POLICY_KEY)
+    call_policy = getattr(ctx.meta, POLICY_KEY, None) if ctx.meta is not None else None
+    return InteractionPolicy.from_dict(call_policy).merged_over(InteractionPolicy.from_dict(session_policy))
+
+
+class Interactions:
+    """
+    Asks the client questions on a tool's behalf, unless the policy already answers them.
+
+    Handed to tools as ``interactions``; use it instead of calling
+    ``ctx.session.elicit`` or ``ctx.session.create_message`` directly.
+    """
+
+    def __init__(self, ctx: RequestContext, policy: InteractionPolicy, default_timeout: Optional[float] = None) -> None:
+        self._ctx = ctx
+        self.policy = policy
+        self.timeout = policy.timeout if policy.timeout is not None else default_timeout
+
+    async def elicit(self, message: str, requested_schema: dict[str, Any]) -> ElicitResult:
+        """Return the pre-supplied answer, or ask the client; a timeout counts as cancelled."""
+        answer = self.policy.elicitation
+        if answer is not None:
+            error = None
+            if answer.action == "accept" and answer.content is not None:
+                schema_error = best_match(validator_for(requested_schema)(requested_schema).iter_errors(answer.content))
+                error = schema_error.message if schema_error is not None else None
+            if error is None:
+                logger.info(f"Using pre-supplied elicitation answer: {answer.action}")
+                return answer
+            logger.warning(f"Pre-supplied elicitation answer does not match the schema ({error}), asking the client")
+
+        with anyio.move_on_after(self.timeout):
+            return await self._ctx.session.elicit(
+                message=message,
+                requestedSchema=requested_schema,
+                related_request_id=self._ctx.request_id,
+            )
+        logger.warning(f"Elicitation timed out after {self.timeout}s, treating it as cancelled")
+        return ElicitResult(action="cancel")
+
+    async def create_message(self, messages: list[SamplingMessage], max_tokens: int) -> Optional[CreateMessageResult]:
+        """Return the pre-supplied sample, None if skipped or timed out, or ask the client."""
+        if self.policy.sampling is not None:
+            logger.info("Using pre-supplied sampling answer")
+            return self.policy.sampling
+        if self.policy.skip_sampling:
+            return None
+
+        with anyio.move_on_after(self.timeout):
+            return await self._ctx.session.create_message(
+                messages=messages,
+                max_tokens=max_tokens,
+                related_request_id=self._ctx.request_id,
+            )
+        logger.warning(f"Sampling timed out after {self.timeout}s, continuing without it")
+        return None
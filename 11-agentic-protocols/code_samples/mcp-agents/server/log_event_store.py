@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+Segmented Log Event Store for MCP Session Resumption
+
+This module provides an append-only, segmented log implementation of the MCP
+EventStore, aimed at write-heavy notification workloads. Each event is one
+record appended to the active segment file; replays read segments through
+``mmap`` and hand message bytes to the send path without copying them.
+
+Record layout (little endian):
+
+    event_id: u64 | stream_len: u16 | payload_len: u32 | crc32: u32 | stream_id | payload
+
+A segment is named after the first event ID it holds. When it reaches
+``segment_bytes`` it is sealed and a sparse index of (event_id, offset)
+pairs, one per ``index_interval`` records, is written next to it.
+
+Records are never rewritten. A deleted stream is only marked as deleted so
+it can no longer be replayed, and disk space comes back when retention
+removes whole sealed segments older than ``max_age``.
+"""
+
+import asyncio
+import bisect
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import TypeAdapter
+
+from mcp.server.streamable_http import (
+    EventCallback,
+    EventId,
+    EventMessage,
+    EventStore,
+    StreamId,
+)
+from mcp.types import JSONRPCMessage
+
+from .event_store import RawJSONRPCMessage
+
+logger = logging.getLogger(__name__)
+
+_RECORD_HEADER = struct.Struct("<QHII")
+_INDEX_ENTRY = struct.Struct("<QQ")
+_SEGMENT_SUFFIX = ".log"
+_INDEX_SUFFIX = ".idx"
+
+
+class _Segment:
+    """One segment file plus its sparse index and read mapping."""
+
+    __slots__ = ("base_id", "path", "size", "index_ids", "index_offsets", "_map", "_mapped_size")
+
+    def __init__(self, base_id: int, path: Path, size: int = 0) -> None:
+        self.base_id = base_id
+        self.path = path
+        self.size = size
+        self.index_ids: list[int] = []
+        self.index_offsets: list[int] = []
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.with_suffix(_INDEX_SUFFIX)
+
+    def view(self) -> memoryview:
+        """Return a read-only view of the written part of the segment."""
+        size = self.size
+        if size == 0:
+            return memoryview(b"")
+        if self._map is None or self._mapped_size < size:
+            # The active segment grows, so it is remapped when a replay needs
+            # the new tail. Old maps stay alive while replayed messages use them.
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_size = size
+        return memoryview(self._map)[:size]
+
+    def close(self) -> None:
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Replayed messages still reference the mapping; it is released with them
+                pass
+            self._map = None
+            self._mapped_size = 0
+
+
+class LogEventStore(EventStore):
+    """
+    Event store backed by an append-only segmented log on disk.
+
+    Appends are an unbuffered write to the active segment, made on the event
+    loop and repeated until the whole record is written; with ``fsync=True``
+    each append is also fsynced in a worker thread, where full segments are
+    rolled too. Replays locate the resume point with a bisect over segments
+    and their sparse indexes, then scan forward, skipping other streams'
+    records by their headers. Replayed messages wrap slices of the mapped segment;
+    ``replay_validation`` works as in PersistentEventStore.
+
+    On open, a torn or corrupt tail on the last segment (from a crash
+    mid-write) is detected by length and CRC checks and truncated.
+    """
+
+    REPLAY_VALIDATION_MODES = ("full", "lazy")
+
+    def __init__(
+        self,
+        storage_dir: str = "events_log",
+        segment_bytes: int = 64 * 1024 * 1024,
+        index_interval: int = 64,
+        fsync: bool = False,
+        chunk_size: int = 256,
+        replay_validation: str = "lazy",
+    ) -> None:
+        if replay_validation not in self.REPLAY_VALIDATION_MODES:
+            raise ValueError(
+                f"Unknown replay validation mode: {replay_validation} "
+                f"(expected one of {self.REPLAY_VALIDATION_MODES})"
+            )
+        self.storage_dir = Path(storage_dir)
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.fsync = fsync
+        self.chunk_size = chunk_size
+        self.replay_validation = replay_validation
+        self._adapter = TypeAdapter(JSONRPCMessage)
+
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        self._segments: list[_Segment] = []
+        self._segment_base_ids: list[int] = []
+        self._next_event_id = 1
+        self._records_in_active = 0
+        # Serializes appends with segment rolls and fsyncs done in worker threads
+        self._append_lock = asyncio.Lock()
+        # Events written per stream since the store was opened, and the last of them
+        self._stream_events: Counter = Counter()
+        self._stream_last_ids: dict[StreamId, int] = {}
+        # Deleted streams and the last event ID each had when it was deleted
+        self._deleted_streams: dict[StreamId, int] = {}
+        self._retention_task: Optional[asyncio.Task] = None
+        self.last_retention_report: Optional[dict[str, Any]] = None
+        self._recover()
+        self._file = open(self._segments[-1].path, "ab", buffering=0)
+
+        logger.info(
+            f"LogEventStore initialized in {self.storage_dir} "
+            f"({len(self._segments)} segments, next event {self._next_event_id})"
+        )
+
+    # -- Recovery ---------------------------------------------------------
+
+    def _recover(self) -> None:
+        """Load existing segments, truncating a torn tail on the last one."""
+        paths = sorted(self.storage_dir.glob(f"*{_SEGMENT_SUFFIX}"))
+        if not paths:
+            self._add_segment(1)
+            return
+
+        for i, path in enumerate(paths):
+            segment = _Segment(int(path.stem), path, path.stat().st_size)
+            is_last = i == len(paths) - 1
+            if is_last or not self._load_index(segment):
+                last_id, records = self._scan_segment(segment, truncate=is_last)
+                if is_last:
+                    self._records_in_active = records
+                    self._next_event_id = (last_id + 1) if last_id else segment.base_id
+            self._segments.append(segment)
+            self._segment_base_ids.append(segment.base_id)
+
+    def _load_index(self, segment: _Segment) -> bool:
+        """Load a sealed segment's sparse index file; False if missing or damaged."""
+        try:
+            data = segment.index_path.read_bytes()
+        except OSError:
+            return False
+        if not data or len(data) % _INDEX_ENTRY.size:
+            return False
+        for event_id, offset in _INDEX_ENTRY.iter_unpack(data):
+            segment.index_ids.append(event_id)
+            segment.index_offsets.append(offset)
+        return True
+
+    def _scan_segment(self, segment: _Segment, truncate: bool) -> tuple[int, int]:
+        """Rebuild a segment's sparse index; return (last event ID, record count)."""
+        data = segment.path.read_bytes()
+        offset = 0
+        last_id = 0
+        records = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            event_id, stream_len, payload_len, crc = _RECORD_HEADER.unpack_from(data, offset)
+            end = offset + _RECORD_HEADER.size + stream_len + payload_len
+            if end > len(data) or zlib.crc32(data[offset + _RECORD_HEADER.size:end]) != crc:
+                break
+            if records % self.index_interval == 0:
+                segment.index_ids.append(event_id)
+                segment.index_offsets.append(offset)
+            last_id = event_id
+            records += 1
+            offset = end
+
+        if offset != len(data):
+            if not truncate:
+                raise ValueError(f"Corrupt sealed segment {segment.path} at offset {offset}")
+            logger.warning(f"Truncating torn tail of {segment.path}: {len(data) - offset} bytes at offset {offset}")
+            with open(segment.path, "r+b") as f:
+                f.truncate(offset)
+                os.fsync(f.fileno())
+        segment.size = offset
+        return last_id, records
+
+    # -- Writing ----------------------------------------------------------
+
+    def _add_segment(self, base_id: int) -> None:
+        path = self.storage_dir / f"{base_id:020d}{_SEGMENT_SUFFIX}"
+        path.touch()
+        self._segments.append(_Segment(base_id, path))
+        self._segment_base_ids.append(base_id)
+        self._records_in_active = 0
+
+    def _roll_segment(self) -> None:
+        """Seal the active segment, persist its index and start a new one."""
+        active = self._segments[-1]
+        os.fsync(self._file.fileno())
+        self._file.close()
+        index = b"".join(
+            _INDEX_ENTRY.pack(event_id, offset)
+            for event_id, offset in zip(active.index_ids, active.index_offsets)
+        )
+        tmp_path = active.index_path.with_suffix(".idx.tmp")
+        tmp_path.write_bytes(index)
+        os.replace(tmp_path, active.index_path)
+
+        self._add_segment(self._next_event_id)
+        self._file = open(self._segments[-1].path, "ab", buffering=0)
+        logger.info(f"LogEventStore rolled to segment {self._segments[-1].path.name}")
+
+    async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
+        """Store an event and return its ID."""
+        # Priming events have no message and are stored with an empty payload
+        payload = b"" if message is None else self._adapter.dump_json(message, by_alias=True, exclude_none=True)
+        stream = stream_id.encode("utf-8")
+        body = stream + payload
+
+        async with self._append_lock:
+            active = self._segments[-1]
+            if active.size and active.size + _RECORD_HEADER.size + len(body) > self.segment_bytes:
+                await asyncio.to_thread(self._roll_segment)
+                active = self._segments[-1]
+
+            event_id = self._next_event_id
+            record = _RECORD_HEADER.pack(event_id, len(stream), len(payload), zlib.crc32(body)) + body
+            self._write_record(active, record)
+            self._next_event_id += 1
+            if self._records_in_active % self.index_interval == 0:
+                active.index_ids.append(event_id)
+                active.index_offsets.append(active.size)
+            # Publish the new size only after the whole record is written
+            active.size += len(record)
+            self._records_in_active += 1
+            self._stream_events[stream_id] += 1
+            self._stream_last_ids[stream_id] = event_id
+
+            if self.fsync:
+                await asyncio.to_thread(os.fsync, self._file.fileno())
+        return str(event_id)
+
+    def _write_record(self, active: _Segment, record: bytes) -> None:
+        """Write a whole record at the end of the active segment, or none of it."""
+        view = memoryview(record)
+        try:
+            while view:
+                written = self._file.write(view)
+                if not written:
+                    raise OSError(f"Could not append to {active.path}")
+                view = view[written:]
+        except BaseException:
+            # Drop a partly written record so the next append starts at a record boundary
+            if len(view) < len(record):
+                os.ftruncate(self._file.fileno(), active.size)
+            raise
+
+    async def flush(self) -> None:
+        """Flush written records to stable storage."""
+        async with self._append_lock:
+            await asyncio.to_thread(os.fsync, self._file.fileno())
+
+    # -- Reading ----------------------------------------------------------
+
+    def _locate_sync(self, event_id: int) -> Optional[tuple[int, int, bytes]]:
+        """Find a record; return (segment index, offset after it, stream ID bytes)."""
+        seg_index = bisect.bisect_right(self._segment_base_ids, event_id) - 1
+        if seg_index < 0:
+            return None
+        segment = self._segments[seg_index]
+        pos = bisect.bisect_right(segment.index_ids, event_id) - 1
+        if pos < 0:
+            return None
+        view = segment.view()
+        offset = segment.index_offsets[pos]
+        while offset + _RECORD_HEADER.size <= len(view):
+            record_id, stream_len, payload_len, _ = _RECORD_HEADER.unpack_from(view, offset)
+            start = offset + _RECORD_HEADER.size
+            end = start + stream_len + payload_len
+            if record_id == event_id:
+                return seg_index, end, bytes(view[start:start + stream_len])
+            if record_id > event_id:
+                return None
+            offset = end
+        return None
+
+    def _scan_sync(
+        self, seg_index: int, offset: int, stream: bytes
+    ) -> tuple[list[tuple[int, memoryview]], int, int, bool]:
+        """Collect up to chunk_size records of `stream` from (seg_index, offset) onward.
+
+        Returns (records, seg_index, offset, done), where records hold views into
+        the mapped segment rather than copies.
+        """
+        records: list[tuple[int, memoryview]] = []
+        stream_len_wanted = len(stream)
+        while seg_index < len(self._segments):
+            view = self._segments[seg_index].view()
+            size = len(view)
+            while offset + _RECORD_HEADER.size <= size:
+                event_id, stream_len, payload_len, _ = _RECORD_HEADER.unpack_from(view, offset)
+                start = offset + _RECORD_HEADER.size
+                offset = start + stream_len + payload_len
+                # Skip other streams by comparing the header and stream ID only
+                if stream_len == stream_len_wanted and view[start:start + stream_len] == stream:
+                    records.append((event_id, view[start + stream_len:offset]))
+                    if len(records) >= self.chunk_size:
+                        return records, seg_index, offset, False
+            seg_index += 1
+            offset = 0
+        return records, seg_index, offset, True
+
+    async def replay_events_after(
+        self,
+        last_event_id: EventId,
+        send_callback: EventCallback,
+    ) -> StreamId | None:
+        """Replay events after the specified ID, filtered by the stream of the last event."""
+        logger.info(f"Replaying events after {last_event_id}")
+
+        try:
+            target_id = int(last_event_id)
+        except (ValueError, TypeError):
+            logger.warning(f"Invalid event ID format: {last_event_id}")
+            return None
+
+        location = await asyncio.to_thread(self._locate_sync, target_id)
+        if location is None:
+            logger.warning(f"Could not resume stream from event {last_event_id}")
+            return None
+        seg_index, offset, stream = location
+        stream_id = stream.decode("utf-8")
+        if target_id <= self._deleted_streams.get(stream_id, 0):
+            logger.warning(f"Stream {stream_id} of event {last_event_id} was deleted")
+            return None
+
+        lazy = self.replay_validation == "lazy"
+        replayed_count = 0
+        done = False
+        while not done:
+            records, seg_index, offset, done = await asyncio.to_thread(self._scan_sync, seg_index, offset, stream)
+            for event_id, payload in records:
+                # Priming events carry no message and are not replayed
+                if not payload:
+                    continue
+                try:
+                    message = RawJSONRPCMessage(payload) if lazy else self._adapter.validate_json(bytes(payload))
+                except Exception as e:
+                    logger.error(f"Failed to deserialize event {event_id}: {e}")
+                    continue
+                await send_callback(EventMessage(message, str(event_id)))
+                replayed_count += 1
+
+        logger.info(f"Replayed {replayed_count} events for stream {stream_id}")
+        return stream_id
+
+    # -- Management -------------------------------------------------------
+
+    def get_event_count(self) -> int:
+        """Get the total number of stored events."""
+        return self._next_event_id - self._segments[0].base_id
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get segment and size counters."""
+        return {
+            "events": self.get_event_count(),
+            "segments": len(self._segments),
+            "bytes": sum(segment.size for segment in self._segments),
+        }
+
+    async def clear_events(self) -> None:
+        """Clear all stored events."""
+        async with self._append_lock:
+            self._clear_sync()
+
+    def _clear_sync(self) -> None:
+        self._file.close()
+        for segment in self._segments:
+            segment.close()
+        for path in [*self.storage_dir.glob(f"*{_SEGMENT_SUFFIX}"), *self.storage_dir.glob(f"*{_INDEX_SUFFIX}")]:
+            path.unlink(missing_ok=True)
+        self._segments.clear()
+        self._segment_base_ids.clear()
+        self._next_event_id = 1
+        self._add_segment(1)
+        self._file = open(self._segments[-1].path, "ab", buffering=0)
+        self._stream_events.clear()
+        self._stream_last_ids.clear()
+        self._deleted_streams.clear()
+        logger.info("Event store cleared")
+
+    async def delete_stream(self, stream_id: StreamId) -> int:
+        """Mark a stream that can no longer be resumed as deleted; return its event count.
+
+        The records stay in their segments until retention removes them, but
+        the stream's events up to now are no longer replayed. Counts and
+        marks cover events written since the store was opened.
+        """
+        last_id = self._stream_last_ids.pop(stream_id, None)
+        if last_id is None:
+            return 0
+        self._deleted_streams[stream_id] = last_id
+        return self._stream_events.pop(stream_id)
+
+    def start_retention(self, interval: float = 60.0, max_age: Optional[float] = None) -> asyncio.Task:
+        """Run run_retention every `interval` seconds in a background task until aclose()."""
+        async def retention_loop() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.run_retention(max_age)
+                except Exception:
+                    logger.exception("Event store retention pass failed")
+
+        if self._retention_task is not None:
+            self._retention_task.cancel()
+        self._retention_task = asyncio.create_task(retention_loop())
+        return self._retention_task
+
+    async def run_retention(self, max_age: Optional[float] = None) -> dict[str, Any]:
+        """
+        Delete sealed segments whose newest event is older than `max_age` seconds.
+
+        A log cannot drop single events, so a segment goes only once all of
+        its events have expired (by its modification time); the active
+        segment is never deleted. Returns a report of deleted events and
+        segments, reclaimed bytes and duration.
+        """
+        start = time.perf_counter()
+        expired: list[_Segment] = []
+        if max_age is not None:
+            async with self._append_lock:
+                cutoff = time.time() - max_age
+                mtimes = await asyncio.to_thread(
+                    lambda: [segment.path.stat().st_mtime for segment in self._segments[:-1]]
+                )
+                for segment, mtime in zip(self._segments[:-1], mtimes):
+                    if mtime >= cutoff:
+                        break
+                    expired.append(segment)
+                # Drop them from the lookup before their files go
+                del self._segments[:len(expired)]
+                del self._segment_base_ids[:len(expired)]
+        deleted = (self._segments[0].base_id - expired[0].base_id) if expired else 0
+        reclaimed = sum(segment.size for segment in expired)
+        if expired:
+            await asyncio.to_thread(self._delete_segments_sync, expired)
+            # Forget streams whose events are all gone
+            first_id = self._segments[0].base_id
+            for stream_id, last_id in list(self._stream_last_ids.items()):
+                if last_id < first_id:
+                    del self._stream_last_ids[stream_id]
+                    del self._stream_events[stream_id]
+            for stream_id, last_id in list(self._deleted_streams.items()):
+                if last_id < first_id:
+                    del self._deleted_streams[stream_id]
+
+        report = {
+            "deleted_events": deleted,
+            "deleted_segments": len(expired),
+            "reclaimed_bytes": reclaimed,
+            "duration_seconds": time.perf_counter() - start,
+        }
+        self.last_retention_report = report
+        logger.info(
+            f"Retention removed {deleted} events ({len(expired)} segments), "
+            f"reclaimed {reclaimed} bytes in {report['duration_seconds']:.3f}s"
+        )
+        return report
+
+    def _delete_segments_sync(self, segments: list[_Segment]) -> None:
+        for segment in segments:
+            segment.close()
+            segment.path.unlink(missing_ok=True)
+            segment.index_path.unlink(missing_ok=True)
+
+    async def aclose(self) -> None:
+        """Stop retention, flush written records and close the store."""
+        if self._retention_task is not None:
+            self._retention_task.cancel()
+            self._retention_task = None
+        if self._file is not None and not self._file.closed:
+            await self.flush()
+        self.close()
+
+    def close(self) -> None:
+        """Close the active segment file and release segment mappings."""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+            logger.info("LogEventStore closed")
+        for segment in self._segments:
+            segment.close()
+
+    def __enter__(self) -> "LogEventStore":
+        """Enter the runtime context related to this object."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Exit the runtime context and close the store."""
+        self.close()
+
+    async def __aenter__(self) -> "LogEventStore":
+        """Enter the async runtime context related to this object."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Exit the async runtime context, flushing written records first."""
+        await self.aclose()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Metrics for the Resumable MCP Server
+
+Counters, gauges and fixed-bucket histograms rendered in the Prometheus text
+format on ``/metrics``. Recording a value is a dictionary lookup and a
+bisect over the bucket bounds, with no locks or background tasks, so the
+metrics can stay on in production. Values that already live elsewhere
+(open sessions, buffered SSE messages, scheduler and cache counts) are read
+by callbacks when the endpoint is scraped instead of being tracked on every
+change.
+"""
+
+import logging
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Sequence
+
+from mcp.server.streamable_http import (
+    EventCallback,
+    EventId,
+    EventMessage,
+    EventStore,
+    StreamId,
+)
+from mcp.types import JSONRPCMessage
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a fast event write up to a long tool call
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+STORE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Events sent per replay
+REPLAY_SIZE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+# label values -> value, for gauges and counters read at scrape time
+Collector = Callable[[], dict[tuple[str, ...], float]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Collected(_Metric):
+    """A gauge or counter whose values are read from `collect` each time the metrics are rendered."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Collector,
+        labels: Sequence[str] = (),
+        kind: str = "gauge",
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._collect = collect
+        self.kind = kind
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        try:
+            values = self._collect()
+        except Exception:
+            logger.exception(f"Collecting metric {self.name} failed")
+            return lines
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Counts of observed values in fixed buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (the last is +Inf)..., sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def merge_worker_metrics(worker_texts: Iterable[tuple[str, str]]) -> str:
+    """
+    Merge the rendered metrics of several workers, given as (worker, text) pairs.
+
+    Every sample gets a ``worker`` label, and the samples of each metric are
+    listed under one HELP/TYPE header, as the text format requires.
+    """
+    families: dict[str, list[str]] = {}
+    for worker, text in worker_texts:
+        label = f'worker="{_escape(worker)}"'
+        family: list[str] = []
+        for line in text.splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                name = line.split(" ", 3)[2]
+                family = families.setdefault(name, [])
+                if line not in family:
+                    family.append(line)
+            elif line and not line.startswith("#"):
+                if "{" in line:
+                    family.append(line.replace("{", "{" + label + ",", 1))
+                else:
+                    name, value = line.split(" ", 1)
+                    family.append(f"{name}{{{label}}} {value}")
+    lines = [line for family in families.values() for line in family]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """Metrics rendered together on one endpoint."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; names must be unique."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name: str, documentation: str, collect: Collector, labels: Sequence[str] = ()) -> Collected:
+        """Register a gauge read from `collect` at scrape time."""
+        return self.register(Collected(name, documentation, collect, labels))
+
+    def counter(self, name: str, documentation: str, collect: Collector, labels: Sequence[str] = ()) -> Collected:
+        """Register a counter read from `collect` at scrape time."""
+        return self.register(Collected(name, documentation, collect, labels, kind="counter"))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Register a histogram that values are recorded into with observe()."""
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def endpoint(self, request: Request) -> Response:
+        """Starlette endpoint serving the rendered metrics."""
+        return Response(self.render(), media_type=CONTENT_TYPE)
+
+
+class ServerMetrics(MetricsRegistry):
+    """The resumable server's request, event store and session metrics."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.tool_calls = self.histogram(
+            "mcp_tool_call_duration_seconds",
+            "Duration of tools/call requests by tool and outcome (ok, error or cancelled)",
+            labels=("tool", "status"),
+        )
+        self.store_duration = self.histogram(
+            "mcp_event_store_duration_seconds",
+            "Duration of event store operations",
+            labels=("operation",),
+            buckets=STORE_BUCKETS,
+        )
+        self.replay_events = self.histogram(
+            "mcp_event_replay_events",
+            "Events sent per replay after a client reconnects with Last-Event-ID",
+            buckets=REPLAY_SIZE_BUCKETS,
+        )
+
+    def watch(self, server: Any, session_manager: Any) -> None:
+        """Register gauges and counters read from a ResumableServer and its session manager at scrape time."""
+        self.gauge(
+            "mcp_active_sessions",
+            "Open MCP sessions",
+            lambda: {(): len(session_manager._server_instances)},
+        )
+        self.gauge(
+            "mcp_sse_queue_depth",
+            "Messages waiting to be written to open SSE streams (total, and the deepest stream)",
+            lambda: sse_queue_depths(session_manager._server_instances.values()),
+            labels=("stat",),
+        )
+
+        scheduler = server.scheduler
+        self.gauge(
+            "mcp_tool_calls_running",
+            "Tool calls holding a scheduler slot",
+            lambda: {(tool,): stats["running"] for tool, stats in scheduler.get_stats().items()},
+            labels=("tool",),
+        )
+        self.gauge(
+            "mcp_tool_calls_queued",
+            "Tool calls waiting for a scheduler slot",
+            lambda: {(tool,): stats["queued"] for tool, stats in scheduler.get_stats().items()},
+            labels=("tool",),
+        )
+        self.counter(
+            "mcp_tool_calls_rejected_total",
+            "Tool calls rejected because the tool's queue was full",
+            lambda: {(tool,): count for tool, count in scheduler.rejected.items()},
+            labels=("tool",),
+        )
+
+        abandonment = server.abandonment
+        self.counter(
+            "mcp_abandoned_sessions_total",
+            "Sessions ended after their grace period without a reconnect",
+            lambda: {(): abandonment.abandoned_sessions},
+        )
+        self.counter(
+            "mcp_cancelled_tool_calls_total",
+            "Tool calls cancelled by the client or by ending an abandoned session",
+            lambda: {(): abandonment.cancelled_calls},
+        )
+        self.counter(
+            "mcp_cancellation_saved_seconds_total",
+            "Estimated run time that cancelled tool calls no longer used",
+            lambda: {(): abandonment.seconds_saved},
+        )
+        self.counter(
+            "mcp_cancellation_saved_events_total",
+            "Events not written by cancelled calls (avoided, estimated) or deleted with ended sessions (released)",
+            lambda: {("avoided",): abandonment.events_avoided, ("released",): abandonment.events_released},
+            labels=("reason",),
+        )
+
+        cache = server.result_cache
+        if cache is not None:
+            self.counter(
+                "mcp_tool_result_cache_lookups_total",
+                "Cached tool calls by how they were answered",
+                lambda: {("hit",): cache.hits, ("miss",): cache.misses, ("shared",): cache.shared},
+                labels=("result",),
+            )
+            self.gauge(
+                "mcp_tool_result_cache_entries",
+                "Tool results held in the cache",
+                lambda: {(): len(cache._entries)},
+            )
+
+
+def sse_queue_depths(transports: Iterable[Any]) -> dict[tuple[str, ...], float]:
+    """Sum and maximum of messages waiting to be written to the open SSE streams of `transports`."""
+    total = deepest = 0
+    for transport in transports:
+        for send_stream, _ in list(getattr(transport, "_request_streams", {}).values()):
+            buffered = send_stream.statistics().current_buffer_used
+            total += buffered
+            deepest = max(deepest, buffered)
+    return {("total",): total, ("max",): deepest}
+
+
+class InstrumentedEventStore(EventStore):
+    """Event store wrapper that times writes and replays and counts replayed events."""
+
+    def __init__(self, store: EventStore, metrics: ServerMetrics) -> None:
+        self._store = store
+        self._metrics = metrics
+
+    @property
+    def store(self) -> EventStore:
+        """The wrapped event store."""
+        return self._store
+
+    async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
+        started = time.perf_counter()
+        try:
+            return await self._store.store_event(stream_id, message)
+        finally:
+            self._metrics.store_duration.observe(time.perf_counter() - started, "store_event")
+
+    async def replay_events_after(
+        self,
+        last_event_id: EventId,
+        send_callback: EventCallback,
+    ) -> StreamId | None:
+        replayed = 0
+
+        async def counting_callback(event: EventMessage) -> None:
+            nonlocal replayed
+            replayed += 1
+            await send_callback(event)
+
+        started = time.perf_counter()
+        try:
+            return await self._store.replay_events_after(last_event_id, counting_callback)
+        finally:
+            self._metrics.store_duration.observe(time.perf_counter() - started, "replay_events_after")
+            self._metrics.replay_events.observe(replayed)
+
+    async def delete_stream(self, stream_id: StreamId) -> int:
+        """Delete a stream's events, if the wrapped store supports deleting."""
+        if not hasattr(self._store, "delete_stream"):
+            return 0
+        started = time.perf_counter()
+        try:
+            return await self._store.delete_stream(stream_id)
+        finally:
+            self._metrics.store_duration.observe(time.perf_counter() - started, "delete_stream")
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker Deployment for the Resumable MCP Server
+
+StreamableHTTPSessionManager keeps each session in the process that created
+it, so several server processes cannot simply share one port. This module
+starts N worker processes, each running the normal server on an internal
+port, and puts a small session-affinity proxy in front of them:
+
+- a request without a session ID (initialize) goes to the worker with the
+  fewest requests in flight
+- the session ID a worker returns is prefixed with the worker number, e.g.
+  ``"2-5f0c..."``, and every later request carrying that ID (including a GET
+  with Last-Event-ID to resume a stream) is routed back to that worker
+
+The prefix makes routing stateless: a client reconnecting after a dropped
+connection, or after the proxy itself restarts, still reaches its session.
+Workers normally share one process-safe event store (a SQLite file in
+shared mode), so event IDs are unique across workers and persisted events
+survive a worker restart. With the memory backend each worker keeps its own
+events instead, which are lost when that worker restarts.
+
+The proxy also serves ``/metrics``: it scrapes every worker and returns
+their metrics merged, each sample labelled with its ``worker``, plus an
+``mcp_worker_up`` gauge per worker.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import socket
+import time
+from typing import Optional
+
+import httpx
+import uvicorn
+
+from .metrics import CONTENT_TYPE, merge_worker_metrics
+from mcp.server.streamable_http import MCP_SESSION_ID_HEADER
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Separates the worker number from the worker's own session ID
+SESSION_SEPARATOR = "-"
+
+# Backends workers can run with: "sqlite" is shared by all of them, while each
+# worker keeps its own "memory" store, which holds its sessions' events since
+# session affinity never moves a session. "log" allows a single writer per path.
+MULTIWORKER_BACKENDS = ("sqlite", "memory", "none")
+
+# Hop-by-hop headers are not forwarded in either direction
+_HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "host", "content-length"}
+
+
+class SessionAffinityProxy:
+    """
+    ASGI app that forwards MCP requests to worker processes by session ID.
+
+    Responses are streamed through unbuffered, so SSE streams (progress,
+    elicitation, sampling) reach the client as the worker sends them.
+    """
+
+    def __init__(self, worker_urls: list[str]) -> None:
+        if not worker_urls:
+            raise ValueError("SessionAffinityProxy needs at least one worker")
+        self.worker_urls = list(worker_urls)
+        self._inflight = [0] * len(self.worker_urls)
+        self._next_worker = 0
+        # SSE streams stay open for the length of a tool call
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, read=None),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=100),
+        )
+
+    def pick_worker(self) -> int:
+        """Return the worker with the fewest requests in flight, rotating on ties."""
+        count = len(self.worker_urls)
+        start = self._next_worker
+        worker = min(range(count), key=lambda i: (self._inflight[i], (i - start) % count))
+        self._next_worker = (worker + 1) % count
+        return worker
+
+    def route_session(self, session_id: str) -> Optional[tuple[int, str]]:
+        """Split a client-facing session ID into (worker, worker session ID)."""
+        worker_part, separator, inner_id = session_id.partition(SESSION_SEPARATOR)
+        if not separator or not worker_part.isdigit() or int(worker_part) >= len(self.worker_urls):
+            return None
+        return int(worker_part), inner_id
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        session_id = request.headers.get(MCP_SESSION_ID_HEADER)
+        if session_id is None:
+            worker, inner_id = self.pick_worker(), None
+        else:
+            route = self.route_session(session_id)
+            if route is None:
+                # Answer as a worker would for an unknown session
+                response = JSONResponse(
+                    {"jsonrpc": "2.0", "id": "server-error",
+                     "error": {"code": -32600, "message": "Session not found"}},
+                    status_code=404,
+                )
+                await response(scope, receive, send)
+                return
+            worker, inner_id = route
+
+        headers = [
+            (name, value) for name, value in request.headers.items()
+            if name not in _HOP_BY_HOP_HEADERS and name != MCP_SESSION_ID_HEADER
+        ]
+        if inner_id is not None:
+            headers.append((MCP_SESSION_ID_HEADER, inner_id))
+        url = self.worker_urls[worker] + request.url.path
+        if request.url.query:
+            url += "?" + request.url.query
+
+        self._inflight[worker] += 1
+        try:
+            upstream = await self._client.send(
+                self._client.build_request(request.method, url, headers=headers, content=await request.body()),
+                stream=True,
+            )
+        except httpx.HTTPError as e:
+            self._inflight[worker] -= 1
+            logger.error(f"Worker {worker} unreachable: {e}")
+            await JSONResponse({"error": "Worker unavailable"}, status_code=502)(scope, receive, send)
+            return
+
+        response_headers = {
+            name: value for name, value in upstream.headers.items()
+            if name not in _HOP_BY_HOP_HEADERS and name != MCP_SESSION_ID_HEADER
+        }
+        upstream_session = upstream.headers.get(MCP_SESSION_ID_HEADER)
+        if upstream_session is not None:
+            response_headers[MCP_SESSION_ID_HEADER] = f"{worker}{SESSION_SEPARATOR}{upstream_session}"
+
+        async def release() -> None:
+            self._inflight[worker] -= 1
+            await upstream.aclose()
+
+        response = StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers=response_headers,
+            background=BackgroundTask(release),
+        )
+        try:
+            await response(scope, receive, send)
+        finally:
+            # The background task does not run if the client went away mid-stream
+            if not upstream.is_closed:
+                await release()
+
+    async def metrics(self, request: Request) -> Response:
+        """Serve the merged metrics of all workers; a worker that does not answer is reported as down."""
+        async def scrape(worker: int) -> Optional[str]:
+            try:
+                response = await self._client.get(self.worker_urls[worker] + "/metrics", timeout=5.0)
+                response.raise_for_status()
+                return response.text
+            except httpx.HTTPError as e:
+                logger.warning(f"Scraping metrics of worker {worker} failed: {e}")
+                return None
+
+        texts = await asyncio.gather(*(scrape(worker) for worker in range(len(self.worker_urls))))
+        up = [
+            "# HELP mcp_worker_up Whether the worker answered the last metrics scrape",
+            "# TYPE mcp_worker_up gauge",
+        ]
+        up += [f'mcp_worker_up{{worker="{worker}"}} {int(text is not None)}' for worker, text in enumerate(texts)]
+        merged = merge_worker_metrics((str(worker), text) for worker, text in enumerate(texts) if text is not None)
+        return Response("\n".join(up) + "\n" + merged, media_type=CONTENT_TYPE)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def create_proxy_app(worker_urls: list[str]) -> Starlette:
+    """Create the Starlette application that fronts the worker processes."""
+    proxy = SessionAffinityProxy(worker_urls)
+
+    async def lifespan(app):
+        try:
+            yield
+        finally:
+            await proxy.aclose()
+
+    return Starlette(
+        routes=[Route("/metrics", endpoint=proxy.metrics), Mount("/mcp", app=proxy)],
+        lifespan=lifespan,
+    )
+
+
+def _run_worker(port: int, server_options: dict) -> None:
+    """Worker process entry point: run one server on an internal port."""
+    from .server import run_server
+
+    logging.basicConfig(level=logging.INFO, format=f"[worker:{port}] %(levelname)s %(name)s: %(message)s")
+    asyncio.run(run_server(port=port, **server_options))
+
+
+def _wait_for_port(port: int, process: multiprocessing.Process, timeout: float) -> None:
+    """Block until a worker accepts connections on its port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"Worker on port {port} exited with code {process.exitcode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Worker on port {port} did not start within {timeout}s")
+
+
+def run_multiworker(
+    port: int = 8006,
+    workers: int = 2,
+    worker_base_port: Optional[int] = None,
+    event_store_backend: str = "sqlite",
+    event_store_options: Optional[dict] = None,
+    startup_timeout: float = 30.0,
+    **server_options,
+) -> None:
+    """
+    Run `workers` server processes behind a session-affinity proxy on `port`.
+
+    - worker_base_port: first internal worker port (default: port + 1)
+    - event_store_backend: "sqlite" (shared across workers), "memory"
+      (one store per worker, which affinity keeps consistent) or "none"
+    - server_options: further keyword arguments for run_server, e.g.
+      event_store_path or limit_concurrency
+    """
+    if workers < 1:
+        raise ValueError(f"Worker count must be at least 1, got {workers}")
+    if event_store_backend not in MULTIWORKER_BACKENDS:
+        raise ValueError(
+            f"The '{event_store_backend}' event store cannot be used with several workers "
+            f"(expected one of {MULTIWORKER_BACKENDS})"
+        )
+    options = dict(event_store_options or {})
+    if event_store_backend == "sqlite":
+        options["shared"] = True
+    server_options.update(event_store_backend=event_store_backend, event_store_options=options)
+
+    base_port = worker_base_port or port + 1
+    worker_ports = [base_port + i for i in range(workers)]
+    # spawn, not fork: each worker builds its own event loop and connections
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_run_worker, args=(worker_port, server_options), daemon=True)
+        for worker_port in worker_ports
+    ]
+    try:
+        for process in processes:
+            process.start()
+        for worker_port, process in zip(worker_ports, processes):
+            _wait_for_port(worker_port, process, startup_timeout)
+
+        app = create_proxy_app([f"http://127.0.0.1:{worker_port}" for worker_port in worker_ports])
+        logger.info(f"Starting {workers} workers behind http://127.0.0.1:{port}/mcp (ports {worker_ports})")
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level="info", timeout_keep_alive=30, access_log=False)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout=10)
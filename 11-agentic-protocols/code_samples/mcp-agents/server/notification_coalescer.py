@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Coalesced Progress Notifications for Long-Running Tools
+
+Every progress or log notification a tool sends becomes a stored event and an
+SSE frame. A client only needs the latest progress value, so this module
+rate-limits a request's notifications and drops updates that a newer one
+supersedes before they are sent. The most recent state is always delivered:
+at the end of each interval, before the tool waits on the client (elicitation,
+sampling) and when the tool finishes.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from mcp.server.session import ServerSession
+from mcp.types import LoggingLevel, RequestId
+
+logger = logging.getLogger(__name__)
+
+# Log levels that are always sent as they happen instead of coalesced
+_UNCOALESCED_LEVELS = ("warning", "error", "critical", "alert", "emergency")
+
+
+class NotificationCoalescer:
+    """
+    Rate-limits and merges the notifications of one tool call.
+
+    At most one batch of notifications is sent per ``min_interval`` seconds.
+    Within a batch, a progress update replaces the previous one and a log
+    message replaces the previous message from the same logger; warnings and
+    errors are kept. Pending updates are sent when the interval ends, on
+    ``flush()``, and when the ``async with`` block exits.
+
+    Use ``min_interval=0`` to send every notification immediately.
+    """
+
+    def __init__(
+        self,
+        session: ServerSession,
+        request_id: RequestId,
+        min_interval: float = 1.0,
+    ) -> None:
+        self._session = session
+        self._request_id = request_id
+        self.min_interval = min_interval
+        # Pending notifications by supersession key, in send order
+        self._pending: dict[tuple, tuple[str, dict[str, Any]]] = {}
+        self._last_flush = float("-inf")
+        self._timer: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+        self._unique = 0
+        self.sent = 0
+        self.coalesced = 0
+        # Share of the call done, from the latest progress update with a total
+        # or set by a tool that tracks it without notifying
+        self.progress_fraction: Optional[float] = None
+
+    async def progress(self, progress: float, total: Optional[float] = None, message: Optional[str] = None) -> None:
+        """Queue a progress update, superseding any pending one."""
+        if total:
+            self.progress_fraction = progress / total
+        await self._queue(("progress",), "progress", {
+            "progress_token": self._request_id,
+            "progress": progress,
+            "total": total,
+            "message": message,
+            "related_request_id": str(self._request_id),
+        })
+
+    async def log(self, level: LoggingLevel, data: Any, logger: Optional[str] = None) -> None:
+        """Queue a log message, superseding a pending one from the same logger."""
+        if level in _UNCOALESCED_LEVELS:
+            # Give each one its own key so none is dropped
+            self._unique += 1
+            key = ("log", logger, self._unique)
+        else:
+            key = ("log", logger)
+        await self._queue(key, "log", {
+            "level": level,
+            "data": data,
+            "logger": logger,
+            "related_request_id": self._request_id,
+        })
+
+    async def _queue(self, key: tuple, kind: str, kwargs: dict[str, Any]) -> None:
+        if self._pending.pop(key, None) is not None:
+            self.coalesced += 1
+        self._pending[key] = (kind, kwargs)
+
+        wait = self._last_flush + self.min_interval - time.monotonic()
+        if wait <= 0:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later(wait))
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # The request may have ended; the final flush reports real failures
+            logger.debug(f"Deferred notification flush failed: {e}")
+
+    async def flush(self) -> None:
+        """Send all pending notifications now."""
+        async with self._send_lock:
+            self._last_flush = time.monotonic()
+            while self._pending:
+                key = next(iter(self._pending))
+                kind, kwargs = self._pending.pop(key)
+                if kind == "progress":
+                    await self._session.send_progress_notification(**kwargs)
+                else:
+                    await self._session.send_log_message(**kwargs)
+                self.sent += 1
+
+    async def aclose(self) -> None:
+        """Stop the interval timer and send the final state."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+        logger.debug(f"Request {self._request_id}: sent {self.sent} notifications, coalesced {self.coalesced}")
+
+    async def __aenter__(self) -> "NotificationCoalescer":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
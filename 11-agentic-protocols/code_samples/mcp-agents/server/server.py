@@ -10,22 +10,45 @@ import argparse
 import asyncio
 import logging
 import re
+import time
 from turtle import st
-from typing import Optional
+from typing import Awaitable, Optional
 
 import anyio
 import uvicorn
 from pydantic import AnyUrl
 from starlette.applications import Starlette
-from starlette.routing import Mount
+from starlette.routing import Mount, Route
 from pydantic import BaseModel, Field
 from mcp.server import Server
 from mcp.server.streamable_http import EventStore
-from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 from mcp.server.transport_security import TransportSecuritySettings
-from mcp.types import TextContent, Tool, SamplingMessage
+from mcp.shared.context import RequestContext
+from mcp.types import (
+    CallToolRequest,
+    CallToolResult,
+    ElicitResult,
+    ListToolsRequest,
+    SamplingMessage,
+    ServerResult,
+    TextContent,
+)
 
-from .event_store import SimpleEventStore
+from .abandonment import AbandonmentAwareSessionManager, AbandonmentMonitor
+from .checkpoint_store import CheckpointStore, ToolCheckpoint
+from .event_store_factory import (
+    EVENT_STORE_BACKENDS,
+    create_event_store,
+    load_event_store_config,
+    parse_option,
+)
+from .interaction_policy import POLICY_KEY, Interactions, resolve_policy
+from .metrics import InstrumentedEventStore, ServerMetrics
+from .multiworker import run_multiworker
+from .notification_coalescer import NotificationCoalescer
+from .tool_registry import RegisteredTool, ToolRegistry
+from .tool_result_cache import CACHE_MISS, ToolResultCache
+from .tool_scheduler import ToolBusyError, ToolScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -34,268 +57,453 @@ logger = logging.getLogger(__name__)
 class PriceConfirmationSchema(BaseModel):
     confirm: bool = Field(description="Confirm the price for this trip")
     notes: str = Field(default="", description="Any additional notes about the price")
-                            
+
+
+# Tools served by ResumableServer
+TOOLS = ToolRegistry()
+
+
+@TOOLS.tool(
+    "travel_agent",
+    description="Book a travel trip with progress updates and price confirmation",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "destination": {
+                "type": "string",
+                "description": "Travel destination",
+                "default": "Paris"
+            }
+        }
+    },
+    # Its result depends on the client's answers, not only its arguments
+    cacheable=False,
+)
+async def travel_agent(
+    ctx: RequestContext,
+    args: dict,
+    notifier: NotificationCoalescer,
+    checkpoint: ToolCheckpoint,
+    interactions: Interactions,
+) -> list[TextContent]:
+    """Book a trip, asking the client to confirm the price via elicitation."""
+    destination = args.get("destination", "Paris")
+    logger.info(f"Travel agent: destination={destination}")
+
+    # Simple travel booking flow with progress updates
+    steps = [
+        "Checking flights...",
+        "Finding available dates...", 
+        "Confirming prices...",
+        "Booking flight..."
+    ]
+
+    # A resumed booking keeps the price confirmation it already received
+    saved_elicitation = checkpoint.state.get("elicitation")
+    elicitation_result = ElicitResult.model_validate(saved_elicitation) if saved_elicitation else None
+    booking_cancelled = False
+
+    for i, step in enumerate(steps[checkpoint.step:], start=checkpoint.step):
+        await notifier.progress(i * 25, total=100, message=step)
+
+        # Add elicitation request at step 3 (Confirming prices)
+        if i == 2:  # "Confirming prices..." step
+            try:
+                # Show the latest progress before waiting on the user
+                await notifier.flush()
+                elicit_result = await interactions.elicit(
+                    message=f"Please confirm the estimated price of $1200 for your trip to {destination}",
+                    requested_schema=PriceConfirmationSchema.model_json_schema(),
+                )
+
+                elicitation_result = elicit_result
+
+                if elicit_result and elicit_result.action == "accept":
+                    logger.info(f"User confirmed price: {elicit_result.content}")
+                    # Continue with booking
+                elif elicit_result and elicit_result.action == "decline":
+                    logger.info(f"User declined price confirmation: {elicit_result.content}")
+                    booking_cancelled = True
+                    # Stop the booking process
+                    await notifier.progress(100, total=100, message="Booking cancelled by user")
+                    break
+                else:
+                    logger.info("User cancelled elicitation")
+                    booking_cancelled = True
+                    await notifier.progress(100, total=100, message="Booking cancelled")
+                    break
+
+            except Exception as e:
+                logger.info(f"Elicitation request failed (this is normal in tests): {e}")
+                # Continue with booking anyway for fallback
+
+        if not booking_cancelled:
+            await anyio.sleep(2)  # Fixed 0.5 second delay between steps
+            await checkpoint.save(
+                i + 1,
+                elicitation=elicitation_result.model_dump(mode="json") if elicitation_result else None,
+            )
+
+    # Generate final result based on elicitation outcome
+    if booking_cancelled:
+        if elicitation_result and hasattr(elicitation_result, 'content') and elicitation_result.content:
+            notes = elicitation_result.content.get('notes', 'No reason provided')
+            result_text = f"❌ Booking cancelled for trip to {destination}. Reason: {notes}"
+        else:
+            result_text = f"❌ Booking cancelled for trip to {destination}."
+    else:
+        # Final progress update for successful booking
+        await notifier.progress(100, total=100, message="Trip booked successfully")
+
+        # Include confirmation details in success message
+        if elicitation_result and elicitation_result.action == "accept" and elicitation_result.content:
+            notes = elicitation_result.content.get('notes', 'No additional notes')
+            result_text = f"✅ Trip booked successfully to {destination}! Price confirmed with notes: '{notes}'"
+        else:
+            result_text = f"✅ Trip booked successfully to {destination}!"
+
+    return [TextContent(type="text", text=result_text)]
+
+
+@TOOLS.tool(
+    "research_agent",
+    description="Research a topic with progress updates and interactive summaries",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "topic": {
+                "type": "string",
+                "description": "Research topic",
+                "default": "AI trends"
+            }
+        }
+    },
+    # Its result depends on the client's answers, not only its arguments
+    cacheable=False,
+)
+async def research_agent(
+    ctx: RequestContext,
+    args: dict,
+    notifier: NotificationCoalescer,
+    checkpoint: ToolCheckpoint,
+    interactions: Interactions,
+) -> list[TextContent]:
+    """Research a topic, asking the client for a summary via sampling."""
+    topic = args.get("topic", "AI trends")
+    logger.info(f"Research agent: topic={topic}")
+
+    # Simple research flow with progress updates
+    steps = [
+        "Gathering sources...",
+        "Analyzing data...", 
+        "Summarizing findings...",
+        "Finalizing report..."
+    ]
+
+    # A resumed call keeps the summary the client already provided
+    sampling_summary = checkpoint.state.get("sampling_summary")
+
+    for i, step in enumerate(steps[checkpoint.step:], start=checkpoint.step):
+        await notifier.progress(i * 25, total=100, message=step)
+
+        # Add sampling request at step 3 (Summarizing findings)
+        if i == 2:  # "Summarizing findings..." step
+            try:
+                await notifier.flush()
+                sampling_result = await interactions.create_message(
+                    messages=[
+                        SamplingMessage(
+                            role="user",
+                            content=TextContent(type="text", text=f"Please summarize the key findings for research on: {topic}")
+                        )
+                    ],
+                    max_tokens=100,
+                )
+
+                if sampling_result and sampling_result.content:
+                    if sampling_result.content.type == "text":
+                        sampling_summary = sampling_result.content.text
+                        logger.info(f"Received sampling summary: {sampling_summary}")
+
+            except Exception as e:
+                logger.info(f"Sampling request failed (this is normal in tests): {e}")
+
+        await anyio.sleep(2)  # Fixed 0.5 second delay between steps
+        await checkpoint.save(i + 1, sampling_summary=sampling_summary)
+
+    # Final progress update
+    await notifier.progress(100, total=100, message="Research completed successfully")
+
+    # Use sampling summary if available, otherwise default message
+    if sampling_summary:
+        result_text = f"🔍 Research on '{topic}' completed successfully!\n\n📊 Key Findings (from user input): {sampling_summary}"
+    else:
+        result_text = f"🔍 Research on '{topic}' completed successfully!"
+
+    return [TextContent(type="text", text=result_text)]
+
+
+@TOOLS.tool(
+    "long_running_agent",
+    description="A long-running task for testing resumption (50 steps, 2 seconds each)",
+    input_schema={
+        "type": "object",
+        "properties": {}
+    },
+)
+async def long_running_agent(
+    ctx: RequestContext,
+    args: dict,
+    notifier: NotificationCoalescer,
+    checkpoint: ToolCheckpoint,
+    interactions: Interactions,
+) -> list[TextContent]:
+    """Run 50 two-second steps, logging each one."""
+    # Fixed values optimized for resumption testing
+    steps = 50
+    duration = 2.0
+    logger.info(f"Long running agent: {steps} steps, {duration}s each")
+
+    # Send initial log message
+    if checkpoint.resumed:
+        await notifier.log(
+            "info",
+            f"Long-running task resumed at step {checkpoint.step + 1}",
+            logger="long_running_agent",
+        )
+    else:
+        await notifier.log("info", "Long-running task started", logger="long_running_agent")
+
+    # Execute the long-running task, skipping steps completed before a restart
+    for i in range(checkpoint.step, steps):
+        # Stop before starting another step once the call is cancelled
+        await anyio.lowlevel.checkpoint_if_cancelled()
+        current_step = i + 1
+        # Use integer arithmetic to avoid floating point precision issues
+        progress_percent = (current_step * 100) // steps
+
+        # Send log message for each step
+        await notifier.log(
+            "info",
+            f"Processing step {current_step}/{steps} ({progress_percent}%)",
+            logger="long_running_agent",
+        )
+
+        # Wait for 2 seconds
+        await anyio.sleep(duration)
+        await checkpoint.save(current_step)
+        # Record the share done for the cancellation metrics without sending
+        # progress notifications, which this tool has never sent
+        notifier.progress_fraction = current_step / steps
+
+    # Send completion log message
+    await notifier.log(
+        "info",
+        f"Task completed successfully! Processed {steps} steps in {steps * duration:.0f} seconds.",
+        logger="long_running_agent",
+    )
+
+    # Final completion message
+    result_text = f"✅ Long-running task completed successfully! Processed {steps} steps in {steps * duration:.0f} seconds."
+    return [TextContent(type="text", text=result_text)]
+
+
 class ResumableServer(Server):
     """Server implementation with long-running tools and notifications for resumption testing."""
 
-    def __init__(self, name: str = "resumable_mcp_server"):
+    def __init__(
+        self,
+        name: str = "resumable_mcp_server",
+        notification_interval: float = 1.0,
+        scheduler: Optional[ToolScheduler] = None,
+        registry: Optional[ToolRegistry] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+        result_cache: Optional[ToolResultCache] = None,
+        interaction_timeout: Optional[float] = 120.0,
+        abandonment: Optional[AbandonmentMonitor] = None,
+        metrics: Optional[ServerMetrics] = None,
+    ):
         super().__init__(name)
+        # Minimum seconds between a tool call's notification batches (0 sends every update)
+        self.notification_interval = notification_interval
+        # Limits concurrent tool calls per tool and per session
+        self.scheduler = scheduler or ToolScheduler()
+        self.registry = registry if registry is not None else TOOLS
+        # Durable step checkpoints for calls that send _meta.checkpointKey
+        self.checkpoints = checkpoints
+        self._running_checkpoints: set[str] = set()
+        # Opt-in cache of results for tools that are deterministic per arguments
+        self.result_cache = result_cache
+        # Longest a tool waits for an elicitation or sampling answer (None waits forever)
+        self.interaction_timeout = interaction_timeout
+        # Counts cancelled calls and the work their cancellation saved
+        self.abandonment = abandonment or AbandonmentMonitor()
+        # Tool call latencies, exported on /metrics
+        self.metrics = metrics or ServerMetrics()
         logger.info(f"ResumableServer '{name}' initialized")
 
-        @self.list_tools()
-        async def handle_list_tools() -> list[Tool]:
-            """List available tools including resumable ones."""
-            return [
-                Tool(
-                    name="travel_agent",
-                    description="Book a travel trip with progress updates and price confirmation",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "destination": {
-                                "type": "string",
-                                "description": "Travel destination",
-                                "default": "Paris"
-                            }
-                        }
-                    },
-                ),
-                Tool(
-                    name="research_agent",
-                    description="Research a topic with progress updates and interactive summaries",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "topic": {
-                                "type": "string",
-                                "description": "Research topic",
-                                "default": "AI trends"
-                            }
-                        }
-                    },
-                ),
-                Tool(
-                    name="long_running_agent",
-                    description="A long-running task for testing resumption (50 steps, 2 seconds each)",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {}
-                    },
-                ),
-            ]
-
-        @self.call_tool()
-        async def handle_call_tool(name: str, args: dict) -> list[TextContent]:
-            """Handle tool execution with support for long-running tasks."""
-            ctx = self.request_context
-            logger.info(f"Tool called: {name} with args: {args}")
-
-            if name == "travel_agent":
-                destination = args.get("destination", "Paris")
-                logger.info(f"Travel agent: destination={destination}")
-                
-                # Simple travel booking flow with progress updates
-                steps = [
-                    "Checking flights...",
-                    "Finding available dates...", 
-                    "Confirming prices...",
-                    "Booking flight..."
-                ]
-                
-                elicitation_result = None
-                booking_cancelled = False
-                
-                for i, step in enumerate(steps):
-                    await ctx.session.send_progress_notification(
-                        progress_token=ctx.request_id,
-                        progress=i * 25,
-                        total=100,
-                        message=step, 
-                        related_request_id=str(ctx.request_id)   
-                    )
-                    
-                    # Add elicitation request at step 3 (Confirming prices)
-                    if i == 2:  # "Confirming prices..." step
-                        try:
-                            elicit_result = await ctx.session.elicit(
-                                message=f"Please confirm the estimated price of $1200 for your trip to {destination}",
-                                requestedSchema=PriceConfirmationSchema.model_json_schema(),
-                                related_request_id=ctx.request_id,
-                            )
-                            
-                            elicitation_result = elicit_result
-                            
-                            if elicit_result and elicit_result.action == "accept":
-                                logger.info(f"User confirmed price: {elicit_result.content}")
-                                # Continue with booking
-                            elif elicit_result and elicit_result.action == "decline":
-                                logger.info(f"User declined price confirmation: {elicit_result.content}")
-                                booking_cancelled = True
-                                # Stop the booking process
-                                await ctx.session.send_progress_notification(
-                                    progress_token=ctx.request_id,
-                                    progress=100,
-                                    total=100,
-                                    message="Booking cancelled by user",
-                                    related_request_id= str(ctx.request_id)
-                                )
-                                break
-                            else:
-                                logger.info("User cancelled elicitation")
-                                booking_cancelled = True
-                                await ctx.session.send_progress_notification(
-                                    progress_token=ctx.request_id,
-                                    progress=100,
-                                    total=100,
-                                    message="Booking cancelled"
-                                )
-                                break
-                                
-                        except Exception as e:
-                            logger.info(f"Elicitation request failed (this is normal in tests): {e}")
-                            # Continue with booking anyway for fallback
-                    
-                    if not booking_cancelled:
-                        await anyio.sleep(2)  # Fixed 0.5 second delay between steps
-                
-                # Generate final result based on elicitation outcome
-                if booking_cancelled:
-                    if elicitation_result and hasattr(elicitation_result, 'content') and elicitation_result.content:
-                        notes = elicitation_result.content.get('notes', 'No reason provided')
-                        result_text = f"❌ Booking cancelled for trip to {destination}. Reason: {notes}"
-                    else:
-                        result_text = f"❌ Booking cancelled for trip to {destination}."
-                else:
-                    # Final progress update for successful booking
-                    await ctx.session.send_progress_notification(
-                        progress_token=ctx.request_id,
-                        progress=100,
-                        total=100,
-                        message="Trip booked successfully"
-                    )
-                    
-                    # Include confirmation details in success message
-                    if elicitation_result and elicitation_result.action == "accept" and elicitation_result.content:
-                        notes = elicitation_result.content.get('notes', 'No additional notes')
-                        result_text = f"✅ Trip booked successfully to {destination}! Price confirmed with notes: '{notes}'"
-                    else:
-                        result_text = f"✅ Trip booked successfully to {destination}!"
-
-                return [TextContent(type="text", text=result_text)]
-
-            elif name == "research_agent":
-                topic = args.get("topic", "AI trends")
-                logger.info(f"Research agent: topic={topic}")
-                
-                # Simple research flow with progress updates
-                steps = [
-                    "Gathering sources...",
-                    "Analyzing data...", 
-                    "Summarizing findings...",
-                    "Finalizing report..."
-                ]
-                
-                sampling_summary = None
-                
-                for i, step in enumerate(steps):
-                    await ctx.session.send_progress_notification(
-                        progress_token=ctx.request_id,
-                        progress=i * 25,
-                        total=100,
-                        message=step
-                    )
-                    
-                    # Add sampling request at step 3 (Summarizing findings)
-                    if i == 2:  # "Summarizing findings..." step
-                        try:
-                            sampling_result = await ctx.session.create_message(
-                                messages=[
-                                    SamplingMessage(
-                                        role="user",
-                                        content=TextContent(type="text", text=f"Please summarize the key findings for research on: {topic}")
-                                    )
-                                ],
-                                max_tokens=100,
-                                related_request_id=ctx.request_id,
-                            )
-                            
-                            if sampling_result and sampling_result.content:
-                                if sampling_result.content.type == "text":
-                                    sampling_summary = sampling_result.content.text
-                                    logger.info(f"Received sampling summary: {sampling_summary}")
-                                    
-                        except Exception as e:
-                            logger.info(f"Sampling request failed (this is normal in tests): {e}")
-                    
-                    await anyio.sleep(2)  # Fixed 0.5 second delay between steps
-                
-                # Final progress update
+        # Tools/list replies come straight from the registry's cached result
+        self.request_handlers[ListToolsRequest] = self._handle_list_tools
+
+        # Tools/call is answered from the registry too, which holds the definitions and
+        # compiled validators, so the base class's tool lookup and validation are not used
+        self.request_handlers[CallToolRequest] = self._handle_call_tool
+
+    async def _call_tool(
+        self,
+        ctx: RequestContext,
+        tool: RegisteredTool,
+        args: dict,
+    ) -> list[TextContent] | CallToolResult:
+        """Validate a call's arguments and policy, then answer it from the cache or run it."""
+        error = tool.validation_error(args)
+        if error is not None:
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Input validation error: {error}")],
+                isError=True,
+            )
+        try:
+            interactions = Interactions(ctx, resolve_policy(ctx), self.interaction_timeout)
+        except ValueError as e:
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Invalid {POLICY_KEY}: {e}")],
+                isError=True,
+            )
+
+        def run() -> Awaitable[list[TextContent] | CallToolResult]:
+            return self._run_tool(ctx, tool, args, interactions)
+
+        if self.result_cache is not None and tool.cacheable and self.result_cache.caches(tool.name):
+            result, source = await self.result_cache.get_or_run(
+                tool.name, args, run, interactions.policy.to_dict()
+            )
+            if source != CACHE_MISS:
+                # Send the completion update a fresh run would end with
                 await ctx.session.send_progress_notification(
                     progress_token=ctx.request_id,
                     progress=100,
                     total=100,
-                    message="Research completed successfully"
+                    message=f"Completed ({source} result)",
+                    related_request_id=str(ctx.request_id),
                 )
+            return result
+        return await run()
 
-                # Use sampling summary if available, otherwise default message
-                if sampling_summary:
-                    result_text = f"🔍 Research on '{topic}' completed successfully!\n\n📊 Key Findings (from user input): {sampling_summary}"
-                else:
-                    result_text = f"🔍 Research on '{topic}' completed successfully!"
-                
-                return [TextContent(type="text", text=result_text)]
-
-            elif name == "long_running_agent":
-                # Fixed values optimized for resumption testing
-                steps = 50
-                duration = 2.0
-                logger.info(f"Long running agent: {steps} steps, {duration}s each")
-                
-                # Send initial log message
-                await ctx.session.send_log_message(
-                    level="info",
-                    data="Long-running task started",
-                    logger="long_running_agent",
-                    related_request_id=ctx.request_id,
-                )
-                
-                # Execute the long-running task
-                for i in range(steps):
-                    current_step = i + 1
-                    # Use integer arithmetic to avoid floating point precision issues
-                    progress_percent = (current_step * 100) // steps
-                    
-                    # Send log message for each step
-                    await ctx.session.send_log_message(
-                        level="info",
-                        data=f"Processing step {current_step}/{steps} ({progress_percent}%)",
-                        logger="long_running_agent",
-                        related_request_id=ctx.request_id,
-                    )
-                    
-                    # Wait for 2 seconds
-                    await anyio.sleep(duration)
-                
-                # Send completion log message
-                await ctx.session.send_log_message(
-                    level="info",
-                    data=f"Task completed successfully! Processed {steps} steps in {steps * duration:.0f} seconds.",
-                    logger="long_running_agent",
-                    related_request_id=ctx.request_id,
+    async def _run_tool(
+        self,
+        ctx: RequestContext,
+        tool: RegisteredTool,
+        args: dict,
+        interactions: Interactions,
+    ) -> list[TextContent] | CallToolResult:
+        """Run a tool under its scheduler slot, continuing from its checkpoint if it has one."""
+        checkpoint = await self._begin_checkpoint(ctx, tool.name, args)
+        if checkpoint.result is not None:
+            logger.info(f"Returning stored result for checkpoint '{checkpoint.key}'")
+            return checkpoint.result
+        if checkpoint.key in self._running_checkpoints:
+            return CallToolResult(
+                content=[TextContent(type="text", text=f"Checkpoint '{checkpoint.key}' is already running")],
+                isError=True,
+            )
+        if checkpoint.key is not None:
+            # Claimed before the first await, so a concurrent call with the same key sees it
+            self._running_checkpoints.add(checkpoint.key)
+
+        try:
+            # Wait for a free slot; a full queue is reported with a retry delay
+            try:
+                slot = await self.scheduler.acquire(tool.name, id(ctx.session))
+            except ToolBusyError as e:
+                logger.warning(str(e))
+                return e.to_result()
+
+            notifier = NotificationCoalescer(ctx.session, ctx.request_id, self.notification_interval)
+            started = time.monotonic()
+            try:
+                async with slot, notifier:
+                    result = await tool.handler(ctx, args, notifier, checkpoint, interactions)
+            except anyio.get_cancelled_exc_class():
+                # The client cancelled the call or its session was abandoned
+                self.abandonment.record_cancelled(
+                    tool.name, time.monotonic() - started, notifier.progress_fraction, notifier.sent
                 )
-                
-                # Final completion message
-                result_text = f"✅ Long-running task completed successfully! Processed {steps} steps in {steps * duration:.0f} seconds."
-                return [TextContent(type="text", text=result_text)]
+                raise
+        finally:
+            self._running_checkpoints.discard(checkpoint.key)
+        await checkpoint.complete(result)
+        return result
+
+    async def _begin_checkpoint(self, ctx: RequestContext, name: str, args: dict) -> ToolCheckpoint:
+        """Load the call's checkpoint if it sent a checkpoint key and checkpoints are enabled."""
+        key = getattr(ctx.meta, "checkpointKey", None) if ctx.meta is not None else None
+        if key is None or self.checkpoints is None:
+            return ToolCheckpoint(tool=name, arguments=args)
+        return await self.checkpoints.begin(str(key), name, args)
 
-            else:
+    async def _handle_call_tool(self, request: CallToolRequest) -> ServerResult:
+        """Handle tool execution with support for long-running tasks."""
+        ctx = self.request_context
+        name = request.params.name
+        args = request.params.arguments or {}
+        logger.info(f"Tool called: {name} with args: {args}")
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            tool = self.registry.get(name)
+            if tool is None:
                 raise ValueError(f"Unknown tool: {name}")
+            result = await self._call_tool(ctx, tool, args)
+            if not isinstance(result, CallToolResult):
+                result = CallToolResult(content=list(result), isError=False)
+            if not result.isError:
+                status = "ok"
+        except anyio.get_cancelled_exc_class():
+            status = "cancelled"
+            raise
+        except Exception as e:
+            # Reported to the client as a tool error, as the base class's call_tool handler does
+            result = CallToolResult(content=[TextContent(type="text", text=str(e))], isError=True)
+        finally:
+            self.metrics.tool_calls.observe(time.perf_counter() - started, name, status)
+        return ServerResult(result)
+
+    async def _handle_list_tools(self, request: Optional[ListToolsRequest]) -> ServerResult:
+        """List the registered tools, or confirm that the client's copy is current."""
+        meta = request.params.meta if request is not None and request.params is not None else None
+        return self.registry.list_tools_result(getattr(meta, "ifNoneMatch", None))
 
 
-def create_server_app(event_store: Optional[EventStore] = None) -> Starlette:
+def create_server_app(
+    event_store: Optional[EventStore] = None,
+    notification_interval: float = 1.0,
+    scheduler: Optional[ToolScheduler] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    result_cache: Optional[ToolResultCache] = None,
+    interaction_timeout: Optional[float] = 120.0,
+    abandon_after: Optional[float] = 60.0,
+    registry: Optional[ToolRegistry] = None,
+) -> Starlette:
     """Create the Starlette application with resumable MCP server."""
+    # Sessions idle for abandon_after seconds are ended and their calls cancelled
+    abandonment = AbandonmentMonitor(abandon_after)
+    # Latency histograms and session gauges, served on /metrics
+    metrics = ServerMetrics()
+    if event_store is not None:
+        event_store = InstrumentedEventStore(event_store, metrics)
+
     # Create server instance
-    server = ResumableServer()
+    server = ResumableServer(
+        notification_interval=notification_interval,
+        scheduler=scheduler,
+        registry=registry,
+        checkpoints=checkpoints,
+        result_cache=result_cache,
+        interaction_timeout=interaction_timeout,
+        abandonment=abandonment,
+        metrics=metrics,
+    )
 
     # Create security settings
     security_settings = TransportSecuritySettings(
@@ -304,18 +512,21 @@ def create_server_app(event_store: Optional[EventStore] = None) -> Starlette:
     )
 
     # Create session manager with event store
-    session_manager = StreamableHTTPSessionManager(
+    session_manager = AbandonmentAwareSessionManager(
         app=server,
         event_store=event_store,
         json_response=False,  # Use SSE streams
         security_settings=security_settings,
+        monitor=abandonment,
     )
+    metrics.watch(server, session_manager)
 
     # Create ASGI application
     app = Starlette(
         debug=True,
         routes=[
             Mount("/mcp", app=session_manager.handle_request),
+            Route("/metrics", endpoint=metrics.endpoint),
         ],
         lifespan=lambda app: session_manager.run(),
     )
@@ -323,13 +534,42 @@ def create_server_app(event_store: Optional[EventStore] = None) -> Starlette:
     return app
 
 
-async def run_server(port: int = 8006, with_event_store: bool = True) -> None:
+async def run_server(
+    port: int = 8006,
+    with_event_store: bool = True,
+    event_store_backend: str = "memory",
+    event_store_path: Optional[str] = None,
+    event_store_shards: int = 1,
+    event_store_options: Optional[dict] = None,
+    limit_concurrency: Optional[int] = 10,
+    notification_interval: float = 1.0,
+    scheduler_options: Optional[dict] = None,
+    checkpoint_path: Optional[str] = None,
+    result_cache_options: Optional[dict] = None,
+    interaction_timeout: Optional[float] = 120.0,
+    abandon_after: Optional[float] = 60.0,
+) -> None:
     """Run the resumable HTTP server."""
     # Create event store if requested
-    event_store = SimpleEventStore() if with_event_store else None
+    event_store = create_event_store(
+        event_store_backend if with_event_store else "none",
+        path=event_store_path,
+        shards=event_store_shards,
+        options=event_store_options,
+    )
+    # Checkpoints let interrupted tool calls continue after a restart
+    checkpoints = CheckpointStore(checkpoint_path) if checkpoint_path else None
     
     # Create application
-    app = create_server_app(event_store)
+    app = create_server_app(
+        event_store,
+        notification_interval=notification_interval,
+        scheduler=ToolScheduler(**(scheduler_options or {})),
+        checkpoints=checkpoints,
+        result_cache=ToolResultCache(**result_cache_options) if result_cache_options else None,
+        interaction_timeout=interaction_timeout,
+        abandon_after=abandon_after,
+    )
 
     # Configure server
     config = uvicorn.Config(
@@ -337,14 +577,14 @@ async def run_server(port: int = 8006, with_event_store: bool = True) -> None:
         host="127.0.0.1",
         port=port,
         log_level="info",
-        limit_concurrency=10,
+        limit_concurrency=limit_concurrency,
         timeout_keep_alive=30,
         access_log=True,
     )
 
     logger.info(f"Starting Resumable HTTP MCP Server on http://127.0.0.1:{port}/mcp")
     if event_store:
-        logger.info("Event store enabled - resumption supported")
+        logger.info(f"Event store enabled ({type(event_store).__name__}) - resumption supported")
     else:
         logger.info("Event store disabled - no resumption support")
 
@@ -358,6 +598,12 @@ async def run_server(port: int = 8006, with_event_store: bool = True) -> None:
     except Exception as e:
         logger.error(f"Server error: {e}")
         raise
+    finally:
+        # Flush queued events and close files for stores that hold them
+        if hasattr(event_store, "aclose"):
+            await event_store.aclose()
+        if checkpoints is not None:
+            checkpoints.close()
 
 
 def main():
@@ -365,16 +611,108 @@ def main():
     parser = argparse.ArgumentParser(description="Resumable HTTP MCP Server")
     parser.add_argument("--port", type=int, default=8006, help="Port to listen on (default: 8006)")
     parser.add_argument("--no-event-store", action="store_true", help="Disable event store (no resumption)")
+    parser.add_argument("--event-store", choices=EVENT_STORE_BACKENDS, default=None,
+                        help="Event store backend (default: memory)")
+    parser.add_argument("--event-store-path", default=None,
+                        help="Database file (sqlite) or directory (log) for the event store")
+    parser.add_argument("--event-store-shards", type=int, default=None,
+                        help="Spread streams across this many event stores (default: 1)")
+    parser.add_argument("--event-store-option", action="append", default=[], metavar="KEY=VALUE",
+                        help="Backend tuning option, e.g. durability=async or max_events=100000 (repeatable)")
+    parser.add_argument("--event-store-config", default=None,
+                        help="JSON file with backend, path, shards and options; flags above override it")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Run this many server processes behind a session-affinity proxy (default: 1)")
+    parser.add_argument("--limit-concurrency", type=int, default=10,
+                        help="Maximum concurrent connections per server process (default: 10)")
+    parser.add_argument("--notification-interval", type=float, default=1.0,
+                        help="Minimum seconds between a tool call's progress notifications; "
+                             "superseded updates in between are dropped (default: 1.0, 0 sends all)")
+    parser.add_argument("--tool-concurrency", type=int, default=8,
+                        help="Concurrent calls per tool (default: 8)")
+    parser.add_argument("--tool-limit", action="append", default=[], metavar="TOOL=N",
+                        help="Concurrent calls for one tool, e.g. long_running_agent=2 (repeatable)")
+    parser.add_argument("--session-tool-limit", type=int, default=4,
+                        help="Concurrent tool calls per session (default: 4)")
+    parser.add_argument("--tool-queue-size", type=int, default=32,
+                        help="Calls that may wait per tool before new ones are rejected (default: 32)")
+    parser.add_argument("--checkpoint-path", default=None,
+                        help="SQLite file for tool step checkpoints; calls sent with _meta.checkpointKey "
+                             "continue from their last step after a restart (default: disabled)")
+    parser.add_argument("--cache-tool", action="append", default=[], metavar="TOOL",
+                        help="Cache results of this tool by its arguments, e.g. long_running_agent (repeatable)")
+    parser.add_argument("--cache-ttl", type=float, default=300.0,
+                        help="Seconds a cached tool result stays valid (default: 300)")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="Maximum cached tool results (default: 256)")
+    parser.add_argument("--interaction-timeout", type=float, default=120.0,
+                        help="Seconds a tool waits for an elicitation or sampling answer; "
+                             "0 waits forever (default: 120)")
+    parser.add_argument("--abandon-after", type=float, default=60.0,
+                        help="Seconds a disconnected session may take to reconnect before its tool calls "
+                             "are cancelled and its events deleted; 0 keeps it forever (default: 60)")
     
     args = parser.parse_args()
     
     # Configure logging
     logging.basicConfig(level=logging.INFO)
+
+    # Settings from the config file, overridden by explicit flags
+    config = load_event_store_config(args.event_store_config) if args.event_store_config else {}
+    options = dict(config.get("options", {}))
+    try:
+        options.update(parse_option(option) for option in args.event_store_option)
+        tool_limits = dict(parse_option(option) for option in args.tool_limit)
+    except ValueError as e:
+        parser.error(str(e))
     
+    server_options = dict(
+        event_store_path=args.event_store_path or config.get("path"),
+        event_store_shards=args.event_store_shards or config.get("shards", 1),
+        event_store_options=options,
+        limit_concurrency=args.limit_concurrency,
+        notification_interval=args.notification_interval,
+        scheduler_options=dict(
+            default_limit=args.tool_concurrency,
+            tool_limits=tool_limits,
+            session_limit=args.session_tool_limit,
+            max_queue=args.tool_queue_size,
+        ),
+        checkpoint_path=args.checkpoint_path,
+        result_cache_options=dict(
+            tools=args.cache_tool,
+            max_entries=args.cache_size,
+            ttl_seconds=args.cache_ttl,
+        ) if args.cache_tool else None,
+        interaction_timeout=args.interaction_timeout or None,
+        abandon_after=args.abandon_after or None,
+    )
+    try:
+        # Check the limits here so a bad flag is a usage error, not a worker crash
+        ToolScheduler(**server_options["scheduler_options"])
+        AbandonmentMonitor(server_options["abandon_after"])
+        for name in args.cache_tool:
+            tool = TOOLS.get(name)
+            if tool is None or not tool.cacheable:
+                raise ValueError(f"Tool '{name}' cannot be cached")
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.workers > 1:
+        # Workers share one event store, so default to one that is process-safe
+        backend = "none" if args.no_event_store else args.event_store or config.get("backend", "sqlite")
+        try:
+            run_multiworker(port=args.port, workers=args.workers, event_store_backend=backend, **server_options)
+        except ValueError as e:
+            parser.error(str(e))
+        return
+
     # Run the server
     asyncio.run(run_server(
         port=args.port,
-        with_event_store=not args.no_event_store
+        with_event_store=not args.no_event_store,
+        event_store_backend=args.event_store or config.get("backend", "memory"),
+        **server_options,
     ))
 
 
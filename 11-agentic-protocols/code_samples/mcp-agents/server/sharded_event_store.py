@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Sharded Event Store for MCP Session Resumption
+
+This module provides an EventStore wrapper that spreads streams across several
+underlying stores (for example one SQLite file per disk), so writes for
+different streams proceed in parallel instead of queueing on one database.
+"""
+
+import asyncio
+import logging
+import zlib
+from typing import Sequence
+
+from mcp.server.streamable_http import (
+    EventCallback,
+    EventId,
+    EventMessage,
+    EventStore,
+    StreamId,
+)
+from mcp.types import JSONRPCMessage
+
+logger = logging.getLogger(__name__)
+
+# Separates the shard number from the underlying store's event ID
+SHARD_SEPARATOR = "_"
+
+
+class ShardedEventStore(EventStore):
+    """
+    Event store that hashes each stream to one of several underlying stores.
+
+    A stream always maps to the same shard (CRC32 of the stream ID, which is
+    stable across processes), so its events stay ordered within one store.
+    Event IDs are prefixed with the shard number, e.g. ``"2_1041"``, which
+    routes a resume straight to the shard holding the stream.
+    """
+
+    def __init__(self, shards: Sequence[EventStore]) -> None:
+        if not shards:
+            raise ValueError("ShardedEventStore needs at least one shard")
+        self._shards = list(shards)
+        logger.info(f"ShardedEventStore initialized with {len(self._shards)} shards")
+
+    @property
+    def shards(self) -> list[EventStore]:
+        return list(self._shards)
+
+    def shard_for(self, stream_id: StreamId) -> int:
+        """Return the index of the shard that holds a stream."""
+        return zlib.crc32(stream_id.encode("utf-8")) % len(self._shards)
+
+    async def store_event(self, stream_id: StreamId, message: JSONRPCMessage) -> EventId:
+        """Store an event in the stream's shard and return the prefixed ID."""
+        shard = self.shard_for(stream_id)
+        event_id = await self._shards[shard].store_event(stream_id, message)
+        return f"{shard}{SHARD_SEPARATOR}{event_id}"
+
+    async def replay_events_after(
+        self,
+        last_event_id: EventId,
+        send_callback: EventCallback,
+    ) -> StreamId | None:
+        """Replay events after the specified ID from the shard that stored it."""
+        shard_part, separator, inner_id = last_event_id.partition(SHARD_SEPARATOR)
+        if not separator or not shard_part.isdigit() or int(shard_part) >= len(self._shards):
+            logger.warning(f"Invalid sharded event ID: {last_event_id}")
+            return None
+        shard = int(shard_part)
+
+        async def shard_callback(event: EventMessage) -> None:
+            # Re-prefix replayed IDs so the client resumes through this wrapper
+            event_id = f"{shard}{SHARD_SEPARATOR}{event.event_id}" if event.event_id else None
+            await send_callback(EventMessage(event.message, event_id))
+
+        return await self._shards[shard].replay_events_after(inner_id, shard_callback)
+
+    async def delete_stream(self, stream_id: StreamId) -> int:
+        """Delete a stream's events from its shard, if that shard supports deleting."""
+        shard = self._shards[self.shard_for(stream_id)]
+        if not hasattr(shard, "delete_stream"):
+            return 0
+        return await shard.delete_stream(stream_id)
+
+    def get_event_count(self) -> int:
+        """Get the total number of stored events across all shards."""
+        return sum(shard.get_event_count() for shard in self._shards)
+
+    async def clear_events(self) -> None:
+        """Clear all stored events in every shard."""
+        await asyncio.gather(*(shard.clear_events() for shard in self._shards))
+
+    async def aclose(self) -> None:
+        """Close every shard, flushing queued events where supported."""
+        await asyncio.gather(*(
+            shard.aclose() for shard in self._shards if hasattr(shard, "aclose")
+        ))
+        for shard in self._shards:
+            if not hasattr(shard, "aclose") and hasattr(shard, "close"):
+                shard.close()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tool Registry for the Resumable MCP Server
+
+Tools register once with their name, description and input schema. The
+registry builds the ``tools/list`` result and an ETag for it a single time per
+change instead of on every request, compiles each input schema into a
+validator up front, and finds a tool's handler with a dict lookup.
+
+A client that already holds the tool list can send the ETag it received as
+``_meta.ifNoneMatch`` on ``tools/list``; if the list has not changed, the
+reply carries no tools and ``_meta.notModified`` is true.
+"""
+
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from jsonschema.exceptions import SchemaError, best_match
+from jsonschema.validators import validator_for
+from mcp.types import ListToolsResult, ServerResult, TextContent, Tool
+
+logger = logging.getLogger(__name__)
+
+# handler(ctx, args, notifier, checkpoint, interactions) -> content returned to the client
+ToolHandler = Callable[..., Awaitable[list[TextContent]]]
+
+
+class RegisteredTool:
+    """A tool's definition, compiled input validator and handler."""
+
+    __slots__ = ("definition", "handler", "cacheable", "_validator")
+
+    def __init__(self, definition: Tool, handler: ToolHandler, cacheable: bool = True) -> None:
+        self.definition = definition
+        self.handler = handler
+        # False for tools whose result depends on more than their arguments,
+        # such as the client's answers to their questions
+        self.cacheable = cacheable
+        validator_class = validator_for(definition.inputSchema)
+        try:
+            validator_class.check_schema(definition.inputSchema)
+        except SchemaError as e:
+            raise ValueError(f"Invalid input schema for tool '{definition.name}': {e.message}") from e
+        self._validator = validator_class(definition.inputSchema)
+
+    @property
+    def name(self) -> str:
+        return self.definition.name
+
+    def validation_error(self, arguments: dict[str, Any]) -> Optional[str]:
+        """Return why `arguments` do not match the input schema, or None if they do."""
+        error = best_match(self._validator.iter_errors(arguments))
+        return error.message if error is not None else None
+
+
+class ToolRegistry:
+    """
+    Tools by name, with the ``tools/list`` result cached between changes.
+
+    Register tools with the ``tool`` decorator:
+
+        registry = ToolRegistry()
+
+        @registry.tool("echo", "Echo the input", {"type": "object", "properties": {}})
+        async def echo(ctx, args, notifier, checkpoint, interactions):
+            return [TextContent(type="text", text=str(args))]
+    """
+
+    def __init__(self) -> None:
+        self._tools: dict[str, RegisteredTool] = {}
+        self._list_result: Optional[ServerResult] = None
+        self._not_modified: Optional[ServerResult] = None
+        self._etag: Optional[str] = None
+
+    def register(self, definition: Tool, handler: ToolHandler, cacheable: bool = True) -> RegisteredTool:
+        """Add a tool, replacing any tool with the same name."""
+        entry = RegisteredTool(definition, handler, cacheable)
+        if entry.name in self._tools:
+            logger.warning(f"Replacing registered tool '{entry.name}'")
+        self._tools[entry.name] = entry
+        # Rebuilt on the next tools/list
+        self._list_result = self._not_modified = self._etag = None
+        return entry
+
+    def tool(self, name: str, description: str, input_schema: dict[str, Any], cacheable: bool = True, **fields: Any):
+        """Decorator that registers an async handler(ctx, args, notifier, checkpoint, interactions) as a tool."""
+        def decorator(handler: ToolHandler) -> ToolHandler:
+            self.register(
+                Tool(name=name, description=description, inputSchema=input_schema, **fields), handler, cacheable
+            )
+            return handler
+        return decorator
+
+    def unregister(self, name: str) -> None:
+        """Remove a tool; unknown names are ignored."""
+        if self._tools.pop(name, None) is not None:
+            self._list_result = self._not_modified = self._etag = None
+
+    def get(self, name: str) -> Optional[RegisteredTool]:
+        """Return the registered tool called `name`, if any."""
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    @property
+    def definitions(self) -> dict[str, Tool]:
+        """Tool definitions by name."""
+        return {name: entry.definition for name, entry in self._tools.items()}
+
+    def _build(self) -> None:
+        tools = [entry.definition for entry in self._tools.values()]
+        payload = ListToolsResult(tools=tools).model_dump_json(by_alias=True, exclude_none=True)
+        self._etag = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+        self._list_result = ServerResult(ListToolsResult(tools=tools, _meta={"etag": self._etag}))
+        self._not_modified = ServerResult(
+            ListToolsResult(tools=[], _meta={"etag": self._etag, "notModified": True})
+        )
+
+    @property
+    def etag(self) -> str:
+        """Version of the current tool list; changes whenever a tool is added or removed."""
+        if self._etag is None:
+            self._build()
+        return self._etag
+
+    def list_tools_result(self, if_none_match: Optional[str] = None) -> ServerResult:
+        """Return the cached tools/list result, or a not-modified reply if the ETag matches."""
+        if self._list_result is None:
+            self._build()
+        if if_none_match is not None and if_none_match == self._etag:
+            return self._not_modified
+        return self._list_result
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tool Result Cache for the Resumable MCP Server
+
+Some tools return the same result for the same arguments, yet every call runs
+the whole multi-second pipeline again. This module caches their results by a
+canonical hash of (tool name, arguments, interaction policy), with a TTL and LRU eviction, and
+lets concurrent identical calls share one in-flight execution instead of each
+starting their own.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from mcp.types import CallToolResult
+
+logger = logging.getLogger(__name__)
+
+# How a result was obtained, as returned by ToolResultCache.get_or_run
+CACHE_MISS = "miss"
+CACHE_HIT = "hit"
+CACHE_SHARED = "shared"
+
+
+def cache_key(tool: str, arguments: dict[str, Any], policy: Optional[dict[str, Any]] = None) -> str:
+    """Hash a tool name, arguments and interaction policy, independent of key order."""
+    canonical = json.dumps([tool, arguments, policy or {}], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """
+    TTL and LRU cache of tool results, with deduplication of in-flight calls.
+
+    Only the tools named in ``tools`` are cached; tools with side effects
+    (such as booking a trip) should stay out, and the server never caches
+    tools registered as not cacheable, whose results depend on the client's
+    answers to their questions. Error results are never
+    cached, and a call that fails or is cancelled is not shared with calls
+    that arrive afterwards.
+    """
+
+    def __init__(self, tools: Iterable[str], max_entries: int = 256, ttl_seconds: float = 300.0) -> None:
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.tools = frozenset(tools)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, result), least recently used first
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    def caches(self, tool: str) -> bool:
+        """Return True if results of `tool` are cached."""
+        return tool in self.tools
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _store(self, key: str, result: Any) -> None:
+        if isinstance(result, CallToolResult) and result.isError:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_run(
+        self,
+        tool: str,
+        arguments: dict[str, Any],
+        run: Callable[[], Awaitable[Any]],
+        policy: Optional[dict[str, Any]] = None,
+    ) -> tuple[Any, str]:
+        """
+        Return the cached result for this call, or run it.
+
+        Calls with different interaction policies (pre-supplied answers)
+        neither share results nor a run.
+
+        Returns (result, source) where source is CACHE_HIT, CACHE_SHARED (an
+        identical call was already running and its result was reused) or
+        CACHE_MISS (this call ran the tool).
+        """
+        key = cache_key(tool, arguments, policy)
+        while True:
+            result = self._lookup(key)
+            if result is not None:
+                self.hits += 1
+                return result, CACHE_HIT
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                # Shielded so cancelling this call does not cancel the shared run
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if pending.cancelled():
+                    # The running call was cancelled, not this one: try again
+                    continue
+                raise
+            self.shared += 1
+            return result, CACHE_SHARED
+
+        self.misses += 1
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await run()
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Mark the exception retrieved in case no other call was waiting
+            pending.exception()
+            raise
+        else:
+            self._store(key, result)
+            pending.set_result(result)
+            return result, CACHE_MISS
+        finally:
+            del self._inflight[key]
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._entries.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """Return the entry count and hit, miss and shared counts."""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "shared": self.shared}
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Fair Scheduling for Tool Calls
+
+Without a limit, every tool call starts as soon as it arrives, so a few
+clients flooding one slow tool can hold the server's resources while other
+clients wait. This module gives each tool a concurrency limit and a bounded
+wait queue, caps how many calls one session may run at once, and admits
+waiting calls in fair order between sessions. When a tool's queue is
+full the call is rejected with a suggested retry delay instead of waiting.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import Counter
+from typing import Hashable, Optional
+
+from mcp.types import CallToolResult, TextContent
+
+logger = logging.getLogger(__name__)
+
+
+class ToolBusyError(Exception):
+    """Raised when a tool's wait queue is full."""
+
+    def __init__(self, tool: str, retry_after: float) -> None:
+        super().__init__(f"Tool '{tool}' is busy, retry after {retry_after:.0f}s")
+        self.tool = tool
+        self.retry_after = retry_after
+
+    def to_result(self) -> CallToolResult:
+        """Build the tool error result sent to the client, with the delay in _meta."""
+        return CallToolResult(
+            content=[TextContent(type="text", text=str(self))],
+            isError=True,
+            _meta={"retryAfter": self.retry_after},
+        )
+
+
+class _Waiter:
+    __slots__ = ("session", "start", "finish", "future")
+
+    def __init__(self, session: Hashable, start: float, finish: float, future: asyncio.Future) -> None:
+        self.session = session
+        self.start = start
+        self.finish = finish
+        self.future = future
+
+
+class _ToolQueue:
+    """Running count, waiters and virtual clock of one tool."""
+
+    __slots__ = ("limit", "running", "waiters", "virtual_time", "session_finish", "avg_duration")
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.running = 0
+        self.waiters: list[_Waiter] = []
+        self.virtual_time = 0.0
+        # Finish tag of each session's latest call, so a session that queued
+        # many calls waits behind sessions that queued few
+        self.session_finish: dict[Hashable, float] = {}
+        self.avg_duration = 1.0
+
+
+class ToolSlot:
+    """A granted slot; leave the ``async with`` block to release it."""
+
+    def __init__(self, scheduler: "ToolScheduler", tool: str, session: Hashable) -> None:
+        self._scheduler = scheduler
+        self._tool = tool
+        self._session = session
+        self._started = time.monotonic()
+
+    async def __aenter__(self) -> "ToolSlot":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._scheduler._release(self._tool, self._session, time.monotonic() - self._started)
+
+
+class ToolScheduler:
+    """
+    Per-tool and per-session concurrency limits with fair queueing.
+
+    - default_limit: concurrent calls per tool unless set in tool_limits
+    - tool_limits: per-tool overrides, e.g. {"long_running_agent": 2}
+    - session_limit: concurrent calls one session may run across all tools
+    - max_queue: calls that may wait per tool before new ones are rejected
+    - session_queue_limit: calls one session may have waiting per tool, so a
+      single session cannot fill the queue (default: a quarter of max_queue)
+
+    Each waiting call gets a virtual finish tag of
+    ``max(tool clock, session's previous tag) + 1``, and the eligible
+    waiter with the smallest tag runs next. A session that queues ten calls
+    therefore takes turns with a session that queues one, instead of running
+    all ten first.
+    """
+
+    def __init__(
+        self,
+        default_limit: int = 8,
+        tool_limits: Optional[dict[str, int]] = None,
+        session_limit: int = 4,
+        max_queue: int = 32,
+        session_queue_limit: Optional[int] = None,
+    ) -> None:
+        for value, label in [(default_limit, "default_limit"), (session_limit, "session_limit")]:
+            if value < 1:
+                raise ValueError(f"{label} must be at least 1, got {value}")
+        for tool, limit in (tool_limits or {}).items():
+            if not isinstance(limit, int) or limit < 1:
+                raise ValueError(f"Limit for tool '{tool}' must be a positive integer, got {limit!r}")
+        if max_queue < 0:
+            raise ValueError(f"max_queue must not be negative, got {max_queue}")
+        self.default_limit = default_limit
+        self.tool_limits = dict(tool_limits or {})
+        self.session_limit = session_limit
+        self.max_queue = max_queue
+        self.session_queue_limit = max(1, max_queue // 4) if session_queue_limit is None else session_queue_limit
+        self._queues: dict[str, _ToolQueue] = {}
+        self._session_running: Counter = Counter()
+        self.rejected: Counter = Counter()
+
+    def _queue_for(self, tool: str) -> _ToolQueue:
+        queue = self._queues.get(tool)
+        if queue is None:
+            queue = self._queues[tool] = _ToolQueue(self.tool_limits.get(tool, self.default_limit))
+        return queue
+
+    def retry_after(self, tool: str) -> float:
+        """Estimate the seconds until a new call to `tool` could start."""
+        queue = self._queue_for(tool)
+        return float(max(1, math.ceil(queue.avg_duration * (len(queue.waiters) + 1) / queue.limit)))
+
+    async def acquire(self, tool: str, session: Hashable) -> ToolSlot:
+        """Wait for a slot to run `tool` for `session`; raise ToolBusyError if the queue is full."""
+        queue = self._queue_for(tool)
+        queue_full = (
+            len(queue.waiters) >= self.max_queue
+            or sum(1 for w in queue.waiters if w.session == session) >= self.session_queue_limit
+        )
+        if queue_full and not self._can_start(queue, session):
+            self.rejected[tool] += 1
+            error = ToolBusyError(tool, self.retry_after(tool))
+            self._prune(tool, queue)
+            raise error
+
+        start = max(queue.virtual_time, queue.session_finish.get(session, 0.0))
+        finish = start + 1.0
+        queue.session_finish[session] = finish
+        if self._can_start(queue, session):
+            self._grant(queue, session, start)
+            return ToolSlot(self, tool, session)
+
+        waiter = _Waiter(session, start, finish, asyncio.get_running_loop().create_future())
+        queue.waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self._release(tool, session, None)
+            else:
+                # _dispatch drops waiters whose caller has gone
+                if waiter in queue.waiters:
+                    queue.waiters.remove(waiter)
+                self._prune(tool, queue)
+            raise
+        return ToolSlot(self, tool, session)
+
+    def _eligible(self, queue: _ToolQueue) -> list[_Waiter]:
+        """Waiters whose session is under its limit, so they could use a free slot."""
+        return [
+            w for w in queue.waiters
+            if not w.future.done() and self._session_running[w.session] < self.session_limit
+        ]
+
+    def _can_start(self, queue: _ToolQueue, session: Hashable) -> bool:
+        # Waiters held back by their own session's limit do not block other sessions
+        return (
+            queue.running < queue.limit
+            and self._session_running[session] < self.session_limit
+            and not self._eligible(queue)
+        )
+
+    def _grant(self, queue: _ToolQueue, session: Hashable, start: float) -> None:
+        queue.running += 1
+        queue.virtual_time = max(queue.virtual_time, start)
+        self._session_running[session] += 1
+
+    def _dispatch(self, queue: _ToolQueue) -> None:
+        """Start the eligible waiters with the smallest finish tags."""
+        # A waiter cancelled before it was granted has a done future; never grant it a slot
+        queue.waiters = [w for w in queue.waiters if not w.future.done()]
+        while queue.running < queue.limit and queue.waiters:
+            eligible = self._eligible(queue)
+            if not eligible:
+                return
+            waiter = min(eligible, key=lambda w: w.finish)
+            queue.waiters.remove(waiter)
+            self._grant(queue, waiter.session, waiter.start)
+            waiter.future.set_result(None)
+
+    def _release(self, tool: str, session: Hashable, duration: Optional[float]) -> None:
+        queue = self._queues[tool]
+        queue.running -= 1
+        # None when the call never ran, which says nothing about how long calls take
+        if duration is not None:
+            queue.avg_duration += 0.2 * (duration - queue.avg_duration)
+        self._session_running[session] -= 1
+        if self._session_running[session] <= 0:
+            del self._session_running[session]
+        # The session may also have calls waiting on other tools
+        for other_tool, other_queue in list(self._queues.items()):
+            self._dispatch(other_queue)
+            self._prune(other_tool, other_queue)
+
+    def _prune(self, tool: str, queue: _ToolQueue) -> None:
+        """Forget idle tools and sessions so state does not grow with traffic."""
+        if queue.running == 0 and not queue.waiters:
+            if self._queues.get(tool) is queue:
+                del self._queues[tool]
+            return
+        waiting = {w.session for w in queue.waiters}
+        for session, finish in list(queue.session_finish.items()):
+            if session not in waiting and finish <= queue.virtual_time:
+                del queue.session_finish[session]
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        """Return running, queued and rejected call counts per tool."""
+        tools = set(self._queues) | set(self.rejected)
+        return {
+            tool: {
+                "running": self._queues[tool].running if tool in self._queues else 0,
+                "queued": len(self._queues[tool].waiters) if tool in self._queues else 0,
+                "rejected": self.rejected[tool],
+            }
+            for tool in sorted(tools)
+        }
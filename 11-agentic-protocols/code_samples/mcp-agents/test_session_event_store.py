@@ -0,0 +1,45 @@
+import asyncio
+
+from mcp.types import JSONRPCMessage, JSONRPCNotification
+
+from server.abandonment import SessionEventStore
+from server.event_store import SimpleEventStore
+
+
+def notification(data):
+    return JSONRPCMessage(JSONRPCNotification(jsonrpc="2.0", method="notifications/message", params={"data": data}))
+
+
+def test_replay_stays_within_session():
+    async def scenario():
+        store = SimpleEventStore()
+        alice = SessionEventStore(store, "a")
+        bob = SessionEventStore(store, "b")
+        first = await alice.store_event("1", notification("secret 1"))
+        await alice.store_event("1", notification("secret 2"))
+        own = await bob.store_event("1", notification("mine"))
+        await bob.store_event("1", notification("mine too"))
+
+        received = []
+
+        async def send(event):
+            received.append(event.message.root.params["data"])
+
+        # Another session's event ID replays nothing
+        assert await bob.replay_events_after(first, send) is None
+        assert received == []
+
+        # The session's own event ID replays its stream
+        assert await bob.replay_events_after(own, send) == "1"
+        assert received == ["mine too"]
+
+    asyncio.run(scenario())
+    print("test_replay_stays_within_session passed")
+
+
+if __name__ == "__main__":
+    try:
+        test_replay_stays_within_session()
+        print("All tests passed!")
+    except AssertionError as e:
+        print(f"Test failed: {e}")
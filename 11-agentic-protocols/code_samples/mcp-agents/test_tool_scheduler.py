@@ -0,0 +1,83 @@
+import asyncio
+
+from server.tool_scheduler import ToolScheduler
+
+
+def test_cancelled_waiter_releases_slot():
+    async def scenario():
+        scheduler = ToolScheduler(default_limit=1, session_limit=4)
+        slot = await scheduler.acquire("slow", "a")
+        waiter = asyncio.create_task(scheduler.acquire("slow", "b"))
+        await asyncio.sleep(0)
+        assert scheduler.get_stats()["slow"]["queued"] == 1
+
+        # Cancel the queued call, then free the slot before the waiter has run its cleanup
+        waiter.cancel()
+        await slot.__aexit__(None, None, None)
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert scheduler.get_stats().get("slow", {}).get("running", 0) == 0
+        # The slot is free again for the next call
+        async with await scheduler.acquire("slow", "c"):
+            assert scheduler.get_stats()["slow"]["running"] == 1
+
+    asyncio.run(scenario())
+    print("test_cancelled_waiter_releases_slot passed")
+
+
+def test_session_at_limit_does_not_block_others():
+    async def scenario():
+        scheduler = ToolScheduler(default_limit=8, session_limit=2, max_queue=32)
+        held = [await scheduler.acquire("tool", "a") for _ in range(2)]
+        # Session a is at its limit, so these calls queue
+        queued = [asyncio.create_task(scheduler.acquire("tool", "a")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert scheduler.get_stats()["tool"]["queued"] == 2
+
+        # Session b starts at once, since the waiting calls cannot use the free slots
+        slot = await asyncio.wait_for(scheduler.acquire("tool", "b"), timeout=1)
+        assert scheduler.get_stats()["tool"]["running"] == 3
+
+        await slot.__aexit__(None, None, None)
+        for task in queued:
+            task.cancel()
+        await asyncio.gather(*queued, return_exceptions=True)
+        for slot in held:
+            await slot.__aexit__(None, None, None)
+        assert scheduler.get_stats().get("tool", {}).get("running", 0) == 0
+
+    asyncio.run(scenario())
+    print("test_session_at_limit_does_not_block_others passed")
+
+
+def test_cancel_after_grant_keeps_duration_estimate():
+    async def scenario():
+        scheduler = ToolScheduler(default_limit=1, session_limit=4)
+        slot = await scheduler.acquire("slow", "a")
+        waiter = asyncio.create_task(scheduler.acquire("slow", "b"))
+        extra = asyncio.create_task(scheduler.acquire("slow", "c"))
+        await asyncio.sleep(0)
+
+        # The slot passes to b, which is cancelled before it runs and hands it on to c
+        await slot.__aexit__(None, None, None)
+        estimate = scheduler._queues["slow"].avg_duration
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        # A call that never ran does not count as a zero-length run
+        assert scheduler._queues["slow"].avg_duration == estimate
+        async with await extra:
+            assert scheduler.get_stats()["slow"]["running"] == 1
+
+    asyncio.run(scenario())
+    print("test_cancel_after_grant_keeps_duration_estimate passed")
+
+
+if __name__ == "__main__":
+    try:
+        test_cancelled_waiter_releases_slot()
+        test_session_at_limit_does_not_block_others()
+        test_cancel_after_grant_keeps_duration_estimate()
+        print("All tests passed!")
+    except AssertionError as e:
+        print(f"Test failed: {e}")